@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Trakt /sync 提交的自适应批大小（csv_to_trakt 与 csv_sync_to_trakt 共用）
+
+- 按每批的响应耗时、payload 字节数与失败情况调整下一批的条目数：
+  响应快（低于 target_latency 的一半）且无失败时按 GROW 倍增大，
+  响应慢（超过 target_latency）时按 SHRINK 倍缩小，超时或 5xx 时减半；
+- 批大小同时受 max_bytes 约束：按最近每条目的平均字节数换算上限；
+- 记录用过的批大小与总吞吐，summary() 打印。
+
+用法：
+    sizer = AdaptiveBatchSize()
+    for group in sizer.batches(items):
+        t = time.monotonic(); r = post(...)
+        sizer.record(len(group), nbytes, time.monotonic() - t, r.status_code)
+"""
+import threading
+import time
+
+INITIAL = 80
+MIN_SIZE = 10
+MAX_SIZE = 500
+TARGET_LATENCY = 5.0      # 秒
+MAX_BYTES = 512 * 1024
+GROW = 1.25
+SHRINK = 0.8
+
+
+class AdaptiveBatchSize:
+    def __init__(self, initial=INITIAL, min_size=MIN_SIZE, max_size=MAX_SIZE,
+                 target_latency=TARGET_LATENCY, max_bytes=MAX_BYTES, adaptive=True):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = max(min_size, min(max_size, initial))
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.adaptive = adaptive
+        self.bytes_per_item = None
+        self.sizes = []          # 实际发出的每批条目数
+        self.items = 0
+        self.busy = 0.0          # 各批响应耗时之和
+        self.errors = 0
+        self._started = None
+        self._lock = threading.Lock()
+
+    def next_size(self) -> int:
+        with self._lock:
+            size = self.size
+            if self.bytes_per_item:
+                size = min(size, max(self.min_size, int(self.max_bytes / self.bytes_per_item)))
+            return size
+
+    def batches(self, items):
+        """按当前批大小逐批切分；每次取下一批时读取最新的批大小"""
+        i = 0
+        while i < len(items):
+            n = self.next_size()
+            yield items[i:i + n]
+            i += n
+
+    def record(self, n_items: int, n_bytes: int, latency: float, status=None, timeout: bool = False):
+        """
+        一次请求的结果：status 为 HTTP 状态码（请求异常时为 None），timeout 表示读超时。
+        """
+        failed = timeout or status is None or status >= 500
+        with self._lock:
+            if self._started is None:
+                self._started = time.monotonic() - latency
+            self.sizes.append(n_items)
+            self.busy += latency
+            if n_items and n_bytes:
+                bpi = n_bytes / n_items
+                self.bytes_per_item = bpi if self.bytes_per_item is None else 0.7 * self.bytes_per_item + 0.3 * bpi
+            if failed:
+                self.errors += 1
+            elif status is not None and 200 <= status < 300:
+                self.items += n_items
+            if not self.adaptive:
+                return
+            if failed:
+                size = self.size * 0.5
+            elif latency > self.target_latency:
+                size = self.size * SHRINK
+            elif latency < self.target_latency / 2 and n_items >= self.size * 0.9:
+                # 只有接近满批时的快速响应才说明还有余量
+                size = self.size * GROW
+            else:
+                return
+            self.size = max(self.min_size, min(self.max_size, int(round(size))))
+
+    def summary(self) -> str:
+        if not self.sizes:
+            return "批大小：无提交"
+        elapsed = time.monotonic() - self._started if self._started is not None else 0.0
+        rate = self.items / elapsed if elapsed > 0 else 0.0
+        return (f"批大小：{len(self.sizes)} 批，最小 {min(self.sizes)} / 平均 {sum(self.sizes) / len(self.sizes):.0f}"
+                f" / 最大 {max(self.sizes)}，当前 {self.size}；失败 {self.errors} 批；"
+                f"吞吐 {rate:.1f} 条/s（平均响应 {self.busy / len(self.sizes):.2f}s）")
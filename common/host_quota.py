@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+跨进程共享的按 host 限速（批量模式下多个账号的子进程共用一份额度）
+
+- SQLite 文件中每个 host 一行：最小发起间隔 interval 与下一个可用时间点 next_at；
+- 每次请求在事务中预订一个时间槽（max(now, next_at)），再把 next_at 后推一个 interval，
+  然后等到该时间槽。各进程按预订先后轮流发出请求，任何一个账号都不会独占某个 host；
+- 没有配置的 host 不限速；环境变量 DOUBANTOOLS_HOST_QUOTA 指向该文件时，
+  common.transport 的每次实际请求（含 urllib3 重试）与 douban_to_csv --async 引擎（AsyncFetcher）
+  的每次发送都先经过这里。
+
+用法：
+    HostQuota.create(path, {"movie.douban.com": 1.5, "api.trakt.tv": 3})   # 批量调度方
+    QUOTA = HostQuota.from_env()                                            # 各子进程
+    QUOTA.wait("movie.douban.com")
+    await QUOTA.wait_async("movie.douban.com")                              # asyncio 中
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+ENV = "DOUBANTOOLS_HOST_QUOTA"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    host     TEXT PRIMARY KEY,
+    interval REAL NOT NULL,
+    next_at  REAL NOT NULL DEFAULT 0,
+    requests INTEGER NOT NULL DEFAULT 0,
+    waited   REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+class HostQuota:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+        self._hosts = None
+
+    @classmethod
+    def create(cls, path: str, rates: dict) -> "HostQuota":
+        """rates: {host: 每秒请求数}；重置该文件中的额度与计数"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        q = cls(path)
+        with q._lock:
+            db = q._conn()
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM hosts")
+            db.executemany("INSERT INTO hosts (host, interval) VALUES (?,?)",
+                           [(h, 1.0 / r) for h, r in rates.items() if r and r > 0])
+            db.execute("COMMIT")
+        return q
+
+    @classmethod
+    def from_env(cls) -> "HostQuota | None":
+        path = os.environ.get(ENV)
+        return cls(path) if path and os.path.exists(path) else None
+
+    def _conn(self):
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def _reserve(self, host: str) -> float:
+        with self._lock:
+            db = self._conn()
+            if self._hosts is None:
+                self._hosts = {h for (h,) in db.execute("SELECT host FROM hosts")}
+            if host not in self._hosts:
+                return 0.0
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                interval, next_at = db.execute("SELECT interval, next_at FROM hosts WHERE host=?", (host,)).fetchone()
+                now = time.time()
+                slot = max(now, next_at)
+                db.execute("UPDATE hosts SET next_at=?, requests=requests+1, waited=waited+? WHERE host=?",
+                           (slot + interval, slot - now, host))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            return slot - now
+
+    def wait(self, host: str):
+        delay = self._reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, host: str):
+        # 预订在线程里做（SQLite 写锁可能要等），等待时不阻塞事件循环
+        delay = await asyncio.to_thread(self._reserve, host)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def summary(self) -> str:
+        with self._lock:
+            rows = self._conn().execute("SELECT host, interval, requests, waited FROM hosts ORDER BY host").fetchall()
+        parts = [f"{h} {1 / iv:g}/s：{n} 次，排队 {w:.1f}s" for h, iv, n, w in rows]
+        return "共享 host 额度：" + ("；".join(parts) if parts else "未配置")
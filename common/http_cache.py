@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+持久化 HTTP 响应缓存（单文件 SQLite）
+
+- 按 URL 规则设置 TTL（列表页、interests、subject 详情各不相同）；
+- 过期后若有 ETag / Last-Modified，则带 If-None-Match / If-Modified-Since 重新验证，304 直接续期；
+  revalidate 中的 URL 规则即使未过期也先验证（增量抓取时的列表页与 interests 分页）；
+- 总大小超过上限时按最近访问时间（LRU）淘汰，访问时间最多每 TOUCH_INTERVAL 更新一次；
+- 多个进程可共用同一个文件（批量模式）：写锁等待 BUSY_TIMEOUT 秒，仍拿不到时读按未命中、写直接放弃，
+  缓存出错不影响请求本身；
+- enabled=False 即绕过缓存（命令行 --no-cache）。
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode, urlsplit, urlunsplit, parse_qsl
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "doubanTOOLs", "http_cache.sqlite")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+BUSY_TIMEOUT = 30
+
+HOUR = 3600
+DAY = 24 * HOUR
+TOUCH_INTERVAL = HOUR  # LRU 的访问时间精度：命中时距上次更新不足该时长就不写库
+
+# (URL 正则, TTL 秒)；按顺序匹配，未命中任何规则的 URL 不缓存
+DEFAULT_TTLS = [
+    (re.compile(r"^https://movie\.douban\.com/people/[^/]+/collect"), 12 * HOUR),
+    (re.compile(r"^https://m\.douban\.com/rexxar/api/v2/user/[^/]+/interests"), 12 * HOUR),
+    (re.compile(r"^https://m\.douban\.com/rexxar/api/v2/user/[^/]+/interest\b"), 7 * DAY),
+    (re.compile(r"^https://m\.douban\.com/rexxar/api/v2/subject/\d+"), 30 * DAY),
+]
+# 按时间倒序分页的列表：新标记的条目出现在第 1 页并把后面各页整体后移
+LIST_URLS = (DEFAULT_TTLS[0][0], DEFAULT_TTLS[1][0])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key           TEXT PRIMARY KEY,
+    status        INTEGER NOT NULL,
+    body          BLOB NOT NULL,
+    content_type  TEXT,
+    encoding      TEXT,
+    etag          TEXT,
+    last_modified TEXT,
+    stored_at     REAL NOT NULL,
+    expires_at    REAL NOT NULL,
+    accessed_at   REAL NOT NULL,
+    size          INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+"""
+
+
+def cache_key(url: str, params=None) -> str:
+    """URL + 排序后的查询参数，保证同一请求得到同一个 key"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        items = params.items() if isinstance(params, dict) else params
+        query += [(str(k), str(v)) for k, v in items if v is not None]
+    query.sort()
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+class CacheEntry:
+    __slots__ = ("key", "status", "body", "content_type", "encoding", "etag", "last_modified",
+                 "stored_at", "expires_at")
+
+    def __init__(self, key, status, body, content_type, encoding, etag, last_modified, stored_at, expires_at):
+        self.key = key
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def validators(self) -> dict:
+        h = {}
+        if self.etag:
+            h["If-None-Match"] = self.etag
+        if self.last_modified:
+            h["If-Modified-Since"] = self.last_modified
+        return h
+
+
+class HttpCache:
+    def __init__(self, path: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES, ttls=None, enabled: bool = True):
+        self.path = path or DEFAULT_PATH
+        self.max_bytes = max_bytes
+        self.ttls = list(DEFAULT_TTLS if ttls is None else ttls)
+        self.enabled = enabled
+        self.revalidate = ()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._total = 0
+
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=BUSY_TIMEOUT)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._db = db
+        return self._db
+
+    def ttl_for(self, url: str):
+        for pat, ttl in self.ttls:
+            if pat.search(url):
+                return ttl
+        return None
+
+    def cacheable(self, url: str) -> bool:
+        return self.enabled and self.ttl_for(url) is not None
+
+    def usable(self, entry, url: str) -> bool:
+        """条目未过期且 URL 不在 revalidate 规则内时直接使用；否则带验证头重新请求"""
+        return entry.fresh and not any(pat.search(url) for pat in self.revalidate)
+
+    def lookup(self, key: str, url: str | None = None):
+        """
+        取出条目（不存在返回 None）；每次查找只计一次：可直接使用的记为命中，不存在记为未命中，
+        需要重新验证的（过期，或给定 url 落在 revalidate 规则内）由 refresh / 调用方按结果计数。
+        """
+        with self._lock:
+            try:
+                db = self._conn()
+                row = db.execute(
+                    "SELECT key, status, body, content_type, encoding, etag, last_modified, stored_at, expires_at, "
+                    "accessed_at FROM responses WHERE key=?", (key,)).fetchone()
+            except sqlite3.OperationalError:
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            if now - row[-1] >= TOUCH_INTERVAL:
+                try:
+                    db.execute("UPDATE responses SET accessed_at=? WHERE key=?", (now, key))
+                except sqlite3.OperationalError:
+                    pass  # 只影响淘汰顺序
+        entry = CacheEntry(*row[:-1])
+        if entry.fresh if url is None else self.usable(entry, url):
+            self.hits += 1
+        return entry
+
+    def store(self, key: str, url: str, status: int, body: bytes, headers, encoding=None):
+        ttl = self.ttl_for(url)
+        if ttl is None:
+            return
+        headers = headers or {}
+        now = time.time()
+        size = len(body) + len(key)
+        with self._lock:
+            try:
+                db = self._conn()
+                old = db.execute("SELECT size FROM responses WHERE key=?", (key,)).fetchone()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                    (key, status, body, headers.get("Content-Type"), encoding, headers.get("ETag"),
+                     headers.get("Last-Modified"), now, now + ttl, now, size))
+                self._total += size - (old[0] if old else 0)
+                self._evict(db)
+            except sqlite3.OperationalError:
+                pass  # 写不进缓存（如其他进程长时间占用）时下次按未命中处理
+
+    def refresh(self, entry: CacheEntry, url: str, headers=None):
+        """304 Not Modified：沿用旧内容，续期并更新验证器"""
+        ttl = self.ttl_for(url) or 0
+        headers = headers or {}
+        now = time.time()
+        entry.expires_at = now + ttl
+        entry.etag = headers.get("ETag") or entry.etag
+        entry.last_modified = headers.get("Last-Modified") or entry.last_modified
+        with self._lock:
+            try:
+                self._conn().execute(
+                    "UPDATE responses SET expires_at=?, accessed_at=?, etag=?, last_modified=? WHERE key=?",
+                    (entry.expires_at, now, entry.etag, entry.last_modified, entry.key))
+            except sqlite3.OperationalError:
+                pass  # 本次仍用旧内容，下次再重新验证
+        self.revalidated += 1
+
+    def _evict(self, db):
+        if self._total <= self.max_bytes:
+            return
+        # 按最近访问时间从旧到新淘汰，直到回到上限的 90%；在一个事务里完成，
+        # 总大小在事务内重新统计（其他进程可能也在写同一个文件）
+        target = int(self.max_bytes * 0.9)
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            doomed = []
+            if total > target:
+                cur = db.execute("SELECT key, size FROM responses ORDER BY accessed_at")
+                for key, size in cur:
+                    if total <= target:
+                        break
+                    doomed.append((key,))
+                    total -= size
+                cur.close()
+                db.executemany("DELETE FROM responses WHERE key=?", doomed)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        self._total = total
+
+    def clear(self):
+        with self._lock:
+            self._conn().execute("DELETE FROM responses")
+            self._total = 0
+
+    def summary(self) -> str:
+        return f"HTTP 缓存：命中 {self.hits}，重新验证 {self.revalidated}，未命中 {self.misses}（{self.path}）"
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def cached_get(session, cache, url, params=None, headers=None, **kwargs):
+    """
+    requests 版本的带缓存 GET：返回 requests.Response（命中时由缓存内容构造）。
+    仅缓存 200 响应；cache 为 None 或已禁用时等价于 session.get。
+    """
+    if cache is None or not cache.cacheable(url):
+        return session.get(url, params=params, headers=headers, **kwargs)
+    key = cache_key(url, params)
+    entry = cache.lookup(key, url)
+    if entry is not None and cache.usable(entry, url):
+        return _to_response(entry, url)
+    req_headers = dict(headers or {})
+    if entry is not None:
+        req_headers.update(entry.validators())
+    r = session.get(url, params=params, headers=req_headers, **kwargs)
+    if r.status_code == 304 and entry is not None:
+        cache.refresh(entry, url, r.headers)
+        return _to_response(entry, url)
+    if entry is not None:
+        cache.misses += 1  # 过期且未能 304 续期，按未命中计
+    if r.status_code == 200:
+        cache.store(key, url, r.status_code, r.content, r.headers, r.encoding)
+    return r
+
+
+def _to_response(entry: CacheEntry, url: str):
+    import requests
+    resp = requests.models.Response()
+    resp.status_code = entry.status
+    resp._content = entry.body
+    resp.encoding = entry.encoding
+    resp.url = url
+    if entry.content_type:
+        resp.headers["Content-Type"] = entry.content_type
+    resp.headers["X-Cache"] = "HIT"
+    return resp
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+m.douban.com rexxar interests 分页拉取（douban_to_csv 与 enrich_csv_times 共用）
+
+- 每个 status 先取第 0 页，读出响应里的 total，算出其余全部 offset；
+- 其余 offset 与各 status 并发拉取，受 workers（并发数）与 rate（每秒请求数）双重限制；
+- 结果按 (status 顺序, offset 顺序) 交给 merge 回调，合并结果与顺序翻页一致；
+- stop 回调返回 True（如遇到增量水位线）时，该 status 后续页不再发起（已在途的至多 workers 个请求照常完成）；
+- 响应里没有 total 时退回逐页翻到空页为止。
+
+get_json(url, params) 由调用方提供（各自的会话、缓存与重试），失败返回 None。
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+INTERESTS_URL = "https://m.douban.com/rexxar/api/v2/user/{}/interests"
+PAGE_SIZE = 100
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 5.0  # 与原先每页 sleep 0.2s 的节奏相当
+
+
+class RateLimiter:
+    """最小发起间隔限速：rate 次/秒，线程安全；rate<=0 表示不限速"""
+
+    def __init__(self, rate: float = DEFAULT_RATE):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+            return slot - now
+
+    def wait(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _items(js):
+    return (js or {}).get("interests") or []
+
+
+def _offsets(js, count: int):
+    """由首页的 total 计算其余页的 offset；没有 total 返回 None"""
+    try:
+        total = int((js or {}).get("total"))
+    except (TypeError, ValueError):
+        return None
+    return list(range(count, total, count))
+
+
+def _last_page(status, js, stop) -> bool:
+    arr = _items(js)
+    return not arr or bool(stop and stop(status, arr))
+
+
+def _consume(status, js, merge, stop, stats) -> bool:
+    """合并一页，返回该 status 是否到此为止（空页或 stop）"""
+    arr = _items(js)
+    stats.items += len(arr)
+    if arr:
+        merge(status, arr)
+    return _last_page(status, js, stop)
+
+
+class InterestsStats:
+    def __init__(self):
+        self.requests = 0
+        self.failed = 0
+        self.items = 0
+
+    def line(self, elapsed: float) -> str:
+        return (f"interests：{self.requests} 个请求，{self.items} 条，失败 {self.failed} 页，"
+                f"用时 {elapsed:.1f}s")
+
+
+def pull_interests(get_json, user_id: str, merge, statuses=("done",), count: int = PAGE_SIZE,
+                   workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE, stop=None, stats=None):
+    """
+    线程池版本。merge(status, items) 严格按 (status, offset) 顺序调用；
+    stop(status, items) 为只读判断，返回 True 时该 status 不再继续翻页。返回 InterestsStats。
+    """
+    url = INTERESTS_URL.format(user_id)
+    limiter = RateLimiter(rate)
+    stats = stats or InterestsStats()
+    lock = threading.Lock()
+
+    def get(status, start):
+        limiter.wait()
+        js = get_json(url, {"status": status, "start": start, "count": count})
+        with lock:
+            stats.requests += 1
+            if js is None:
+                stats.failed += 1
+        return js
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        firsts = [(s, ex.submit(get, s, 0)) for s in statuses]
+        plans = []
+        for status, fut in firsts:
+            js = fut.result()
+            offs = None if _last_page(status, js, stop) else _offsets(js, count)
+            # 有 total：其余页立即全部排队；没有 total：之后逐页翻
+            plans.append((status, js, [ex.submit(get, status, o) for o in offs] if offs is not None else None))
+        for status, js, futs in plans:
+            if _consume(status, js, merge, stop, stats):
+                continue
+            if futs is None:
+                start = count
+                while not _consume(status, get(status, start), merge, stop, stats):
+                    start += count
+                continue
+            for i, fut in enumerate(futs):
+                js = fut.result()
+                if js is None:
+                    continue  # 已知 total 时单页失败不影响后续页
+                if _consume(status, js, merge, stop, stats):
+                    for rest in futs[i + 1:]:
+                        rest.cancel()
+                    break
+    return stats
+
+
+async def pull_interests_async(get_json, user_id: str, merge, statuses=("done",), count: int = PAGE_SIZE,
+                               workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE, stop=None, stats=None):
+    """asyncio 版本，语义同 pull_interests；get_json 为协程函数"""
+    url = INTERESTS_URL.format(user_id)
+    limiter = RateLimiter(rate)
+    sem = asyncio.Semaphore(max(1, workers))
+    stats = stats or InterestsStats()
+
+    async def get(status, start):
+        async with sem:
+            await limiter.wait_async()
+            js = await get_json(url, {"status": status, "start": start, "count": count})
+        stats.requests += 1
+        if js is None:
+            stats.failed += 1
+        return js
+
+    firsts = [(s, asyncio.create_task(get(s, 0))) for s in statuses]
+    pending = [t for _, t in firsts]
+    try:
+        plans = []
+        for status, task in firsts:
+            js = await task
+            offs = None if _last_page(status, js, stop) else _offsets(js, count)
+            tasks = [asyncio.create_task(get(status, o)) for o in offs] if offs is not None else None
+            pending += tasks or []
+            plans.append((status, js, tasks))
+        for status, js, tasks in plans:
+            if _consume(status, js, merge, stop, stats):
+                continue
+            if tasks is None:
+                start = count
+                while not _consume(status, await get(status, start), merge, stop, stats):
+                    start += count
+                continue
+            for i, task in enumerate(tasks):
+                js = await task
+                if js is None:
+                    continue
+                if _consume(status, js, merge, stop, stats):
+                    for rest in tasks[i + 1:]:
+                        rest.cancel()
+                    break
+    finally:
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    return stats
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+CSV 行模型（douban_to_csv 导出、csv_to_trakt 导入与 enrich_csv_times 补时共用）
+
+- Row 用 __slots__ 存已知列，读入时每列只去一次首尾空白；type / found / season / slug / 日期
+  等重复率高的短值 intern，同值共用一个字符串对象；
+- datetime / datetime_refined 读入时按 UTC+8 解析为 epoch 秒（ts / ts_refined），后续不再 strptime；
+- 表头以外的列放在 extra（dict，没有时为 None），写回时按给定表头输出，原有列一律保留；
+- 支持 get / [] / []=，可直接替换原来 DictReader 产出的 dict 行；
+  改时间请用 row["datetime"] = ...，会同时更新 ts。
+
+用法：
+    for row in iter_rows(path, required=REQUIRED):
+        row.slug, row.ts, iso_utc(row.ts)
+    write_rows(f, rows, FIELDS)
+"""
+import csv
+import os
+import sys
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from operator import attrgetter
+
+# 导出 CSV 的表头（douban_to_csv），enrich_csv_times 追加的列在后
+EXPORT_FIELDS = ("title", "date", "datetime", "type", "season", "slug", "matched_title", "matched_year",
+                 "found", "douban_link", "release_year", "match_confidence")
+ENRICH_FIELDS = ("datetime_refined", "douban_type", "douban_subject_id")
+FIELDS = EXPORT_FIELDS + ENRICH_FIELDS
+
+_INTERN = frozenset(("date", "type", "season", "slug", "matched_year", "found", "release_year", "douban_type"))
+_KNOWN = frozenset(FIELDS)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_UTC8 = 8 * 3600
+
+
+@lru_cache(maxsize=16384)
+def _day_seconds(ymd: str):
+    """'YYYY-MM-DD' → 当天 0 点（按 UTC 计）的 epoch 秒；同一日期只解析一次"""
+    try:
+        return (date(int(ymd[0:4]), int(ymd[5:7]), int(ymd[8:10])).toordinal() - _EPOCH_ORDINAL) * 86400
+    except ValueError:
+        return None
+
+
+def _loose_fields(s: str):
+    """非零填充的写法（如 '2020-1-2 3:04:05'，与 strptime('%Y-%m-%d %H:%M:%S') 接受的一致）→ 六个整数"""
+    d, sep, t = s.partition(" ")
+    parts = d.split("-") + t.split(":")
+    if not sep or len(parts) != 6 or len(parts[0]) != 4:
+        return None
+    if not all(p.isdigit() and len(p) <= 2 for p in parts[1:]) or not parts[0].isdigit():
+        return None
+    return [int(p) for p in parts]
+
+
+def parse_local(s: str):
+    """'YYYY-MM-DD HH:MM:SS'（按 UTC+8 理解，月日时分秒可不补零）→ epoch 秒；格式不对返回 None"""
+    if len(s) == 19 and s[4] == "-" and s[7] == "-" and s[10] == " " and s[13] == ":" and s[16] == ":":
+        day = _day_seconds(s[:10])
+        try:
+            h, m, sec = int(s[11:13]), int(s[14:16]), int(s[17:19])
+        except ValueError:
+            return None
+    else:
+        f = _loose_fields(s)
+        if f is None:
+            return None
+        day = _day_seconds(f"{f[0]:04d}-{f[1]:02d}-{f[2]:02d}")
+        h, m, sec = f[3:]
+    if day is None or not (0 <= h < 24 and 0 <= m < 60 and 0 <= sec < 60):
+        return None
+    return day + h * 3600 + m * 60 + sec - _UTC8
+
+
+def iso_utc(ts):
+    """epoch 秒 → UTC ISO8601（与 time_utils.convert_local_cn_to_utc_iso 的输出一致）"""
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class Row:
+    __slots__ = FIELDS + ("extra", "ts", "ts_refined")
+
+    def __init__(self):
+        for name in FIELDS:
+            setattr(self, name, "")
+        self.extra = None
+        self.ts = None
+        self.ts_refined = None
+
+    @classmethod
+    def from_dict(cls, d) -> "Row":
+        row = cls()
+        for k, v in d.items():
+            if k is not None:
+                row[k] = v
+        return row
+
+    # ---------- dict 兼容 ----------
+    def get(self, key, default=None):
+        if key in _KNOWN:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        return default
+
+    def __getitem__(self, key):
+        if key in _KNOWN:
+            return getattr(self, key)
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        value = "" if value is None else str(value).strip()
+        if key in _KNOWN:
+            if key in _INTERN:
+                value = sys.intern(value)
+            setattr(self, key, value)
+            if key == "datetime":
+                self.ts = parse_local(value)
+            elif key == "datetime_refined":
+                self.ts_refined = parse_local(value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return key in _KNOWN or (self.extra is not None and key in self.extra)
+
+    def values(self, fields):
+        """按表头顺序输出一行（csv.writer 用）；没有的列写空串"""
+        return [self.get(k, "") for k in fields]
+
+    def __repr__(self):
+        return f"Row({self.title!r}, {self.type!r}, slug={self.slug!r}, datetime={self.datetime!r})"
+
+
+def _builder(header):
+    """按表头生成逐行构造函数：已知列直接写 slot，其余放 extra"""
+    plain = []
+    shared = []
+    extra = []
+    for i, name in enumerate(header):
+        if name not in _KNOWN:
+            extra.append((i, name))
+        elif name in _INTERN:
+            shared.append((i, getattr(Row, name).__set__))
+        else:
+            plain.append((i, getattr(Row, name).__set__))
+    absent = [getattr(Row, name).__set__ for name in FIELDS if name not in header]
+    width = len(header)
+    new = Row.__new__
+    intern = sys.intern
+    has_dt = "datetime" in header
+    has_ref = "datetime_refined" in header
+
+    def build(values):
+        if len(values) < width:
+            values = values + [""] * (width - len(values))
+        row = new(Row)
+        for i, put in plain:
+            put(row, values[i].strip())
+        for i, put in shared:
+            put(row, intern(values[i].strip()))
+        for put in absent:
+            put(row, "")
+        row.extra = {name: values[i].strip() for i, name in extra} if extra else None
+        row.ts = parse_local(row.datetime) if has_dt else None
+        row.ts_refined = parse_local(row.datetime_refined) if has_ref else None
+        return row
+
+    return build
+
+
+def read_header(path: str) -> list:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def iter_rows(path: str, required=()):
+    """逐行读取为 Row；跳过空行，required 中的列缺失时抛 ValueError"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"CSV 不存在: {path}")
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        r = csv.reader(f)
+        header = next(r, [])
+        missing = set(required) - set(header)
+        if missing:
+            raise ValueError(f"CSV 表头缺少: {missing}；当前表头={header}")
+        build = _builder(header)
+        for values in r:
+            if values:
+                yield build(values)
+
+
+def write_rows(f, rows, fields, header=True, **fmt):
+    """rows 为 Row 或 dict，按 fields 顺序写出；fmt 传给 csv.writer（如 lineterminator）"""
+    w = csv.writer(f, **fmt)
+    if header:
+        w.writerow(fields)
+    # 全是已知列时直接按 slot 取值
+    get = attrgetter(*fields) if fields and _KNOWN.issuperset(fields) else None
+    if get is not None and len(fields) == 1:
+        get = lambda row, one=get: (one(row),)
+
+    def values(row):
+        if type(row) is Row:
+            return get(row) if get is not None else row.values(fields)
+        return [row.get(k, "") for k in fields]
+
+    w.writerows(map(values, rows))
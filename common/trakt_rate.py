@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Trakt 请求的自适应限速（douban_to_csv 搜索、csv_to_trakt / csv_sync_to_trakt 写入共用）
+
+- GET 与 POST（含 PUT/DELETE）分别用一个令牌桶，默认额度按 Trakt 文档：
+  GET 1000 次 / 5 分钟，POST 1 次 / 秒；
+- 每个响应的 X-Ratelimit 头（{"name","period","limit","remaining","until"}）会修正对应桶的
+  速率与剩余额度，remaining 为 0 时暂停到 until；
+- 429 按 Retry-After 暂停整个桶，并把该请求重新排队，而不是丢弃。
+
+用法：
+    r = LIMITER.call("POST", lambda: requests.post(...))
+    status, text, headers = await LIMITER.call_async("GET", lambda: af.request("GET", url, ...))
+"""
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+GET_LIMIT = (1000, 300)   # (次数, 秒)
+POST_LIMIT = (1, 1)
+GET_BURST = 20
+MAX_REQUEUE = 5
+DEFAULT_RETRY_AFTER = 10.0
+
+
+def retry_after(headers):
+    """Retry-After（秒数或 HTTP 日期）→ 秒；没有或无法解析返回 None"""
+    v = (headers or {}).get("Retry-After")
+    if not v:
+        return None
+    try:
+        return max(0.0, float(v))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(v) - datetime.now(timezone.utc)).total_seconds())
+    except Exception:
+        return None
+
+
+def _parse_ratelimit(headers):
+    """X-Ratelimit 头 → dict；没有或无法解析返回 None"""
+    v = (headers or {}).get("X-Ratelimit")
+    if not v:
+        return None
+    try:
+        data = json.loads(v)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _until_seconds(until):
+    try:
+        dt = datetime.fromisoformat(str(until).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max(0.0, (dt - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    令牌桶：rate 个/秒，最多攒 capacity 个，线程安全。
+    令牌可以透支：预订时若为负，等待到补足为止；pause(seconds) 压低余额，使下一个令牌恰好在 seconds 秒后可用。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def _reserve(self) -> float:
+        """预订一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+    def update(self, limit, period, remaining=None):
+        """按服务器给出的额度修正速率与剩余令牌"""
+        with self._lock:
+            self._refill()
+            if limit and period:
+                self.rate = float(limit) / float(period)
+            if remaining is not None:
+                self._tokens = min(self._tokens, float(remaining))
+
+    def wait(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class TraktRateLimiter:
+    """GET / POST 两个令牌桶 + 响应头反馈 + 429 重新排队"""
+
+    def __init__(self, get_limit=GET_LIMIT, post_limit=POST_LIMIT, get_burst=GET_BURST, max_requeue=MAX_REQUEUE):
+        self.buckets = {
+            "GET": TokenBucket(get_limit[0] / get_limit[1], get_burst),
+            "POST": TokenBucket(post_limit[0] / post_limit[1], 1),
+        }
+        self.max_requeue = max_requeue
+        self.requests = 0
+        self.requeued = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def bucket(self, method: str) -> TokenBucket:
+        return self.buckets["GET" if method.upper() in ("GET", "HEAD") else "POST"]
+
+    def wait(self, method: str = "GET"):
+        t = time.monotonic()
+        self.bucket(method).wait()
+        self._count(time.monotonic() - t)
+
+    async def wait_async(self, method: str = "GET"):
+        t = time.monotonic()
+        await self.bucket(method).wait_async()
+        self._count(time.monotonic() - t)
+
+    def _count(self, waited):
+        with self._lock:
+            self.requests += 1
+            self.waited += waited
+
+    def observe(self, method: str, status: int, headers):
+        """
+        读取响应头修正额度；返回 None 表示响应可用，
+        返回秒数表示被限流（429），桶已暂停这么久，调用方应重新排队该请求。
+        """
+        bucket = self.bucket(method)
+        info = _parse_ratelimit(headers)
+        if info:
+            bucket.update(info.get("limit"), info.get("period"), info.get("remaining"))
+            if info.get("remaining") == 0 and info.get("until"):
+                wait = _until_seconds(info["until"])
+                if wait:
+                    bucket.pause(wait)
+        if status != 429:
+            return None
+        wait = retry_after(headers)
+        wait = DEFAULT_RETRY_AFTER if wait is None else wait
+        bucket.pause(wait)
+        with self._lock:
+            self.requeued += 1
+        return wait
+
+    def call(self, method: str, send):
+        """
+        按额度发送 send()（返回 requests.Response），429 时等 Retry-After 后重新发送，
+        最多 max_requeue 次；仍被限流时返回最后一次响应，由调用方按失败处理。
+        """
+        for attempt in range(self.max_requeue + 1):
+            self.wait(method)
+            r = send()
+            wait = self.observe(method, r.status_code, r.headers)
+            if wait is None:
+                return r
+            print(f"[Trakt 限流] {wait:.1f}s 后重新发送（第 {attempt + 1} 次）")
+        return r
+
+    async def call_async(self, method: str, send):
+        """
+        call 的 asyncio 版本：send() 返回协程，结果为 (status, body, headers)（如 AsyncFetcher.request）；
+        同样按额度排队、读取响应头，429 时等 Retry-After 后重新发送。
+        """
+        for attempt in range(self.max_requeue + 1):
+            await self.wait_async(method)
+            result = await send()
+            wait = self.observe(method, result[0], result[2])
+            if wait is None:
+                return result
+            print(f"[Trakt 限流] {wait:.1f}s 后重新发送（第 {attempt + 1} 次）")
+        return result
+
+    def summary(self) -> str:
+        return (f"Trakt 限速：{self.requests} 个请求，限流重排 {self.requeued} 次，"
+                f"等待额度共 {self.waited:.1f}s")
+
+
+LIMITER = TraktRateLimiter()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+各工具共用的 HTTP 传输层（requests）
+
+- 按 host 共享 keep-alive 连接池：同一进程里不同 Session 请求同一 host 时复用已有连接，
+  池大小见 HOST_POOLS；
+- 统一的重试与超时策略：GET 按 5xx（豆瓣另含 429）退避重试，POST 不重试；
+  默认超时为 (连接, 读取) 两段；默认用 certifi 校验证书；
+- Session 可在线程间共享（urllib3 连接池线程安全，池满时临时建连，不阻塞）；
+- STATS 统计各 host 新建连接数与复用次数，summary() 打印；
+- 设置了 DOUBANTOOLS_HOST_QUOTA（批量模式）时，每次实际发出请求前先向 common.host_quota
+  预订该 host 的共享额度，多个进程合计不超过各 host 的限速。
+
+用法：
+    SESSION = session({"User-Agent": ...})
+    r = SESSION.get(url, params=...)
+aiohttp 引擎（douban_to_csv/async_session.py）自带连接池，不经过这里。
+"""
+import threading
+
+import certifi
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from common.host_quota import HostQuota
+
+CONNECT_TIMEOUT = 6.05
+READ_TIMEOUT = 30
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# 每个 host 的连接池大小（并发 worker 数的上限参考）；未列出的 host 用 DEFAULT_POOL
+HOST_POOLS = {
+    "movie.douban.com": 8,
+    "m.douban.com": 8,
+    "www.douban.com": 4,
+    "api.trakt.tv": 8,
+}
+DEFAULT_POOL = 4
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Trakt 的 429 由 common.trakt_rate 按 Retry-After 重新排队，这里只重试 5xx
+HOST_RETRY_STATUS = {
+    "api.trakt.tv": (500, 502, 503, 504),
+}
+
+
+def retry_policy(status_forcelist=RETRY_STATUS) -> Retry:
+    return Retry(total=6, connect=3, read=5, status=5, backoff_factor=1.2,
+                 status_forcelist=list(status_forcelist), allowed_methods=frozenset(["GET"]),
+                 raise_on_status=False)
+
+
+class TransportStats:
+    """各 host 的连接统计：opened 为新建连接数，checkouts 为取连接次数（含重试）"""
+
+    def __init__(self):
+        self.opened = {}
+        self.checkouts = {}
+        self._lock = threading.Lock()
+
+    def _add(self, counter, host):
+        with self._lock:
+            counter[host] = counter.get(host, 0) + 1
+
+    def reused(self, host) -> int:
+        return max(0, self.checkouts.get(host, 0) - self.opened.get(host, 0))
+
+    def summary(self) -> str:
+        parts = [f"{h} 新建 {self.opened.get(h, 0)} / 复用 {self.reused(h)}" for h in sorted(self.checkouts)]
+        return "HTTP 连接：" + ("；".join(parts) if parts else "无请求")
+
+
+STATS = TransportStats()
+QUOTA = HostQuota.from_env()
+
+
+class _CountingPool:
+    def _new_conn(self):
+        STATS._add(STATS.opened, self.host)
+        return super()._new_conn()
+
+    def _get_conn(self, timeout=None):
+        STATS._add(STATS.checkouts, self.host)
+        if QUOTA is not None:
+            # 每次取连接即一次实际发出（含 urllib3 重试），在这里预订共享额度
+            QUOTA.wait(self.host)
+        return super()._get_conn(timeout)
+
+
+class _CountingHTTPConnectionPool(_CountingPool, HTTPConnectionPool):
+    pass
+
+
+class _CountingHTTPSConnectionPool(_CountingPool, HTTPSConnectionPool):
+    pass
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter：连接池带统计"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+_ADAPTERS = {}
+_ADAPTERS_LOCK = threading.Lock()
+
+
+def _adapter(host=None) -> PooledAdapter:
+    """host 专用适配器（进程内共享）；host=None 为其他 host 共用的默认适配器"""
+    with _ADAPTERS_LOCK:
+        a = _ADAPTERS.get(host)
+        if a is None:
+            size = HOST_POOLS.get(host, DEFAULT_POOL)
+            a = _ADAPTERS[host] = PooledAdapter(
+                pool_connections=1 if host else 10, pool_maxsize=size,
+                max_retries=retry_policy(HOST_RETRY_STATUS.get(host, RETRY_STATUS)))
+        return a
+
+
+class PooledSession(requests.Session):
+    """
+    挂载共享适配器的 Session：请求头、Cookie 各自独立，连接池进程内共享。
+    未指定 timeout / verify 时使用 TIMEOUT 与 certifi。
+    """
+
+    def __init__(self, headers=None):
+        super().__init__()
+        if headers:
+            self.headers.update(headers)
+        self.mount("https://", _adapter())
+        self.mount("http://", _adapter())
+        for host in HOST_POOLS:
+            self.mount(f"https://{host}/", _adapter(host))
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = TIMEOUT
+        kwargs.setdefault("verify", certifi.where())
+        return super().request(method, url, **kwargs)
+
+    def close(self):
+        # 适配器与连接池由进程内所有 Session 共享，不随单个 Session 关闭
+        pass
+
+
+def session(headers=None) -> PooledSession:
+    return PooledSession(headers)
+
+
+# Trakt API 共用的 Session（搜索、ID 查询、/sync 写入、OAuth）
+TRAKT = session({"User-Agent": "Mozilla/5.0"})
@@ -3,16 +3,20 @@ import argparse
 import csv
 import json
 import os
+import sys
 import time
 from datetime import datetime, timezone, timedelta
 
-import requests
-import certifi
+from requests.exceptions import Timeout
+
+from common.batch_size import AdaptiveBatchSize
+from common.trakt_rate import LIMITER
+from common.transport import TRAKT, CONNECT_TIMEOUT, STATS
 
 # ========= 默认配置（可被命令行覆盖/或用 token.json）=========
 TRAKT_CLIENT_ID_DEFAULT = ""
 TRAKT_ACCESS_TOKEN_FALLBACK = ""
-BATCH_SIZE = 80
+BATCH_SIZE = 80  # 初始批大小，提交时按响应耗时与失败情况自动调整
 REQUEST_TIMEOUT = 30
 # =========================================================
 
@@ -52,6 +56,7 @@ def convert_local_cn_to_utc_iso(dt_str: str) -> str | None:
 
 
 def post_trakt_sync(endpoint: str, payload: dict, access_token: str, client_id: str):
+    """经共享限速器发送：按 POST 额度排队，429 时等 Retry-After 后自动重发"""
     url = f"https://api.trakt.tv/sync/{endpoint}"
     headers = {
         "Content-Type": "application/json",
@@ -60,11 +65,42 @@ def post_trakt_sync(endpoint: str, payload: dict, access_token: str, client_id:
         "trakt-api-key": client_id,
         "User-Agent": "Mozilla/5.0",
     }
-    r = requests.post(
-        url, headers=headers, json=payload,
-        verify=certifi.where(), timeout=REQUEST_TIMEOUT
-    )
-    return r
+    return LIMITER.call("POST", lambda: TRAKT.post(
+        url, headers=headers, json=payload, timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT)
+    ))
+
+
+def post_batch(sizer, label: str, endpoint: str, payload: dict, n_items: int, access_token: str, client_id: str):
+    """
+    提交一批并把耗时、字节数与结果反馈给 sizer；返回是否成功（2xx）。
+    失败（请求异常、读超时、5xx）时不重发：Trakt 可能已经写入，重发会产生重复的观看记录，
+    由调用方记下该批条目，结束时写出未确认的行。
+    """
+    nbytes = len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    t = time.monotonic()
+    try:
+        r = post_trakt_sync(endpoint, payload, access_token, client_id)
+    except Exception as e:
+        sizer.record(n_items, nbytes, time.monotonic() - t, None, timeout=isinstance(e, Timeout))
+        print(f"[{label}] 请求失败：{e}")
+        return False
+    elapsed = r.elapsed.total_seconds() if getattr(r, "elapsed", None) else time.monotonic() - t
+    sizer.record(n_items, nbytes, elapsed, r.status_code)
+    print(f"[{label}] -> {r.status_code} {r.text[:200]}")
+    return 200 <= r.status_code < 300
+
+
+def write_unsent(csv_path: str, rows, keys, unsent) -> str:
+    """把未确认写入的条目对应的原始行写到 <csv>.unsent.csv（可直接用 --csv 重跑），返回路径"""
+    base, _ = os.path.splitext(csv_path)
+    path = base + ".unsent.csv"
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        w.writeheader()
+        for row, key in zip(rows, keys):
+            if key is not None and key in unsent:
+                w.writerow(row)
+    return path
 
 
 def read_csv_rows(path: str):
@@ -130,8 +166,10 @@ def migrate_from_csv(args):
     movies = []
     show_seasons = []
     show_whole = []
+    keys = []  # 每行对应的条目（未导入的行为 None），失败时据此找回原始行
 
     for row in rows:
+        keys.append(None)
         # 仅导入 found==1 的匹配结果（避免误写）
         found = (row.get("found") or "").strip()
         if found not in ("1", "true", "True", "yes", "Y"):
@@ -148,11 +186,14 @@ def migrate_from_csv(args):
         watched_iso = convert_local_cn_to_utc_iso(dt_local)
 
         if typ == "movie":
+            keys[-1] = ("movie", slug, watched_iso)
             movies.append((slug, watched_iso))
         elif typ == "show":
             if season and season.isdigit():
+                keys[-1] = ("season", slug, int(season), watched_iso)
                 show_seasons.append((slug, int(season), watched_iso))
             else:
+                keys[-1] = ("show", slug, watched_iso)
                 show_whole.append((slug, watched_iso))
         # 其他类型忽略
 
@@ -172,23 +213,27 @@ def migrate_from_csv(args):
             print(json.dumps({"shows": preview}, indent=2, ensure_ascii=False))
         return
 
-    # 真正提交
+    # 真正提交；失败批次的条目记入 unsent
+    sizer = AdaptiveBatchSize(initial=BATCH_SIZE)
+    unsent = set()
+
+    def submit(label, endpoint, payload, group, kind=None):
+        """kind 为 None 时 group 中已是带类型的条目"""
+        if not post_batch(sizer, label, endpoint, payload, len(group), access_token, client_id):
+            unsent.update(it if kind is None else (kind,) + it for it in group)
+
     if args.type == "watched":
-        for group in chunks(movies, BATCH_SIZE):
+        for group in sizer.batches(movies):
             payload = {"movies": build_movie_entries(group, watched_mode=True)}
-            r = post_trakt_sync("history", payload, access_token, client_id)
-            print(f"[history/movies] -> {r.status_code} {r.text[:200]}")
-            time.sleep(1.2)
+            submit("history/movies", "history", payload, group, "movie")
 
-        for group in chunks(show_seasons, BATCH_SIZE):
+        for group in sizer.batches(show_seasons):
             payload = {"shows": build_show_season_entries(group, watched_mode=True)}
-            r = post_trakt_sync("history", payload, access_token, client_id)
-            print(f"[history/shows(seasons)] -> {r.status_code} {r.text[:200]}")
-            time.sleep(1.2)
+            submit("history/shows(seasons)", "history", payload, group, "season")
 
         if show_whole:
             print("无季号的 show 以 show 级别写入 history 可能不生效（建议补季号后再导入）。")
-            for group in chunks(show_whole, BATCH_SIZE):
+            for group in sizer.batches(show_whole):
                 entries = []
                 for slug, w in group:
                     obj = {"ids": {"slug": slug}}
@@ -196,26 +241,30 @@ def migrate_from_csv(args):
                         obj["watched_at"] = w
                     entries.append(obj)
                 payload = {"shows": entries}
-                r = post_trakt_sync("history", payload, access_token, client_id)
-                print(f"[history/shows(no-season)] -> {r.status_code} {r.text[:200]}")
-                time.sleep(1.2)
+                submit("history/shows(no-season)", "history", payload, group, "show")
 
     else:  # watchlist
-        for group in chunks(movies, BATCH_SIZE):
+        for group in sizer.batches(movies):
             payload = {"movies": build_movie_entries(group, watched_mode=False)}
-            r = post_trakt_sync("watchlist", payload, access_token, client_id)
-            print(f"[watchlist/movies] -> {r.status_code} {r.text[:200]}")
-            time.sleep(1.2)
+            submit("watchlist/movies", "watchlist", payload, group, "movie")
 
-        shows_all = [(slug, w) for (slug, _, w) in show_seasons] + show_whole
-        for group in chunks(shows_all, BATCH_SIZE):
-            entries = [{"ids": {"slug": slug}} for slug, _ in group]
+        shows_all = [("season",) + it for it in show_seasons] + [("show",) + it for it in show_whole]
+        for group in sizer.batches(shows_all):
+            entries = [{"ids": {"slug": it[1]}} for it in group]
             payload = {"shows": entries}
-            r = post_trakt_sync("watchlist", payload, access_token, client_id)
-            print(f"[watchlist/shows] -> {r.status_code} {r.text[:200]}")
-            time.sleep(1.2)
-
+            submit("watchlist/shows", "watchlist", payload, group)
+
+    print(sizer.summary())
+    print(LIMITER.summary())
+    print(STATS.summary())
+    if unsent:
+        n = sum(1 for k in keys if k is not None and k in unsent)
+        path = write_unsent(args.csv, rows, keys, unsent)
+        print(f"同步未完成：{n} 行未确认写入（请求失败、超时或 5xx，其中部分可能已写入）。")
+        print(f"这些行已写入 {path}，核对 Trakt 后可用 --csv 重新提交。")
+        return n
     print("同步完成。")
+    return 0
 
 
 def main():
@@ -230,7 +279,7 @@ def main():
 
     p.add_argument("--dry-run", action="store_true", help="只生成 payload，不写入 Trakt")
     args = p.parse_args()
-    migrate_from_csv(args)
+    sys.exit(1 if migrate_from_csv(args) else 0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CSV 行模型对照 + 基准：common.rows.Row（__slots__、读入时去空白 / intern / 解析时间）
+vs 原 csv.DictReader 的 dict 行（每次使用时 strip + strptime）。
+
+  python bench_rows.py                      # 生成 100000 行仿真 CSV
+  python bench_rows.py --rows 500000
+  python bench_rows.py --csv movie.csv      # 用导出的 CSV（含 found/slug 列）
+
+先逐行比对导入阶段得到的 (kind, item)，不一致则列出并以非 0 退出；
+再分别报告：读入耗时、常驻内存（tracemalloc，每行字节数）、读入 + 转换为 /sync 条目的耗时、写回 CSV 的耗时。
+"""
+import sys, os, csv, time, random, argparse, tempfile, tracemalloc
+
+from io_csv import iter_csv_rows
+from importer import row_item
+from time_utils import convert_local_cn_to_utc_iso
+from common.rows import EXPORT_FIELDS, write_rows
+
+FIELDS=list(EXPORT_FIELDS)
+
+# ========== 原实现（对照用） ==========
+
+def legacy_read(path):
+    with open(path,"r",encoding="utf-8-sig",newline="") as f:
+        return list(csv.DictReader(f))
+
+def legacy_item(row):
+    found=(row.get("found") or "").strip()
+    if found not in ("1","true","True","yes","Y"): return None
+    slug=(row.get("slug") or "").strip()
+    typ=(row.get("type") or "").strip().lower()
+    season=(row.get("season") or "").strip()
+    dt_local=(row.get("datetime") or "").strip()
+    if not slug or not typ: return None
+    watched_iso=convert_local_cn_to_utc_iso(dt_local)
+    if typ=="movie": return "movie",(slug,watched_iso)
+    if typ=="show":
+        if season and season.isdigit(): return "season",(slug,int(season),watched_iso)
+        return "show",(slug,watched_iso)
+    return None
+
+def legacy_write(f,rows):
+    w=csv.DictWriter(f,fieldnames=FIELDS,extrasaction="ignore")
+    w.writeheader()
+    w.writerows(rows)
+
+# ========== 样本 ==========
+
+def synthesize(path,n,seed=1):
+    rnd=random.Random(seed)
+    with open(path,"w",encoding="utf-8",newline="") as f:
+        w=csv.writer(f)
+        w.writerow(FIELDS)
+        for i in range(n):
+            show=rnd.random()<0.4
+            y,m,d=rnd.randint(2008,2024),rnd.randint(1,12),rnd.randint(1,28)
+            hms=f"{rnd.randint(0,23):02d}:{rnd.randint(0,59):02d}:{rnd.randint(0,59):02d}" if rnd.random()<0.8 else "12:00:00"
+            found=rnd.random()<0.9
+            sid=1000000+i
+            w.writerow([f"标题{i} 第{rnd.randint(1,5)}季" if show else f"电影{i}",f"{y}-{m:02d}-{d:02d}",
+                        f"{y}-{m:02d}-{d:02d} {hms}","show" if show else "movie",
+                        str(rnd.randint(1,8)) if show and rnd.random()<0.8 else "",
+                        f"slug-{i % 20000}" if found else "",f"Title {i}" if found else "",
+                        str(rnd.randint(1950,2024)) if found else "","1" if found else "0",
+                        f"https://movie.douban.com/subject/{sid}/",str(y),f"{rnd.random():.2f}" if found else ""])
+
+# ========== 基准 ==========
+
+def measure_memory(read,path):
+    tracemalloc.start()
+    rows=read(path)
+    cur,_=tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows),cur
+
+def timed(fn,repeat):
+    best=None
+    for _ in range(repeat):
+        t0=time.perf_counter(); fn(); dt=time.perf_counter()-t0
+        best=dt if best is None else min(best,dt)
+    return best
+
+def main():
+    ap=argparse.ArgumentParser(description="CSV 行模型对照与基准")
+    ap.add_argument("--csv",help="读取已有 CSV（默认生成仿真 CSV）")
+    ap.add_argument("--rows",type=int,default=100000,help="仿真 CSV 行数（默认 100000）")
+    ap.add_argument("--repeat",type=int,default=3,help="每项计时取最好的一轮")
+    args=ap.parse_args()
+
+    tmpdir=tempfile.mkdtemp()
+    path=args.csv
+    if not path:
+        path=os.path.join(tmpdir,"rows.csv")
+        synthesize(path,args.rows)
+
+    def row_read(p): return list(iter_csv_rows(p))
+
+    old=[legacy_item(r) for r in legacy_read(path)]
+    new=[row_item(r) for r in row_read(path)]
+    diff=sum(1 for a,b in zip(old,new) if a!=b)+abs(len(old)-len(new))
+    for i,(a,b) in enumerate(zip(old,new)):
+        if a!=b:
+            print(f"[DIFF] 第 {i+2} 行: 原={a} 新={b}")
+            if i>20: break
+    print(f"样本 {len(old)} 行：导入条目一致 {len(old)-diff}，差异 {diff}")
+
+    n,mem_old=measure_memory(legacy_read,path)
+    _,mem_new=measure_memory(row_read,path)
+    read_old=timed(lambda: legacy_read(path),args.repeat)
+    read_new=timed(lambda: row_read(path),args.repeat)
+    conv_old=timed(lambda: [legacy_item(r) for r in legacy_read(path)],args.repeat)
+    conv_new=timed(lambda: [row_item(r) for r in row_read(path)],args.repeat)
+    rows_old,rows_new=legacy_read(path),row_read(path)
+    out=os.path.join(tmpdir,"out.csv")
+    def write(fn,rows):
+        with open(out,"w",encoding="utf-8",newline="") as f: fn(f,rows)
+    write_old=timed(lambda: write(legacy_write,rows_old),args.repeat)
+    write_new=timed(lambda: write(lambda f,rs: write_rows(f,rs,FIELDS),rows_new),args.repeat)
+
+    print(f"{'':16}{'dict':>12}{'Row':>12}")
+    print(f"  {'内存 (B/行)':<14}{mem_old/n:12.0f}{mem_new/n:12.0f}   {mem_old/mem_new:5.2f}x")
+    for name,a,b in (("读入 (行/s)",read_old,read_new),("读入+转换",conv_old,conv_new),("写回 (行/s)",write_old,write_new)):
+        print(f"  {name:<14}{n/a:12.0f}{n/b:12.0f}   {a/b:5.2f}x")
+    if diff: sys.exit(1)
+
+if __name__=="__main__":
+    main()
@@ -2,6 +2,7 @@
 import argparse
 from config import get_trakt_credentials
 from importer import migrate_from_csv
+from executor import DEFAULT_CONCURRENCY
 
 def main():
     p = argparse.ArgumentParser(description="根据 CSV（经人工校对过的匹配结果）同步到 Trakt")
@@ -11,6 +12,17 @@ def main():
     p.add_argument("--trakt-client-id", default=None, help="Trakt Client ID（未提供则读环境变量 TRAKT_CLIENT_ID）")
     p.add_argument("--trakt-token", default=None, help="Trakt Access Token（未提供则读环境变量 TRAKT_ACCESS_TOKEN 或 token.json）")
     p.add_argument("--dry-run", action="store_true", help="只生成 payload，不写入 Trakt")
+    p.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                   help="同时在途的 /sync 批次数（默认 1，逐批顺序提交；总速率仍受 Trakt 额度限制）")
+    p.add_argument("--diff", action="store_true",
+                   help="先拉取账号已有记录，只提交 Trakt 上还没有的行（默认不比对，所有 found=1 的行都提交；--dry-run 时不生效）")
+    p.add_argument("--journal", default=None, help="同步日志路径（默认 <csv>.journal.sqlite）；重跑时跳过已确认的条目")
+    p.add_argument("--no-journal", action="store_true", help="不读写同步日志")
+    p.add_argument("--fixed-batch", action="store_true", help="固定每批 80 条，不按响应耗时自动调整批大小")
+    p.add_argument("--no-pack", action="store_true",
+                   help="电影、分季剧集、整剧各自分批提交（默认整份文件按剧合并季，电影与剧集混装进同一请求）")
+    p.add_argument("--stream", action="store_true",
+                   help="流式导入：边读 CSV 边提交，内存占用与文件大小无关（适合超大 CSV）")
     args = p.parse_args()
 
     client_id, token = get_trakt_credentials(args.trakt_client_id, args.trakt_token)
@@ -20,7 +32,10 @@ def main():
         # watchlist 写入可不带 token？（Trakt 也需要授权，这里统一要求）
         raise SystemExit("缺少 Trakt Access Token。请使用 --trakt-token、设置环境变量 TRAKT_ACCESS_TOKEN，或提供 token.json。")
 
-    migrate_from_csv(args.csv, args.type, client_id, token, args.dry_run)
+    migrate_from_csv(args.csv, args.type, client_id, token, args.dry_run, args.concurrency,
+                     diff=args.diff, journal_path=args.journal, use_journal=not args.no_journal,
+                     adaptive=not args.fixed_batch, stream=args.stream,
+                     pack=not args.no_pack)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+/sync 批次提交：最多 concurrency 个 POST 同时在途（额度由 common.trakt_rate 统一限速），
+确定没有送达的批次（连接失败、429）退避重发，结束时汇总各批次响应里的 added / existing / not_found。
+/sync/history 的 POST 不是幂等的：读超时或 5xx 时 Trakt 可能已经写入，重发会产生重复的观看记录，
+因此这类批次不重发，直接记为失败，交给同步日志在下次运行时处理（差量同步会先核对账号上已有的记录）。
+concurrency=1 时与逐批顺序提交一致。
+传入 sizer（common.batch_size.AdaptiveBatchSize）时，每次请求的耗时、字节数与结果都反馈给它。
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.exceptions import ConnectionError, ConnectTimeout, Timeout
+from urllib3.exceptions import NewConnectionError
+
+from trakt import post_trakt_sync
+
+DEFAULT_CONCURRENCY = 1
+MAX_RETRIES = 3
+BACKOFF = 2.0
+
+
+def _count(section) -> int:
+    """{"movies": 3, "episodes": 10} 或 {"movies": [...], ...} → 条目总数"""
+    total = 0
+    for v in (section or {}).values():
+        total += len(v) if isinstance(v, list) else (v if isinstance(v, int) else 0)
+    return total
+
+
+def parse_sync_response(r) -> dict:
+    """/sync/history、/sync/watchlist 响应 → {"added", "existing", "not_found"}"""
+    try:
+        data = r.json() or {}
+    except Exception:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    return {k: _count(data.get(k)) for k in ("added", "existing", "not_found")}
+
+
+def _retryable(status: int) -> bool:
+    # 429 表示请求被拒绝、没有处理，可以安全重发（限速器已按 Retry-After 重发过，仍为 429 时再退避）；
+    # 5xx 时服务器可能已经写入，不重发
+    return status == 429
+
+
+def _undelivered(e: Exception) -> bool:
+    """请求确定没有送达：连接超时，或建立连接失败（DNS 解析、拒绝连接）"""
+    if isinstance(e, ConnectTimeout):
+        return True
+    if isinstance(e, ConnectionError):
+        reason = e.args[0] if e.args else None
+        return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+    return False
+
+
+class SyncExecutor:
+    """
+    用法：
+        with SyncExecutor(access_token, client_id, concurrency=4) as ex:
+            ex.submit("history/movies", "history", payload, on_done=...)
+        print(ex.summary())
+    """
+
+    def __init__(self, access_token: str, client_id: str, concurrency: int = DEFAULT_CONCURRENCY,
+                 max_retries: int = MAX_RETRIES, backoff: float = BACKOFF, sizer=None):
+        self.access_token = access_token
+        self.sizer = sizer
+        self.client_id = client_id
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.batches = 0
+        self.failed = 0
+        self.retried = 0
+        self.totals = {"added": 0, "existing": 0, "not_found": 0}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        self._futures = []
+        self._started = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, label: str, endpoint: str, payload: dict, on_done=None, items: int = 0):
+        """
+        在途批次已满时阻塞，直到有批次完成。
+        on_done(r) 在批次结束后调用，r 为最终响应（请求失败时为 None）；items 为该批条目数（反馈给 sizer）。
+        """
+        self._slots.acquire()
+        try:
+            fut = self._pool.submit(self._run, label, endpoint, payload, on_done, items)
+        except Exception:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        # 只保留未完成的 future，流式提交时不随批次数增长；已完成的先取结果以抛出 on_done 中的异常
+        pending = []
+        for f in self._futures:
+            if f.done():
+                f.result()
+            else:
+                pending.append(f)
+        pending.append(fut)
+        self._futures = pending
+
+    def _post(self, label, endpoint, payload, items=0):
+        """
+        返回 (响应或 None, 已重试次数)；只有确定没有送达的请求（连接失败、429）按 backoff * 2^n 退避重发，
+        读超时、连接中断与 5xx 直接返回，批次记为失败
+        """
+        nbytes = len(json.dumps(payload, ensure_ascii=False).encode("utf-8")) if self.sizer else 0
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff * (2 ** (attempt - 1)))
+            t = time.monotonic()
+            try:
+                r = post_trakt_sync(endpoint, payload, self.access_token, self.client_id)
+            except Exception as e:
+                if self.sizer:
+                    self.sizer.record(items, nbytes, time.monotonic() - t, None, timeout=isinstance(e, Timeout))
+                print(f"[{label}] 请求失败：{e}")
+                if not _undelivered(e):
+                    print(f"[{label}] 请求可能已送达，不重发（避免重复写入）；下次运行时会重新核对")
+                    return None, attempt
+                if attempt == self.max_retries:
+                    return None, attempt
+                continue
+            if self.sizer:
+                # 用服务器响应耗时（不含限速排队）；没有时退回总耗时
+                elapsed = r.elapsed.total_seconds() if getattr(r, "elapsed", None) else time.monotonic() - t
+                self.sizer.record(items, nbytes, elapsed, r.status_code)
+            if r.status_code >= 500:
+                print(f"[{label}] -> {r.status_code}，请求可能已被处理，不重发（避免重复写入）；下次运行时会重新核对")
+            if not _retryable(r.status_code) or attempt == self.max_retries:
+                return r, attempt
+            print(f"[{label}] -> {r.status_code}，{self.backoff * (2 ** attempt):.1f}s 后重试")
+        return None, self.max_retries
+
+    def _run(self, label, endpoint, payload, on_done=None, items=0):
+        r, retried = self._post(label, endpoint, payload, items)
+        if on_done is not None:
+            on_done(r)
+        ok = r is not None and 200 <= r.status_code < 300
+        counts = parse_sync_response(r) if ok else {}
+        with self._lock:
+            self.batches += 1
+            self.retried += retried
+            if ok:
+                for k, v in counts.items():
+                    self.totals[k] += v
+                print(f"[{label}] -> {r.status_code} added={counts['added']} existing={counts['existing']} "
+                      f"not_found={counts['not_found']}")
+            else:
+                self.failed += 1
+                detail = f"{r.status_code} {r.text[:200]}" if r is not None else "无响应"
+                print(f"[{label}] 失败 -> {detail}")
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        for fut in self._futures:
+            fut.result()
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self._started
+        t = self.totals
+        return (f"同步汇总：{self.batches} 批（并发 {self.concurrency}，失败 {self.failed}，重试 {self.retried} 次），"
+                f"added={t['added']} existing={t['existing']} not_found={t['not_found']}，用时 {elapsed:.1f}s")
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+差量同步：提交前批量拉取账号在 Trakt 上已有的记录，建内存索引，只提交缺少的行。
+
+- watched：/sync/history/movies、/sync/history/episodes（分页）按 (slug, watched_at)
+  与 (slug, season, watched_at) 建索引；/sync/watched/movies、/sync/watched/shows
+  记录看过的 slug 与 (slug, season)，供没有观看时间的行判断；
+- watchlist：/sync/watchlist/movies、/sync/watchlist/shows 中的 slug。
+watched_at 统一换算到 UTC、精确到秒后比较。
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from trakt import get_trakt_sync
+
+PAGE_LIMIT = 1000
+WORKERS = 4
+_SKIP_KEYS = {"movie": "movies", "season": "show(seasons)", "show": "show(no-season)"}
+
+
+def _second(iso: str | None) -> str | None:
+    """ISO8601（'...Z' / '+00:00'，可带毫秒）→ 'YYYY-MM-DDTHH:MM:SS'（UTC）"""
+    if not iso:
+        return None
+    try:
+        dt = datetime.fromisoformat(iso.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _slug(obj) -> str | None:
+    return ((obj or {}).get("ids") or {}).get("slug")
+
+
+class HistoryIndex:
+    """账号已有记录的索引；load() 构建，filter() 去掉已存在的行"""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.movie_plays = set()    # (slug, second)
+        self.episode_plays = set()  # (slug, season, second)
+        self.show_plays = set()     # (slug, second)
+        self.movies = set()
+        self.seasons = set()        # (slug, season)
+        self.shows = set()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.skipped = {"movies": 0, "show(seasons)": 0, "show(no-season)": 0}
+
+    # ---------- 拉取 ----------
+    def _get(self, path: str, params, access_token: str, client_id: str):
+        r = get_trakt_sync(path, params, access_token, client_id)
+        with self._lock:
+            self.requests += 1
+        if r.status_code != 200:
+            raise RuntimeError(f"拉取 /sync/{path} 失败：{r.status_code} {r.text[:200]}")
+        return r
+
+    def _pages(self, path: str, access_token: str, client_id: str):
+        """分页 GET：第 1 页读出 X-Pagination-Page-Count，其余页并发拉取"""
+        def page(n):
+            return self._get(path, {"page": n, "limit": PAGE_LIMIT}, access_token, client_id)
+
+        first = page(1)
+        items = list(first.json() or [])
+        try:
+            count = int(first.headers.get("X-Pagination-Page-Count") or 1)
+        except ValueError:
+            count = 1
+        if count > 1:
+            with ThreadPoolExecutor(max_workers=WORKERS) as ex:
+                for r in ex.map(page, range(2, count + 1)):
+                    items.extend(r.json() or [])
+        return items
+
+    @classmethod
+    def load(cls, mode: str, access_token: str, client_id: str) -> "HistoryIndex":
+        idx = cls(mode)
+        if mode == "watchlist":
+            for it in idx._pages("watchlist/movies", access_token, client_id):
+                idx.movies.add(_slug(it.get("movie")))
+            for it in idx._pages("watchlist/shows", access_token, client_id):
+                idx.shows.add(_slug(it.get("show")))
+            return idx
+
+        for it in idx._pages("history/movies", access_token, client_id):
+            idx.movie_plays.add((_slug(it.get("movie")), _second(it.get("watched_at"))))
+        for it in idx._pages("history/episodes", access_token, client_id):
+            slug, sec = _slug(it.get("show")), _second(it.get("watched_at"))
+            idx.episode_plays.add((slug, (it.get("episode") or {}).get("season"), sec))
+            idx.show_plays.add((slug, sec))
+        for it in idx._get("watched/movies", None, access_token, client_id).json() or []:
+            idx.movies.add(_slug(it.get("movie")))
+        for it in idx._get("watched/shows", None, access_token, client_id).json() or []:
+            slug = _slug(it.get("show"))
+            idx.shows.add(slug)
+            for season in it.get("seasons") or []:
+                idx.seasons.add((slug, season.get("number")))
+        return idx
+
+    # ---------- 判断 ----------
+    def has_movie(self, slug: str, watched_iso: str | None) -> bool:
+        if self.mode == "watched" and watched_iso:
+            return (slug, _second(watched_iso)) in self.movie_plays
+        return slug in self.movies
+
+    def has_season(self, slug: str, season: int, watched_iso: str | None) -> bool:
+        if self.mode == "watchlist":
+            return slug in self.shows
+        if watched_iso:
+            return (slug, season, _second(watched_iso)) in self.episode_plays
+        return (slug, season) in self.seasons
+
+    def has_show(self, slug: str, watched_iso: str | None) -> bool:
+        if self.mode == "watched" and watched_iso:
+            return (slug, _second(watched_iso)) in self.show_plays
+        return slug in self.shows
+
+    def has(self, kind: str, item) -> bool:
+        """kind: "movie" (slug, w) / "season" (slug, season, w) / "show" (slug, w)；命中时计入 skipped"""
+        hit = {"movie": self.has_movie, "season": self.has_season, "show": self.has_show}[kind](*item)
+        if hit:
+            self.skipped[_SKIP_KEYS[kind]] += 1
+        return hit
+
+    def filter(self, movies, show_seasons, show_whole):
+        """返回 (movies, show_seasons, show_whole) 中 Trakt 上还没有的部分，跳过数记入 skipped"""
+        kept_movies = [(s, w) for s, w in movies if not self.has_movie(s, w)]
+        kept_seasons = [(s, n, w) for s, n, w in show_seasons if not self.has_season(s, n, w)]
+        kept_whole = [(s, w) for s, w in show_whole if not self.has_show(s, w)]
+        self.skipped = {
+            "movies": len(movies) - len(kept_movies),
+            "show(seasons)": len(show_seasons) - len(kept_seasons),
+            "show(no-season)": len(show_whole) - len(kept_whole),
+        }
+        return kept_movies, kept_seasons, kept_whole
+
+    def summary(self) -> str:
+        s = self.skipped
+        return (f"差量同步：已在 Trakt 的条目跳过 movies={s['movies']}，show(seasons)={s['show(seasons)']}，"
+                f"show(no-season)={s['show(no-season)']}（拉取 {self.requests} 个请求）")
@@ -1,96 +1,235 @@
 # -*- coding: utf-8 -*-
-from io_csv import read_csv_rows, chunks
-from time_utils import convert_local_cn_to_utc_iso
+import json
+
+from io_csv import read_csv_rows, iter_csv_rows
 from trakt import (
-    post_trakt_sync, build_movie_entries, build_show_season_entries, preview_payload
+    build_movie_entries, preview_payload, LIMITER, STATS
 )
-import time
+from executor import SyncExecutor, DEFAULT_CONCURRENCY
+from history import HistoryIndex
+from journal import SyncJournal, default_path, item_hash
+from packer import build_units, count_requests, pack as pack_batches, season_entries
+from common.batch_size import AdaptiveBatchSize  # io_csv / trakt 导入时已把项目根目录加入 sys.path
+from common.rows import iso_utc
 
-BATCH_SIZE = 80
+BATCH_SIZE = 80  # 初始批大小，之后按响应耗时与失败情况自动调整（见 common/batch_size.py）
+KINDS = ("movie", "season", "show")
 
-def migrate_from_csv(csv_path: str, mode: str, client_id: str, access_token: str, dry_run: bool):
+def row_item(row):
+    """
+    CSV 行（common.rows.Row，各列已去空白、datetime 已解析为 ts）→ (kind, item)：
+      ("movie", (slug, watched_iso)) / ("season", (slug, season, watched_iso)) / ("show", (slug, watched_iso))
+    不导入的行返回 None。
+    """
+    # 仅导入 found==1 的匹配结果（避免误写）
+    if row.found not in ("1", "true", "True", "yes", "Y"):
+        return None
+
+    slug = row.slug
+    typ = row.type.lower()
+    if not slug or not typ:
+        return None
+
+    watched_iso = iso_utc(row.ts)
+
+    if typ == "movie":
+        return "movie", (slug, watched_iso)
+    if typ == "show":
+        if row.season.isdigit():
+            return "season", (slug, int(row.season), watched_iso)
+        return "show", (slug, watched_iso)
+    return None
+
+def item_key(mode: str, kind: str, item) -> str:
+    """同步日志中的条目哈希；watchlist 只按 show / movie 写入，季号与时间不参与"""
+    watched = mode == "watched"
+    if kind == "season":
+        return item_hash(mode, "season", *item) if watched else item_hash(mode, "show", item[0])
+    return item_hash(mode, kind, item[0], None, item[-1] if watched else None)
+
+def build_batch(mode: str, kind: str, group):
+    """一批同类条目 → (label, endpoint, payload, [(hash, slug), ...])"""
+    watched = mode == "watched"
+    endpoint = "history" if watched else "watchlist"
+    if kind == "movie":
+        label, payload = "movies", {"movies": build_movie_entries(group, watched_mode=watched)}
+    elif kind == "season" and watched:
+        entries = season_entries(group, lambda k, it: item_key(mode, k, it))
+        label, payload = "shows(seasons)", {"shows": [e for e, _ in entries]}
+        return f"{endpoint}/{label}", endpoint, payload, [kv for _, keyed in entries for kv in keyed]
+    else:
+        entries = []
+        for it in group:
+            obj = {"ids": {"slug": it[0]}}
+            if watched and it[-1]:
+                obj["watched_at"] = it[-1]
+            entries.append(obj)
+        label, payload = ("shows(no-season)" if watched else "shows"), {"shows": entries}
+    return f"{endpoint}/{label}", endpoint, payload, [(item_key(mode, kind, it), it[0]) for it in group]
+
+def _summary_line(prefix, items):
+    return (f"{prefix}movies={len(items['movie'])}，show(seasons)={len(items['season'])}，"
+            f"show(no-season)={len(items['show'])}")
+
+def migrate_from_csv(csv_path: str, mode: str, client_id: str, access_token: str, dry_run: bool,
+                     concurrency: int = DEFAULT_CONCURRENCY, diff: bool = False,
+                     journal_path: str | None = None, use_journal: bool = True, adaptive: bool = True,
+                     stream: bool = False, pack: bool = True):
     """
     mode: "watched" | "watchlist"
+    concurrency: 同时在途的 /sync 批次数（1 为逐批顺序提交）
+    diff: 先拉取账号已有记录，只提交 Trakt 上还没有的行（需要 access_token；dry_run 时不联网，不比对）
+    journal_path / use_journal: 同步日志（默认 <csv>.journal.sqlite），重跑时跳过已确认的条目
+    adaptive: 按响应耗时、payload 大小与失败情况调整批大小；False 时固定 BATCH_SIZE
+    stream: 边读 CSV 边提交，内存只保留未满的批次与在途批次（超大 CSV 用）
+    pack: 整份文件按剧合并季，电影与剧集混装进同一请求（见 packer.py）；stream 时不适用
     """
+    index = None
+    if diff and dry_run:
+        print("DRY-RUN 不请求 Trakt，跳过差量比对。")
+    elif diff and access_token:
+        print("拉取 Trakt 上已有的记录（差量同步）...")
+        index = HistoryIndex.load(mode, access_token, client_id)
+    journal = SyncJournal(journal_path or default_path(csv_path), enabled=use_journal)
+    sizer = AdaptiveBatchSize(initial=BATCH_SIZE, adaptive=adaptive)
+
+    if stream:
+        _migrate_stream(csv_path, mode, client_id, access_token, dry_run, concurrency, index, journal, sizer)
+        return
+
     rows = read_csv_rows(csv_path)
     print(f"已读取 CSV：{csv_path}，共 {len(rows)} 条。")
 
-    movies = []
-    show_seasons = []
-    show_whole = []
-
+    items = {kind: [] for kind in KINDS}
     for row in rows:
-        # 仅导入 found==1 的匹配结果（避免误写）
-        found = (row.get("found") or "").strip()
-        if found not in ("1", "true", "True", "yes", "Y"):
-            continue
+        hit = row_item(row)
+        if hit:
+            items[hit[0]].append(hit[1])
 
-        slug = (row.get("slug") or "").strip()
-        typ = (row.get("type") or "").strip().lower()
-        season = (row.get("season") or "").strip()
-        dt_local = (row.get("datetime") or "").strip()
+    print(_summary_line("汇总：", items))
 
-        if not slug or not typ:
-            continue
+    if index is not None:
+        items["movie"], items["season"], items["show"] = index.filter(items["movie"], items["season"], items["show"])
+        print(index.summary())
+        print(_summary_line("待提交：", items))
 
-        watched_iso = convert_local_cn_to_utc_iso(dt_local)
+    done = journal.done([item_key(mode, kind, it) for kind in KINDS for it in items[kind]])
+    if done:
+        total = sum(len(v) for v in items.values())
+        for kind in KINDS:
+            items[kind] = [it for it in items[kind] if item_key(mode, kind, it) not in done]
+        journal.skipped = total - sum(len(v) for v in items.values())
+        print(_summary_line(f"同步日志：跳过已确认的 {journal.skipped} 条，待提交 ", items))
 
-        if typ == "movie":
-            movies.append((slug, watched_iso))
-        elif typ == "show":
-            if season and season.isdigit():
-                show_seasons.append((slug, int(season), watched_iso))
-            else:
-                show_whole.append((slug, watched_iso))
-
-    print(f"汇总：movies={len(movies)}，show(seasons)={len(show_seasons)}，show(no-season)={len(show_whole)}")
+    units = build_units(mode, items, lambda kind, it: item_key(mode, kind, it)) if pack else None
 
     if dry_run:
         print("DRY-RUN 预览：")
-        print(preview_payload(movies, show_seasons, show_whole, mode))
+        print(preview_payload(items["movie"], items["season"], items["show"], mode))
+        if units is not None:
+            print(f"打包：{count_requests(mode, units, sizer)} 个请求（按类型分别提交需 {_split_requests(mode, items)} 个）")
+        journal.close()
         return
 
-    # 提交
-    if mode == "watched":
-        for group in chunks(movies, BATCH_SIZE):
-            payload = {"movies": build_movie_entries(group, watched_mode=True)}
-            r = post_trakt_sync("history", payload, access_token, client_id)
-            print(f"[history/movies] -> {r.status_code} {r.text[:200]}")
-            time.sleep(1.2)
-
-        for group in chunks(show_seasons, BATCH_SIZE):
-            payload = {"shows": build_show_season_entries(group, watched_mode=True)}
-            r = post_trakt_sync("history", payload, access_token, client_id)
-            print(f"[history/shows(seasons)] -> {r.status_code} {r.text[:200]}")
-            time.sleep(1.2)
-
-        if show_whole:
-            print("无季号的 show 以 show 级别写入 history 可能不生效（建议补季号后再导入）。")
-            for group in chunks(show_whole, BATCH_SIZE):
-                entries = []
-                for slug, w in group:
-                    obj = {"ids": {"slug": slug}}
-                    if w:
-                        obj["watched_at"] = w
-                    entries.append(obj)
-                payload = {"shows": entries}
-                r = post_trakt_sync("history", payload, access_token, client_id)
-                print(f"[history/shows(no-season)] -> {r.status_code} {r.text[:200]}")
-                time.sleep(1.2)
-
-    else:  # watchlist
-        for group in chunks(movies, BATCH_SIZE):
-            payload = {"movies": build_movie_entries(group, watched_mode=False)}
-            r = post_trakt_sync("watchlist", payload, access_token, client_id)
-            print(f"[watchlist/movies] -> {r.status_code} {r.text[:200]}")
-            time.sleep(1.2)
-
-        shows_all = [(slug, w) for (slug, _, w) in show_seasons] + show_whole
-        for group in chunks(shows_all, BATCH_SIZE):
-            entries = [{"ids": {"slug": slug}} for slug, _ in group]
-            payload = {"shows": entries}
-            r = post_trakt_sync("watchlist", payload, access_token, client_id)
-            print(f"[watchlist/shows] -> {r.status_code} {r.text[:200]}")
-            time.sleep(1.2)
-
-    print("同步完成。")
\ No newline at end of file
+    if mode == "watched" and items["show"]:
+        print("无季号的 show 以 show 级别写入 history 可能不生效（建议补季号后再导入）。")
+
+    # 提交：最多 concurrency 个批次同时在途；每批先登记到同步日志，响应后逐条记结果
+    with SyncExecutor(access_token, client_id, concurrency, sizer=sizer) as ex:
+        if units is not None:
+            for batch in pack_batches(mode, units, sizer):
+                _submit(ex, journal, *batch)
+        else:
+            if mode == "watchlist":
+                # watchlist 只按 show 写入：带季号与不带季号的合成一组
+                items["show"], items["season"] = items["season"] + items["show"], []
+            for kind in KINDS:
+                for group in sizer.batches(items[kind]):
+                    _submit(ex, journal, *build_batch(mode, kind, group))
+
+    _finish(ex, sizer, journal)
+
+def _split_requests(mode, items):
+    """不打包时（每类各自按 BATCH_SIZE 分批）的请求数"""
+    sizes = [len(items["movie"]), len(items["season"]), len(items["show"])]
+    if mode == "watchlist":
+        sizes = [sizes[0], sizes[1] + sizes[2]]
+    return sum(-(-n // BATCH_SIZE) for n in sizes)
+
+def _submit(ex, journal, label, endpoint, payload, keyed, weight=None):
+    """weight：反馈给批大小的条目数，默认为 CSV 条目数"""
+    batch_id = journal.begin(endpoint, label, keyed)
+    ex.submit(label, endpoint, payload, on_done=lambda r: journal.finish(batch_id, keyed, r),
+              items=len(keyed) if weight is None else weight)
+
+def _finish(ex, sizer, journal):
+    print(ex.summary())
+    print(sizer.summary())
+    if journal.enabled:
+        print(journal.summary())
+    journal.close()
+    print(LIMITER.summary())
+    print(STATS.summary())
+    print("同步完成。")
+
+def _migrate_stream(csv_path, mode, client_id, access_token, dry_run, concurrency, index, journal, sizer):
+    """
+    流式：逐行读取 → 校验/换算 → 按类型放入待发缓冲，缓冲达到当前批大小就提交，
+    第一批在文件读完之前就已发出。差量索引逐条判断，同步日志在每批提交前批量查询。
+    内存 = 各类型未满的缓冲 + 至多 concurrency 个在途批次。
+    """
+    print(f"流式读取 CSV：{csv_path}")
+    counts = {kind: 0 for kind in KINDS}
+    buffers = {kind: [] for kind in KINDS}
+    previewed = set()
+    warned = False
+
+    with SyncExecutor(access_token, client_id, concurrency, sizer=sizer) as ex:
+        def flush(kind):
+            nonlocal warned
+            group, buffers[kind] = buffers[kind], []
+            done = journal.done([item_key(mode, kind, it) for it in group])
+            if done:
+                kept = [it for it in group if item_key(mode, kind, it) not in done]
+                journal.skipped += len(group) - len(kept)
+                group = kept
+            if not group:
+                return
+            label, endpoint, payload, keyed = build_batch(mode, kind, group)
+            if dry_run:
+                if kind not in previewed:
+                    previewed.add(kind)
+                    print(f"DRY-RUN 预览（{label} 首批 {len(group)} 条）：")
+                    print(json.dumps(payload, indent=2, ensure_ascii=False)[:800])
+                return
+            if kind == "show" and mode == "watched" and not warned:
+                warned = True
+                print("无季号的 show 以 show 级别写入 history 可能不生效（建议补季号后再导入）。")
+            _submit(ex, journal, label, endpoint, payload, keyed)
+
+        for row in iter_csv_rows(csv_path):
+            hit = row_item(row)
+            if not hit:
+                continue
+            kind, it = hit
+            counts[kind] += 1
+            if index is not None and index.has(kind, it):
+                continue
+            if kind == "season" and mode == "watchlist":
+                kind = "show"  # watchlist 只按 show 写入
+            buffers[kind].append(it)
+            if len(buffers[kind]) >= sizer.next_size():
+                flush(kind)
+        for kind in KINDS:
+            if buffers[kind]:
+                flush(kind)
+
+    print(f"汇总：movies={counts['movie']}，show(seasons)={counts['season']}，show(no-season)={counts['show']}")
+    if index is not None:
+        print(index.summary())
+    if journal.skipped:
+        print(f"同步日志：跳过已确认的 {journal.skipped} 条")
+    if dry_run:
+        journal.close()
+        return
+    _finish(ex, sizer, journal)
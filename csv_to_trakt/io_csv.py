@@ -1,24 +1,26 @@
 # -*- coding: utf-8 -*-
-import csv
 import os
+import sys
+
+# 添加项目根目录到 Python 路径（共享 common 包）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.rows import iter_rows
 
 REQUIRED_FIELDS = {
     "title","date","datetime","type","season","slug",
     "matched_title","matched_year","found","douban_link"
 }
 
+def iter_csv_rows(path: str):
+    """
+    逐行读取为 common.rows.Row（流式模式直接迭代）：表头在读第一行前校验，
+    各列已去首尾空白，datetime 已解析为 row.ts（epoch 秒）
+    """
+    return iter_rows(path, REQUIRED_FIELDS)
+
 def read_csv_rows(path: str):
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"CSV 不存在: {path}")
-    rows = []
-    with open(path, "r", encoding="utf-8-sig", newline="") as f:
-        r = csv.DictReader(f)
-        if not REQUIRED_FIELDS.issubset(set(r.fieldnames or [])):
-            raise ValueError(f"CSV 表头缺少: {REQUIRED_FIELDS - set(r.fieldnames or [])}；当前表头={r.fieldnames}")
-        for row in r:
-            rows.append(row)
-    return rows
+    return list(iter_csv_rows(path))
 
 def chunks(lst, n):
     for i in range(0, len(lst), n):
-        yield lst[i:i+n]
\ No newline at end of file
+        yield lst[i:i+n]
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+同步日志：CSV 旁的 <csv>.journal.sqlite，记录每个条目提交在哪一批、Trakt 的逐条结果。
+
+- 条目按内容哈希（模式、类型、slug、季号、观看时间）识别，与 CSV 行序和无关列无关；
+- 批次发出前记为 pending，成功响应后逐条记为 acked 或 not_found，失败记为 failed；
+- 重新运行时跳过 acked / not_found 的条目，只重试 failed 与未确认（pending，如中途 Ctrl-C）的条目。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    endpoint    TEXT NOT NULL,
+    label       TEXT NOT NULL,
+    status_code INTEGER,
+    response    TEXT,
+    created_at  REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS items (
+    hash       TEXT PRIMARY KEY,
+    batch_id   INTEGER NOT NULL,
+    status     TEXT NOT NULL,
+    result     TEXT,
+    updated_at REAL NOT NULL
+);
+"""
+
+DONE = ("acked", "not_found")
+
+
+def item_hash(mode: str, kind: str, slug: str, season=None, watched_iso=None) -> str:
+    raw = "|".join([mode, kind, slug, "" if season is None else str(season), watched_iso or ""])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def default_path(csv_path: str) -> str:
+    return csv_path + ".journal.sqlite"
+
+
+def _not_found_slugs(data) -> set:
+    out = set()
+    for items in ((data or {}).get("not_found") or {}).values():
+        for it in items if isinstance(items, list) else []:
+            slug = ((it or {}).get("ids") or {}).get("slug")
+            if slug:
+                out.add(slug)
+    return out
+
+
+class SyncJournal:
+    """线程安全；enabled=False 时所有操作都是空操作"""
+
+    def __init__(self, path: str, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _conn(self):
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def done(self, hashes) -> set:
+        """hashes 中已确认（acked / not_found）的部分"""
+        hashes = list(dict.fromkeys(hashes))
+        if not self.enabled or not hashes or not os.path.exists(self.path):
+            return set()
+        out = set()
+        with self._lock:
+            db = self._conn()
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                out.update(h for (h,) in db.execute(
+                    f"SELECT hash FROM items WHERE status IN (?,?) AND hash IN ({marks})", [*DONE, *chunk]))
+        return out
+
+    def begin(self, endpoint: str, label: str, items) -> int | None:
+        """items: [(hash, slug), ...]；登记批次并把条目记为 pending，返回批次 id"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute("BEGIN")
+            cur = db.execute("INSERT INTO batches (endpoint, label, created_at) VALUES (?,?,?)",
+                             (endpoint, label, now))
+            batch_id = cur.lastrowid
+            db.executemany("INSERT OR REPLACE INTO items VALUES (?,?,?,?,?)",
+                           [(h, batch_id, "pending", None, now) for h, _ in items])
+            db.execute("COMMIT")
+        return batch_id
+
+    def finish(self, batch_id, items, r):
+        """r 为最终响应（None 表示请求失败）；2xx 时按 not_found 逐条记结果"""
+        if not self.enabled or batch_id is None:
+            return
+        ok = r is not None and 200 <= r.status_code < 300
+        data = None
+        if r is not None:
+            try:
+                data = r.json()
+            except Exception:
+                data = None
+        missing = _not_found_slugs(data) if ok and isinstance(data, dict) else set()
+        now = time.time()
+        rows = []
+        for h, slug in items:
+            status = ("not_found" if slug in missing else "acked") if ok else "failed"
+            rows.append((status, str(r.status_code) if r is not None else None, now, h, batch_id))
+        with self._lock:
+            db = self._conn()
+            db.execute("BEGIN")
+            db.execute("UPDATE batches SET status_code=?, response=?, finished_at=? WHERE id=?",
+                       (r.status_code if r is not None else None,
+                        json.dumps(data, ensure_ascii=False) if data is not None else None, now, batch_id))
+            db.executemany("UPDATE items SET status=?, result=?, updated_at=? WHERE hash=? AND batch_id=?", rows)
+            db.execute("COMMIT")
+
+    def counts(self) -> dict:
+        if not self.enabled or not os.path.exists(self.path):
+            return {}
+        with self._lock:
+            return dict(self._conn().execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall())
+
+    def summary(self) -> str:
+        c = self.counts()
+        return (f"同步日志：已确认 {c.get('acked', 0)}，not_found {c.get('not_found', 0)}，"
+                f"失败 {c.get('failed', 0)}，未确认 {c.get('pending', 0)}；本次跳过 {self.skipped}（{self.path}）")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+/sync 请求的全局打包：整份 CSV 先合并成顶层条目，再把电影与剧集混装进同一个请求。
+
+- 同一部剧在整份文件里的所有季合并成一个 show 条目（原先只在每 80 条的分块内合并，
+  一部剧的几季可能分散在多个请求里）；同一季重看（同季号、不同观看时间）是另一次观看，
+  第 k 次观看放进该剧的第 k 个 show 条目，不会被合并掉；
+- watchlist 模式下带季号与不带季号的行按 slug 合并为一个 show 条目；
+- /sync/history 与 /sync/watchlist 的请求体可以同时带 movies 与 shows，
+  按顺序把条目装进请求，直到条目权重达到当前批大小或 JSON 超过字节上限，
+  一个条目本身超过上限时单独成一个请求；
+- 每个顶层条目记住它覆盖的 CSV 条目（同步日志的 (hash, slug)）；批大小按条目权重计算：
+  电影与整剧为 1，分季剧集为合并后的季数，同一季的重复行不计。
+"""
+import json
+
+from trakt import build_movie_entries, build_show_season_entries
+
+
+class Unit:
+    """一个顶层条目：section 为 "movies" / "shows"，keyed 为它覆盖的 [(hash, slug), ...]"""
+    __slots__ = ("section", "entry", "keyed", "weight", "nbytes")
+
+    def __init__(self, section, entry, keyed):
+        self.section = section
+        self.entry = entry
+        self.keyed = keyed
+        self.weight = max(1, len(entry.get("seasons") or ()))
+        self.nbytes = len(json.dumps(entry, ensure_ascii=False).encode("utf-8")) + 1  # 含分隔逗号
+
+
+def season_entries(group, key) -> list:
+    """
+    watched 模式的分季条目 [(slug, season, watched_iso), ...] → [(show 条目, keyed), ...]
+
+    每部剧每一季的第 k 次观看放进该剧的第 k 个条目，keyed 只含实际写进该条目的行，
+    同步日志因此不会把没发出去的重看记为 acked。完全相同的重复行（同一哈希）只发一次。
+    """
+    seen = set()
+    rounds = []  # 第 k 轮：{slug: {season: (item, hash)}}
+    for it in group:
+        h = key("season", it)
+        if h in seen:
+            continue
+        seen.add(h)
+        slug, sn = it[0], it[1]
+        for rnd in rounds:
+            seasons = rnd.setdefault(slug, {})
+            if sn not in seasons:
+                seasons[sn] = (it, h)
+                break
+        else:
+            rounds.append({slug: {sn: (it, h)}})
+    out = []
+    for rnd in rounds:
+        for slug, seasons in rnd.items():
+            if not seasons:
+                continue
+            entry = build_show_season_entries([it for it, _ in seasons.values()], watched_mode=True)[0]
+            out.append((entry, [(h, slug) for _, h in seasons.values()]))
+    return out
+
+
+def build_units(mode: str, items: dict, key) -> list:
+    """
+    items: {"movie": [...], "season": [...], "show": [...]}（importer.row_item 的条目）
+    key(kind, item) → 同步日志哈希
+    """
+    watched = mode == "watched"
+    units = []
+    for it in items["movie"]:
+        units.append(Unit("movies", build_movie_entries([it], watched_mode=watched)[0], [(key("movie", it), it[0])]))
+
+    if watched:
+        for entry, keyed in season_entries(items["season"], key):
+            units.append(Unit("shows", entry, keyed))
+        for it in items["show"]:
+            entry = {"ids": {"slug": it[0]}}
+            if it[-1]:
+                entry["watched_at"] = it[-1]
+            units.append(Unit("shows", entry, [(key("show", it), it[0])]))
+    else:
+        by_show = {}
+        for kind in ("season", "show"):
+            for it in items[kind]:
+                by_show.setdefault(it[0], []).append((key(kind, it), it[0]))
+        for slug, keyed in by_show.items():
+            units.append(Unit("shows", {"ids": {"slug": slug}}, keyed))
+    return units
+
+
+def _batch(endpoint, group):
+    payload = {}
+    for u in group:
+        payload.setdefault(u.section, []).append(u.entry)
+    label = f"{endpoint}/" + "+".join(f"{sec}({len(v)})" for sec, v in payload.items())
+    return label, endpoint, payload, [kv for u in group for kv in u.keyed], sum(u.weight for u in group)
+
+
+def pack(mode: str, units: list, sizer):
+    """
+    逐个产出 (label, endpoint, payload, keyed, weight)；每开一个新请求时读取 sizer 当前的批大小与字节上限，
+    因此已完成批次的耗时反馈会作用到后续请求。
+    """
+    endpoint = "history" if mode == "watched" else "watchlist"
+    group = []
+    weight = n_bytes = 0
+    limit = max_bytes = None
+    for u in units:
+        if group and (weight + u.weight > limit or n_bytes + u.nbytes > max_bytes):
+            yield _batch(endpoint, group)
+            group = []
+        if not group:
+            weight = n_bytes = 0
+            limit, max_bytes = sizer.next_size(), sizer.max_bytes
+        group.append(u)
+        weight += u.weight
+        n_bytes += u.nbytes
+    if group:
+        yield _batch(endpoint, group)
+
+
+def count_requests(mode: str, units: list, sizer) -> int:
+    """按 sizer 当前的批大小估算打包后的请求数（dry-run 展示用）"""
+    return sum(1 for _ in pack(mode, units, sizer))
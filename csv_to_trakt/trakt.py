@@ -1,26 +1,45 @@
 # -*- coding: utf-8 -*-
-import certifi
 import json
-import requests
+import os
+import sys
+
+# 添加项目根目录到 Python 路径（共享 common 包）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.trakt_rate import LIMITER
+from common.transport import TRAKT, CONNECT_TIMEOUT, STATS
 
 REQUEST_TIMEOUT = 30
 
-def post_trakt_sync(endpoint: str, payload: dict, access_token: str, client_id: str):
-    """
-    endpoint: "history" | "watchlist"
-    """
-    url = f"https://api.trakt.tv/sync/{endpoint}"
-    headers = {
+def _auth_headers(access_token: str, client_id: str) -> dict:
+    return {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {access_token}",
         "trakt-api-version": "2",
         "trakt-api-key": client_id,
         "User-Agent": "Mozilla/5.0",
     }
-    return requests.post(
-        url, headers=headers, json=payload,
-        verify=certifi.where(), timeout=REQUEST_TIMEOUT
-    )
+
+def get_trakt_sync(path: str, params: dict | None, access_token: str, client_id: str):
+    """
+    path: 如 "history/movies"、"watched/shows"（GET /sync/<path>）
+    经共享限速器按 GET 额度发送。
+    """
+    url = f"https://api.trakt.tv/sync/{path}"
+    headers = _auth_headers(access_token, client_id)
+    return LIMITER.call("GET", lambda: TRAKT.get(
+        url, headers=headers, params=params, timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT)
+    ))
+
+def post_trakt_sync(endpoint: str, payload: dict, access_token: str, client_id: str):
+    """
+    endpoint: "history" | "watchlist"
+    经共享限速器发送：按 POST 额度排队，429 时等 Retry-After 后自动重发。
+    """
+    url = f"https://api.trakt.tv/sync/{endpoint}"
+    headers = _auth_headers(access_token, client_id)
+    return LIMITER.call("POST", lambda: TRAKT.post(
+        url, headers=headers, json=payload, timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT)
+    ))
 
 def build_movie_entries(pairs, watched_mode: bool):
     """
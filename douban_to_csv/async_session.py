@@ -0,0 +1,176 @@
+import asyncio, json, os, ssl, sys
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+import certifi
+
+import config
+
+# 添加项目根目录到 Python 路径（共享 common 包）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.transport import QUOTA
+
+# 与 session_utils 中 urllib3 Retry 等价的重试参数
+RETRY_TOTAL = 6
+RETRY_CONNECT = 3
+RETRY_READ = 5
+RETRY_STATUS = 5
+BACKOFF_FACTOR = 1.2
+BACKOFF_MAX = 120
+STATUS_FORCELIST = frozenset([429, 500, 502, 503, 504])
+# Trakt 的 429 由 common.trakt_rate 按 Retry-After 重新排队，这里只重试 5xx（同 common.transport）
+HOST_STATUS_FORCELIST = {
+    "api.trakt.tv": frozenset([500, 502, 503, 504]),
+}
+RETRY_AFTER_STATUS = frozenset([413, 429, 503])
+
+DEFAULT_HEADERS = {
+    "User-Agent": config.USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+}
+
+def _backoff_time(consecutive_errors):
+    # urllib3: 第一次重试不等待，之后 backoff_factor * 2^(n-1)
+    if consecutive_errors <= 1: return 0
+    return min(BACKOFF_MAX, BACKOFF_FACTOR * (2 ** (consecutive_errors - 1)))
+
+def _retry_after(headers):
+    v = (headers or {}).get("Retry-After")
+    if not v: return None
+    try:
+        return max(0.0, float(v))
+    except ValueError:
+        pass
+    try:
+        dt = parsedate_to_datetime(v)
+        return max(0.0, (dt - datetime.now(timezone.utc)).total_seconds())
+    except Exception:
+        return None
+
+class AsyncFetcher:
+    """
+    基于 aiohttp 的异步抓取引擎，语义与 session_utils.fetch / fetch_json 一致：
+    同样的默认请求头、Referer 处理与重试/退避策略，并按 host 限制并发。
+    传入 cache（common.http_cache.HttpCache）时 GET 走同一份磁盘缓存。
+    用法：
+        async with AsyncFetcher(cache=session_utils.CACHE) as af:
+            html = await af.fetch(url, referer=...)
+    """
+    def __init__(self, host_limits=None, default_limit=None, total_limit=None, cache=None):
+        self.cache = cache
+        self.host_limits = dict(config.ASYNC_HOST_LIMITS if host_limits is None else host_limits)
+        self.default_limit = default_limit or config.ASYNC_DEFAULT_HOST_LIMIT
+        self.total_limit = total_limit or config.ASYNC_TOTAL_LIMIT
+        self._sems = {}
+        self._session = None
+
+    async def __aenter__(self):
+        import aiohttp
+        ctx = ssl.create_default_context(cafile=certifi.where())
+        conn = aiohttp.TCPConnector(limit=self.total_limit, ssl=ctx)
+        self._session = aiohttp.ClientSession(headers=DEFAULT_HEADERS, connector=conn)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _sem(self, url):
+        host = urlsplit(url).hostname or ""
+        sem = self._sems.get(host)
+        if sem is None:
+            sem = self._sems[host] = asyncio.Semaphore(self.host_limits.get(host, self.default_limit))
+        return sem
+
+    async def request(self, method, url, params=None, headers=None, timeout=config.REQUEST_TIMEOUT, payload=None,
+                      raise_for_status=False):
+        """
+        发送请求并读完响应体，返回 (status, text, headers)。
+        仅 GET 会按 STATUS_FORCELIST（按 host 见 HOST_STATUS_FORCELIST）重试（与 allowed_methods=["GET"] 一致）；
+        重试耗尽时，连接/读取错误抛出最后一次异常，状态码错误抛出 ClientResponseError。
+        """
+        import aiohttp
+        total, connect, read, status = RETRY_TOTAL, RETRY_CONNECT, RETRY_READ, RETRY_STATUS
+        errors = 0
+        tmo = aiohttp.ClientTimeout(total=timeout)
+        idempotent = method.upper() == "GET"
+        host = urlsplit(url).hostname or ""
+        forcelist = HOST_STATUS_FORCELIST.get(host, STATUS_FORCELIST)
+        while True:
+            wait = None
+            try:
+                if QUOTA is not None:
+                    # 批量模式的跨进程 host 额度：每次实际发送（含重试）预订一个时间槽，与 common.transport 一致
+                    await QUOTA.wait_async(host)
+                async with self._sem(url):
+                    async with self._session.request(method, url, params=params, headers=headers,
+                                                     timeout=tmo, json=payload) as r:
+                        text = await r.text(errors="replace")
+                        if idempotent and r.status in forcelist:
+                            total -= 1; status -= 1; errors += 1
+                            if total < 0 or status < 0:
+                                r.raise_for_status()
+                            if r.status in RETRY_AFTER_STATUS:
+                                wait = _retry_after(r.headers)
+                        else:
+                            if raise_for_status:
+                                r.raise_for_status()
+                            return r.status, text, r.headers
+            except aiohttp.ClientConnectorError:
+                total -= 1; connect -= 1; errors += 1
+                if total < 0 or connect < 0: raise
+            except (aiohttp.ServerDisconnectedError, aiohttp.ClientPayloadError,
+                    aiohttp.ClientOSError, asyncio.TimeoutError):
+                if not idempotent: raise
+                total -= 1; read -= 1; errors += 1
+                if total < 0 or read < 0: raise
+            await asyncio.sleep(wait if wait is not None else _backoff_time(errors))
+
+    @staticmethod
+    def _headers(referer, extra=None):
+        headers = dict(extra or {})
+        if referer:
+            headers["Referer"] = referer
+        return headers
+
+    async def _get(self, url, params, headers, timeout, raise_for_status=False):
+        cache = self.cache
+        if cache is None or not cache.cacheable(url):
+            code, text, _ = await self.request("GET", url, params=params, headers=headers, timeout=timeout,
+                                               raise_for_status=raise_for_status)
+            return code, text
+        from common.http_cache import cache_key
+        key = cache_key(url, params)
+        entry = cache.lookup(key, url)
+        if entry is not None and cache.usable(entry, url):
+            return entry.status, entry.body.decode(entry.encoding or "utf-8", errors="replace")
+        if entry is not None:
+            headers = {**headers, **entry.validators()}
+        code, text, resp_headers = await self.request("GET", url, params=params, headers=headers, timeout=timeout,
+                                                      raise_for_status=raise_for_status)
+        if code == 304 and entry is not None:
+            cache.refresh(entry, url, resp_headers)
+            return entry.status, entry.body.decode(entry.encoding or "utf-8", errors="replace")
+        if entry is not None:
+            cache.misses += 1
+        if code == 200:
+            cache.store(key, url, code, text.encode("utf-8"), resp_headers, "utf-8")
+        return code, text
+
+    async def fetch(self, url, params=None, timeout=config.REQUEST_TIMEOUT, referer=None):
+        _, text = await self._get(url, params, self._headers(referer), timeout, raise_for_status=True)
+        return text
+
+    async def fetch_json(self, url, params=None, timeout=config.REQUEST_TIMEOUT, referer=None, headers=None):
+        code, text = await self._get(url, params, self._headers(referer, headers), timeout)
+        if code != 200:
+            return None
+        try:
+            return json.loads(text)
+        except Exception:
+            return None
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列表页解析器对照 + 基准：lxml XPath（collect_parser.parse_collect_items）vs 原 BeautifulSoup 实现。
+
+  python bench_collect_parser.py <保存的列表页 HTML 目录> [--repeat 5]
+  python bench_collect_parser.py --synthetic 200        # 无样本时生成仿真页面
+  python bench_collect_parser.py                        # 不指定时使用 tests/fixtures/collect 下的样本
+
+先逐页比对两种解析结果（条目与最大页码），不一致则列出并以非 0 退出；
+再分别在子进程中解析全部页面，报告 pages/sec 与峰值 RSS（及解析阶段的增量）。
+"""
+import sys, os, glob, time, argparse, random, resource
+from multiprocessing import get_context
+
+from collect_parser import parse_collect_items, parse_collect_items_bs4, parse_max_page, parse_max_page_bs4
+
+DEFAULT_FIXTURES=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),"tests","fixtures","collect")
+
+PARSERS={
+    "lxml":(parse_collect_items,parse_max_page),
+    "bs4":(parse_collect_items_bs4,parse_max_page_bs4),
+}
+
+def synthetic_pages(n,per_page=15,seed=0):
+    rnd=random.Random(seed)
+    pages=[]
+    for p in range(n):
+        items=[]
+        for i in range(per_page):
+            sid=1000000+p*per_page+i
+            title=rnd.choice(["请回答1988","风骚律师 第六季","Breaking Bad Season 2","千与千寻","三体 第一部"])
+            items.append(
+                f'<div class="item comment-item" data-cid="{sid}"><div class="pic">'
+                f'<a title="{title}" href="https://movie.douban.com/subject/{sid}/" class="nbg">'
+                f'<img alt="{title}" src="https://img.example/{sid}.jpg"></a></div><div class="info"><ul>'
+                f'<li class="title"><a href="https://movie.douban.com/subject/{sid}/"><em>{title} / Orig {sid}</em></a></li>'
+                f'<li class="intro">2019-01-01(中国大陆) / 演员甲 / 演员乙 / 美国 / 导演丙 / 120分钟</li>'
+                f'<li><span class="rating{rnd.randint(1,5)}-t"></span><span class="date">20{10+p%14:02d}-0{1+i%9}-1{i%10}</span>'
+                f'<span class="tags">标签: 剧情</span></li><li><span class="comment">短评 {i}</span></li></ul></div></div>')
+        pages.append('<html><head><title>看过的影视</title></head><body><div id="wrapper"><div class="grid-view">'
+                     +"".join(items)+'</div><div class="paginator"><span class="prev">&lt;前页</span>'
+                     f'<a href="?start=0">1</a><a href="?start=15">2</a><a href="?start={15*(n-1)}">{n}</a>'
+                     '<span class="next"><a href="?start=15">后页&gt;</a></span></div></div></body></html>')
+    return pages
+
+def load_fixtures(path):
+    files=sorted(glob.glob(os.path.join(path,"*.html"))+glob.glob(os.path.join(path,"*.htm")))
+    pages=[]
+    for fn in files:
+        with open(fn,"r",encoding="utf-8",errors="replace") as f:
+            pages.append((os.path.basename(fn),f.read()))
+    return pages
+
+def check(pages):
+    bad=0
+    for name,html in pages:
+        a,b=parse_collect_items(html),parse_collect_items_bs4(html)
+        ma,mb=parse_max_page(html),parse_max_page_bs4(html)
+        if a!=b or ma!=mb:
+            bad+=1
+            print(f"[DIFF] {name}: items lxml={len(a)} bs4={len(b)} max_page lxml={ma} bs4={mb}")
+            for x,y in zip(a,b):
+                if x!=y: print(f"    lxml={x}\n    bs4 ={y}")
+    return bad
+
+def _maxrss_kb():
+    r=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r/1024 if sys.platform=="darwin" else r
+
+def _bench_worker(name,htmls,repeat,q):
+    items_fn,max_fn=PARSERS[name]
+    base=_maxrss_kb()
+    t0=time.perf_counter()
+    n=0
+    for _ in range(repeat):
+        for html in htmls:
+            items_fn(html); max_fn(html)
+            n+=1
+    dt=time.perf_counter()-t0
+    peak=_maxrss_kb()
+    q.put((n/dt if dt>0 else 0.0,peak,peak-base))
+
+def bench(name,htmls,repeat):
+    ctx=get_context("spawn")
+    q=ctx.Queue()
+    p=ctx.Process(target=_bench_worker,args=(name,htmls,repeat,q))
+    p.start()
+    res=q.get()
+    p.join()
+    return res
+
+def main():
+    ap=argparse.ArgumentParser(description="列表页解析器对照与基准（lxml vs BeautifulSoup）")
+    ap.add_argument("fixtures",nargs="?",help="保存的列表页 HTML 目录（*.html，默认 tests/fixtures/collect）")
+    ap.add_argument("--synthetic",type=int,default=0,help="生成 N 个仿真页面（无样本时使用）")
+    ap.add_argument("--repeat",type=int,default=3,help="每个解析器重复解析全部页面的轮数")
+    args=ap.parse_args()
+
+    pages=load_fixtures(args.fixtures or DEFAULT_FIXTURES) if args.fixtures or not args.synthetic else []
+    if args.synthetic:
+        pages+=[(f"synthetic-{i}",h) for i,h in enumerate(synthetic_pages(args.synthetic))]
+    if not pages:
+        raise SystemExit("没有可用页面：请指定 HTML 目录或 --synthetic N")
+
+    print(f"页面数：{len(pages)}")
+    bad=check(pages)
+    print(f"结果对照：{len(pages)-bad}/{len(pages)} 页一致")
+
+    htmls=[h for _,h in pages]
+    results={name:bench(name,htmls,args.repeat) for name in PARSERS}
+    for name,(pps,peak,delta) in results.items():
+        print(f"  {name:<5} {pps:8.1f} pages/s   峰值 RSS {peak/1024:7.1f} MB（解析增量 {delta/1024:.1f} MB）")
+    if results["bs4"][0]>0:
+        print(f"  加速比 {results['lxml'][0]/results['bs4'][0]:.1f}x")
+    if bad: sys.exit(1)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标题分析对照 + 基准：titles.analyze_title（合并快速判定 + LRU）vs 原 extract_season_number /
+fallback_detect_type / normalize_title 三个函数。
+
+  python bench_titles.py                     # 内置的豆瓣标题样本
+  python bench_titles.py --csv movie.csv     # 用导出的 CSV 的 title 列
+  python bench_titles.py --repeat 200
+
+先逐条比对 (规范化标题, 季号, 类型)；原实现只支持 99 以内的中文数字，
+含 百/千/万 的标题差异单独列出（新实现的预期改进），其余差异以非 0 退出。
+不同标题的真实提速看"无缓存"一行（或 --repeat 1 时的 analyze_titles）；
+--repeat 大于 1 时 analyze_titles 从第 2 轮起全部命中 LRU，只代表标题大量重复的情形。
+"""
+import re, sys, csv, time, argparse
+
+from titles import analyze_title, analyze_titles
+
+# ========== 原实现（对照用） ==========
+
+_CN_NUM={"零":0,"〇":0,"一":1,"二":2,"两":2,"三":3,"四":4,"五":5,"六":6,"七":7,"八":8,"九":9,"十":10}
+def _cn_num_to_int(s):
+    if not s: return None
+    if s in _CN_NUM: return _CN_NUM[s]
+    if "十" in s:
+        a,b=s.split("十") if "十" in s else ("","")
+        a=_CN_NUM.get(a,1 if a=="" else 0)
+        b=_CN_NUM.get(b,0)
+        return a*10+b
+    return None
+
+SEASON_PATTERNS=[
+    re.compile(r"[第\s]*(\d+)\s*季"),
+    re.compile(r"[第\s]*([一二三四五六七八九十两〇零]+)\s*季"),
+    re.compile(r"[Ss]eason\s*(\d+)"),
+    re.compile(r"[Ss]\s?(\d+)\b"),
+    re.compile(r"[第\s]*([一二三四五六七八九十两〇零]+)\s*部"),
+    re.compile(r"[Pp]art\s*(\d+)")
+]
+
+def legacy_extract_season_number(title):
+    for pat in SEASON_PATTERNS:
+        m=pat.search(title or "")
+        if m:
+            g=m.group(1)
+            if g.isdigit(): return int(g)
+            v=_cn_num_to_int(g)
+            if v: return v
+    return None
+
+def legacy_fallback_detect_type(title):
+    if legacy_extract_season_number(title):
+        return "show"
+    if re.search(r"(第\s*[一二三四五六七八九十两〇零\d]+\s*话)|TV|电视剧|ドラマ|Season",title,re.IGNORECASE):
+        return "show"
+    return "movie"
+
+def legacy_normalize_title(title):
+    t=title or ""
+    t=re.sub(r"\s*[第\s]*\d+\s*季","",t)
+    t=re.sub(r"\s*[第\s]*[一二三四五六七八九十两〇零]+\s*季","",t)
+    t=re.sub(r"\s*[Ss]eason\s*\d+","",t)
+    t=re.sub(r"\s*[Ss]\s?\d+\b","",t)
+    t=re.sub(r"\s*[第\s]*[一二三四五六七八九十两〇零]+\s*部","",t)
+    t=re.sub(r"\s*[Pp]art\s*\d+","",t)
+    return t.strip(" ·-—:：()（）")
+
+def legacy(title):
+    return legacy_normalize_title(title),legacy_extract_season_number(title),legacy_fallback_detect_type(title)
+
+# ========== 样本 ==========
+
+SAMPLE_TITLES=[
+    "肖申克的救赎","霸王别姬","阿甘正传","泰坦尼克号","千与千寻","这个杀手不太冷","美丽人生","星际穿越",
+    "盗梦空间","楚门的世界","辛德勒的名单","忠犬八公的故事","海上钢琴师","三傻大闹宝莱坞","放牛班的春天",
+    "机器人总动员","无间道","疯狂动物城","控方证人","大话西游之大圣娶亲","熔炉","教父","教父2","教父3",
+    "当幸福来敲门","触不可及","怦然心动","龙猫","末代皇帝","寻梦环游记","活着","蝙蝠侠：黑暗骑士",
+    "哈利·波特与魔法石","哈利·波特与死亡圣器(下)","指环王1：护戒使者","指环王3：王者无敌","我不是药神",
+    "让子弹飞","一九四二","十二怒汉","七月与安生","三十而已","八佰","流浪地球2","满江红","封神第一部：朝歌风云",
+    "长津湖之水门桥","名侦探柯南：黑铁的鱼影","新世纪福音战士剧场版：终","星球大战：第四集 - 新希望",
+    "碟中谍7：致命清算（上）","沙丘2","奥本海默","芭比","瞬息全宇宙","蜘蛛侠：纵横宇宙","玩具总动员4",
+    "请回答1988","漫长的季节","狂飙","隐秘的角落","沉默的真相","琅琊榜","琅琊榜之风起长林","武林外传",
+    "甄嬛传","大明王朝1566","繁花","三体","鱿鱼游戏","黑镜 第三季","西部世界 第一季","权力的游戏 第八季",
+    "权力的游戏 第一季","绝命毒师 第五季","风骚律师 第六季","老友记 第十季","生活大爆炸 第十二季",
+    "辛普森一家 第三十五季","名侦探柯南 第二十季","请回答1994","爱的迫降","黑暗荣耀 第二季","怪奇物语 第四季",
+    "纸牌屋 第一季","真探 第一季","切尔诺贝利","兄弟连","太平洋战争","后翼弃兵","王冠 第六季",
+    "进击的巨人 最终季","间谍过家家 第二季","鬼灭之刃 游郭篇","咒术回战 第二季","葬送的芙莉莲",
+    "一年一度喜剧大赛 第二季","奇葩说 第七季","乘风破浪的姐姐","中国有嘻哈","明星大侦探 第八季",
+    "Breaking Bad Season 2","Friends S01","Sherlock Series 4","The Office (US) Season 9",
+    "Stranger Things 4","Fargo Season 5","The Last of Us","Arcane","Toy Story 3","Dune: Part Two",
+    "Kill Bill: Vol. 1","Harry Potter and the Deathly Hallows: Part 2","S.W.A.T. 第七季","NCIS 第二十一季",
+    "深夜食堂 第二部","深夜食堂 第三部","半泽直树 第二部","孤独的美食家 第十季","非自然死亡","重启人生",
+    "日本沉没：希望之人 TV版","火影忍者 第1话","海贼王 第一千话","龙珠Z 剧场版","机动战士高达 第08MS小队",
+    "鹿鼎记 电视剧版","第一百零一次求婚","大宅门 第二部",
+]
+
+def load_titles(path):
+    with open(path,"r",encoding="utf-8-sig",newline="") as f:
+        return [r.get("title") or "" for r in csv.DictReader(f)]
+
+def bench(fn,titles,repeat):
+    t0=time.perf_counter()
+    for _ in range(repeat):
+        fn(titles)
+    dt=time.perf_counter()-t0
+    return len(titles)*repeat/dt if dt>0 else 0.0
+
+def main():
+    ap=argparse.ArgumentParser(description="标题分析对照与基准")
+    ap.add_argument("--csv",help="读取 CSV 的 title 列作为样本（默认用内置样本）")
+    ap.add_argument("--repeat",type=int,default=100,help="每种实现重复处理全部样本的轮数")
+    args=ap.parse_args()
+    titles=load_titles(args.csv) if args.csv else SAMPLE_TITLES
+
+    diff=ext=0
+    for t in dict.fromkeys(titles):
+        old,new=legacy(t),tuple(analyze_title(t))
+        if old==new: continue
+        if re.search("[百千万]",t):
+            ext+=1
+            print(f"[扩展] {t}: 原={old} 新={new}")
+        else:
+            diff+=1
+            print(f"[DIFF] {t}: 原={old} 新={new}")
+    print(f"样本 {len(titles)} 条（去重 {len(set(titles))}）：一致 {len(set(titles))-diff-ext}，中文数字扩展 {ext}，差异 {diff}")
+
+    rate_old=bench(lambda ts: [legacy(t) for t in ts],titles,args.repeat)
+    analyze_title.cache_clear()
+    rate_cold=bench(lambda ts: [analyze_title.__wrapped__(t) for t in ts],titles,args.repeat)
+    rate_new=bench(analyze_titles,titles,args.repeat)
+    print(f"  原实现        {rate_old:12.0f} 条/s")
+    print(f"  analyze（无缓存）{rate_cold:12.0f} 条/s   {rate_cold/rate_old:5.1f}x")
+    print(f"  analyze_titles {rate_new:12.0f} 条/s   {rate_new/rate_old:5.1f}x"
+          +("（第 2 轮起全部命中缓存，只反映重复标题的情形）" if args.repeat>1 else ""))
+    if diff: sys.exit(1)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,84 @@
+import re
+from lxml import html as lxml_html
+from bs4 import BeautifulSoup
+
+# class 属性按空白分词匹配，与 BeautifulSoup 的 {"class": "item"} 语义一致
+_ITEM_XP='//div[contains(concat(" ",normalize-space(@class)," ")," item ")]'
+_PAGINATOR_XP='//div[contains(concat(" ",normalize-space(@class)," ")," paginator ")]//a'
+_TITLE_XP='.//li[contains(concat(" ",normalize-space(@class)," ")," title ")][1]'
+_DATE_XP='.//span[contains(concat(" ",normalize-space(@class)," ")," date ")][1]'
+_INTRO_XP='.//li[contains(concat(" ",normalize-space(@class)," ")," intro ")][1]'
+_YEAR_RE=re.compile(r"(?<!\d)((?:18|19|20)\d\d)(?!\d)")
+
+def intro_year(intro):
+    """intro 形如 "1994-09-10(多伦多电影节) / 1994-10-14(美国) / ..."，取第一个年份作为上映年份"""
+    m=_YEAR_RE.search(intro or "")
+    return m.group(1) if m else ""
+
+def _text(el):
+    # 等价于 BeautifulSoup get_text(strip=True)：各文本片段去空白后直接拼接
+    return "".join(t.strip() for t in el.itertext()) if el is not None else ""
+
+def _first(nodes):
+    return nodes[0] if nodes else None
+
+def parse_collect_items(html):
+    """
+    列表页 → [(link, title, date_str, year), ...]，只处理 div.item 节点；year 为 intro 中的上映年份。
+    用 lxml XPath 直接取值，解析完立即释放整棵树。
+    """
+    if not html: return []
+    tree=lxml_html.fromstring(html)
+    out=[]
+    try:
+        for it in tree.xpath(_ITEM_XP):
+            a=_first(it.xpath(".//a"))
+            href=a.get("href") if a is not None else None
+            if not href: continue
+            li=_first(it.xpath(_TITLE_XP))
+            em=_first(li.xpath(".//em")) if li is not None else None
+            title=_text(em) if li is not None else ""
+            out.append((href.strip(),title,_text(_first(it.xpath(_DATE_XP))),
+                        intro_year(_text(_first(it.xpath(_INTRO_XP))))))
+    finally:
+        tree.clear()
+        del tree
+    return out
+
+def parse_max_page(html):
+    if not html: return 1
+    tree=lxml_html.fromstring(html)
+    try:
+        links=tree.xpath(_PAGINATOR_XP)
+        if links:
+            try: return int(_text(links[-2]))
+            except: return 1
+        return 1
+    finally:
+        tree.clear()
+        del tree
+
+# ========== 原 BeautifulSoup 实现（对照与基准用） ==========
+
+def parse_collect_items_bs4(html):
+    if not html: return []
+    soup=BeautifulSoup(html,"lxml")
+    out=[]
+    for it in soup.find_all("div",{"class":"item"}):
+        a=it.find("a")
+        if not a or not a.get("href"): continue
+        li=it.find("li",{"class":"title"})
+        title=li.em.get_text(strip=True) if li and li.em else ""  # 原实现在缺 em 时抛 AttributeError
+        date_span=it.find("span",{"class":"date"})
+        intro=it.find("li",{"class":"intro"})
+        out.append((a["href"].strip(),title,date_span.get_text(strip=True) if date_span else "",
+                    intro_year(intro.get_text(strip=True) if intro else "")))
+    return out
+
+def parse_max_page_bs4(html):
+    soup=BeautifulSoup(html,"lxml")
+    p=soup.find("div",{"class":"paginator"})
+    if p and p.find_all("a"):
+        try: return int(p.find_all("a")[-2].get_text())
+        except: return 1
+    return 1
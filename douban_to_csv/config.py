@@ -5,4 +5,28 @@ USER_AGENT = (
 )
 
 REQUEST_TIMEOUT = 30
-SEARCH_SLEEP = 0.6
\ No newline at end of file
+SEARCH_SLEEP = 0.6
+# Trakt 匹配置信度低于该值的行会在输出中提示，需人工校对
+MATCH_LOW_CONFIDENCE = 0.5
+# 本地片库（--title-index）命中的最低置信度，低于此值仍走在线搜索
+INDEX_MIN_CONFIDENCE = 0.7
+
+# 异步引擎（async_session）每个 host 的并发上限
+ASYNC_HOST_LIMITS = {
+    "movie.douban.com": 4,
+    "m.douban.com": 4,
+    "api.trakt.tv": 8,
+}
+ASYNC_DEFAULT_HOST_LIMIT = 8
+ASYNC_TOTAL_LIMIT = 200
+
+# interests 分页：按 total 并发拉取的并发数与每秒请求上限
+INTERESTS_WORKERS = 4
+INTERESTS_RATE = 5.0
+
+# deep-refine：subject 详情批量请求的并发数与每秒请求上限
+DEEP_REFINE_WORKERS = 4
+DEEP_REFINE_RATE = 4.0
+
+# --resolve-ids：为每个条目取 subject 详情（IMDb id），用 Trakt 的 ID 查询代替标题搜索
+RESOLVE_IDS = False
@@ -1,49 +1,24 @@
-import re, time
+import re, json, asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone, date
 from bs4 import BeautifulSoup
 from session_utils import fetch, fetch_json, polite_sleep, SESSION
+from common.interests import INTERESTS_URL, RateLimiter, pull_interests, pull_interests_async
+from subject_store import SubjectStore
+from titles import analyze_title
 import config
 
+SUBJECTS = SubjectStore()
+
 SUBJECT_ID_RE = re.compile(r"/subject/(\d+)/?")
 
 # ========== 类型与季号识别 ==========
 
-_CN_NUM = {"零":0,"〇":0,"一":1,"二":2,"两":2,"三":3,"四":4,"五":5,"六":6,"七":7,"八":8,"九":9,"十":10}
-def _cn_num_to_int(s):
-    if not s: return None
-    if s in _CN_NUM: return _CN_NUM[s]
-    if "十" in s:
-        a,b = s.split("十") if "十" in s else ("","")
-        a = _CN_NUM.get(a,1 if a=="" else 0)
-        b = _CN_NUM.get(b,0)
-        return a*10+b
-    return None
-
-SEASON_PATTERNS = [
-    re.compile(r"[第\s]*(\d+)\s*季"),
-    re.compile(r"[第\s]*([一二三四五六七八九十两〇零]+)\s*季"),
-    re.compile(r"[Ss]eason\s*(\d+)"),
-    re.compile(r"[Ss]\s?(\d+)\b"),
-    re.compile(r"[第\s]*([一二三四五六七八九十两〇零]+)\s*部"),
-    re.compile(r"[Pp]art\s*(\d+)")
-]
-
 def extract_season_number(title:str):
-    for pat in SEASON_PATTERNS:
-        m = pat.search(title or "")
-        if m:
-            g = m.group(1)
-            if g.isdigit(): return int(g)
-            v = _cn_num_to_int(g)
-            if v: return v
-    return None
+    return analyze_title(title).season
 
 def fallback_detect_type(title:str)->str:
-    if extract_season_number(title):
-        return "show"
-    if re.search(r"(第\s*[一二三四五六七八九十两〇零\d]+\s*话)|TV|电视剧|ドラマ|Season", title, re.IGNORECASE):
-        return "show"
-    return "movie"
+    return analyze_title(title).type_hint
 
 def extract_subject_id(link:str):
     if not link: return None
@@ -61,30 +36,86 @@ def map_douban_type(raw:str)->str:
 
 # ========== 补时间 ==========
 
-def get_interests_map(user_id:str):
-    """批量拉取 m 端兴趣表，包含 create_time 和 type"""
-    base=f"https://m.douban.com/rexxar/api/v2/user/{user_id}/interests"
-    start=0; count=100
+INTERESTS_PAGE=100
+INTERESTS_REFERER="https://m.douban.com/mine/movie"
+
+def fetch_interests_page(user_id:str,start:int,count:int=INTERESTS_PAGE):
+    params={"status":"done","start":start,"count":count}
+    return fetch_json(INTERESTS_URL.format(user_id),params=params,referer=INTERESTS_REFERER)
+
+async def fetch_interests_page_async(af,user_id:str,start:int,count:int=INTERESTS_PAGE):
+    params={"status":"done","start":start,"count":count}
+    return await af.fetch_json(INTERESTS_URL.format(user_id),params=params,referer=INTERESTS_REFERER)
+
+def interest_to_row(it)->dict:
+    """interests 接口的一条记录 → 导出行（与列表页解析+补时后的字段一致）；非影视条目返回 None"""
+    subj=it.get("subject") or {}
+    sid=str(subj.get("id") or "").strip()
+    typ=map_douban_type(subj.get("type") or "")
+    if not sid or not typ: return None
+    title=(subj.get("title") or "").strip()
+    ct=it.get("create_time") or ""
+    season=extract_season_number(title)
+    return {"title":title,"date":ct[:10],"datetime":ct,"type":typ,"season":str(season or ""),
+            "slug":"","matched_title":"","matched_year":"","found":"0",
+            "douban_link":f"https://movie.douban.com/subject/{sid}/",
+            "release_year":str(subj.get("year") or ""),"match_confidence":"","_typed":True}
+
+def _merge_interests(mapping,arr):
+    for it in arr:
+        subj=it.get("subject") or {}
+        sid=str(subj.get("id") or "").strip()
+        if not sid: continue
+        raw= subj.get("type") or ""
+        mapping[sid]={"create_time":it.get("create_time") or "","douban_type":map_douban_type(raw) or "",
+                      "year":str(subj.get("year") or "")}
+
+def _reached_watermark(arr,watermark):
+    """这一页是否已经翻到水位线（上次已见过的条目）"""
+    if not watermark: return False
+    wm_sid=watermark.get("subject_id"); wm_ct=watermark.get("create_time") or ""
+    for it in arr:
+        sid=str((it.get("subject") or {}).get("id") or "").strip()
+        ct=it.get("create_time") or ""
+        if sid and (sid==wm_sid or (ct and ct<wm_ct)): return True
+    return False
+
+def get_interests_map(user_id:str,watermark=None):
+    """
+    批量拉取 m 端兴趣表，包含 create_time 和 type。
+    按首页 total 并发拉取其余页（config.INTERESTS_WORKERS / INTERESTS_RATE 限制）；
+    给定 watermark 时翻到水位线所在页即停。
+    """
     mapping={}
-    while True:
-        params={"status":"done","start":start,"count":count}
-        js=fetch_json(base,params=params,referer="https://m.douban.com/mine/movie")
-        if not js: break
-        arr=js.get("interests",[])
-        if not arr: break
-        for it in arr:
-            subj=it.get("subject") or {}
-            sid=str(subj.get("id") or "").strip()
-            if not sid: continue
-            raw= subj.get("type") or ""
-            mapping[sid]={"create_time":it.get("create_time") or "","douban_type":map_douban_type(raw) or ""}
-        start+=count
-        time.sleep(0.2)
+    pull_interests(lambda url,params: fetch_json(url,params=params,referer=INTERESTS_REFERER),
+                   user_id,lambda status,arr: _merge_interests(mapping,arr),
+                   workers=config.INTERESTS_WORKERS,rate=config.INTERESTS_RATE,
+                   stop=lambda status,arr: _reached_watermark(arr,watermark))
     return mapping
 
-def fetch_subject_detail(subject_id:str)->dict:
-    url=f"https://m.douban.com/rexxar/api/v2/subject/{subject_id}"
-    js=fetch_json(url,params={"for_mobile":"1"})
+async def get_interests_map_async(af,user_id:str,watermark=None):
+    mapping={}
+    await pull_interests_async(lambda url,params: af.fetch_json(url,params=params,referer=INTERESTS_REFERER),
+                               user_id,lambda status,arr: _merge_interests(mapping,arr),
+                               workers=config.INTERESTS_WORKERS,rate=config.INTERESTS_RATE,
+                               stop=lambda status,arr: _reached_watermark(arr,watermark))
+    return mapping
+
+SUBJECT_URL="https://m.douban.com/rexxar/api/v2/subject/{}"
+
+IMDB_RE=re.compile(r"\btt\d{7,}\b")
+
+def _find_imdb(js):
+    """IMDb id：优先 imdb/imdb_id 字段，其次 info 列表里的 ["IMDb", "tt..."]"""
+    for key in ("imdb","imdb_id"):
+        m=IMDB_RE.search(str(js.get(key) or ""))
+        if m: return m.group(0)
+    for item in js.get("info") or []:
+        m=IMDB_RE.search(json.dumps(item,ensure_ascii=False))
+        if m: return m.group(0)
+    return None
+
+def parse_subject_detail(js)->dict:
     if not js: return {}
     st= map_douban_type(js.get("type") or "")
     ct=None
@@ -96,9 +127,68 @@ def fetch_subject_detail(subject_id:str)->dict:
             cand=v[0].get("create_time")
             if cand: ct=cand
         if ct: break
-    return {"type":st,"create_time":ct}
+    ids={"douban":str(js.get("id") or "")}
+    imdb=_find_imdb(js)
+    if imdb: ids["imdb"]=imdb
+    return {"type":st,"create_time":ct,"title":js.get("title") or "","original_title":js.get("original_title") or "",
+            "year":str(js.get("year") or ""),"ids":ids}
 
-def refine_datetime(row,interests_map,user_id,deep_refine=False,deep_days=None):
+def fetch_subject_detail(subject_id:str)->dict:
+    js=fetch_json(SUBJECT_URL.format(subject_id),params={"for_mobile":"1"})
+    return parse_subject_detail(js)
+
+async def fetch_subject_detail_async(af,subject_id:str)->dict:
+    js=await af.fetch_json(SUBJECT_URL.format(subject_id),params={"for_mobile":"1"})
+    return parse_subject_detail(js)
+
+# 详情请求的限速在所有调用之间共用：逐行补时（流水线的多个 refine 线程）与整页批量合计不超过 DEEP_REFINE_RATE
+DETAIL_LIMITER=RateLimiter(config.DEEP_REFINE_RATE)
+
+def resolve_subjects(user_id,sids,need_time=())->dict:
+    """
+    deep-refine 批量取详情：sid 去重，先查 SUBJECTS，缺的并发请求（config.DEEP_REFINE_WORKERS / DEEP_REFINE_RATE）并写回。
+    need_time：要补标记时间的 sid，已存储但没有该用户时间的也重新请求。
+    返回 sid -> 详情；请求失败的 sid 不在结果里。
+    """
+    sids=[s for s in dict.fromkeys(sids) if s]
+    out=SUBJECTS.get_many(user_id,sids,need_time)
+    missing=[s for s in sids if s not in out]
+    if not missing: return out
+    def one(sid):
+        DETAIL_LIMITER.wait()
+        return sid,fetch_subject_detail(sid)
+    with ThreadPoolExecutor(max_workers=max(1,min(config.DEEP_REFINE_WORKERS,len(missing)))) as ex:
+        for sid,det in ex.map(one,missing):
+            if det:
+                SUBJECTS.put(user_id,sid,det)
+                out[sid]=det
+    return out
+
+_INFLIGHT={}
+
+async def resolve_subject_async(af,user_id,sid,need_time=False):
+    """异步版单条详情：先查 SUBJECTS；同一 sid 并发请求时共用一个在途任务（并发由 AsyncFetcher 按 host 限制）"""
+    if not sid: return None
+    det=SUBJECTS.get_many(user_id,[sid],[sid] if need_time else ()).get(sid)
+    if det: return det
+    key=(str(user_id),sid)
+    task=_INFLIGHT.get(key)
+    if task is None:
+        async def run():
+            try:
+                det=await fetch_subject_detail_async(af,sid)
+                if det: SUBJECTS.put(user_id,sid,det)
+                return det
+            finally:
+                _INFLIGHT.pop(key,None)
+        task=_INFLIGHT[key]=asyncio.ensure_future(run())
+    return await asyncio.shield(task)
+
+def _refine_plan(row,interests_map,deep_refine,deep_days):
+    """
+    返回 (sid, dt, typ, need_deep)：interests 命中情况以及是否需要单条兜底。
+    interests 带回的类型（_typed）与上映年份（release_year）直接记到行上，供 Trakt 查询计划使用。
+    """
     sid=extract_subject_id(row.get("douban_link",""))
     today=date.today()
     dt=None
@@ -106,7 +196,9 @@ def refine_datetime(row,interests_map,user_id,deep_refine=False,deep_days=None):
     if sid and sid in interests_map:
         meta=interests_map[sid]
         if meta.get("create_time"): dt=meta["create_time"]
-        if meta.get("douban_type"): typ=meta["douban_type"]
+        if meta.get("douban_type"):
+            typ=meta["douban_type"]; row["_typed"]=True
+        if meta.get("year") and not row.get("release_year"): row["release_year"]=meta["year"]
 
     if not dt and row.get("date"):
         dt=f"{row['date']} 12:00:00"
@@ -119,11 +211,15 @@ def refine_datetime(row,interests_map,user_id,deep_refine=False,deep_days=None):
                 if (today-d0).days>deep_days:
                     need_deep=False
             except: pass
-    if need_deep:
-        det=fetch_subject_detail(sid)
-        if det.get("create_time"): dt=det["create_time"]
-        if det.get("type"): typ=det["type"]
+    return sid,dt,typ,need_deep
 
+def _refine_apply(row,dt,typ,det):
+    if det:
+        if det.get("create_time"): dt=det["create_time"]
+        if det.get("type"):
+            typ=det["type"]; row["_typed"]=True
+        if det.get("year") and not row.get("release_year"): row["release_year"]=det["year"]
+        if (det.get("ids") or {}).get("imdb"): row["_imdb"]=det["ids"]["imdb"]
     if not typ: typ=fallback_detect_type(row.get("title",""))
     season= extract_season_number(row.get("title",""))
     row.update({
@@ -131,4 +227,30 @@ def refine_datetime(row,interests_map,user_id,deep_refine=False,deep_days=None):
         "type": typ,
         "season": str(season or ""),
     })
-    return row
\ No newline at end of file
+    return row
+
+def _attach_ids(row,det):
+    # 不需要兜底补时的行只取详情里的 IMDb id（--resolve-ids）
+    if det and (det.get("ids") or {}).get("imdb"): row["_imdb"]=det["ids"]["imdb"]
+    return row
+
+def refine_rows(rows,interests_map,user_id,deep_refine=False,deep_days=None):
+    """
+    整页补时：先规划，需要兜底的 sid 去重后一次性批量解析，再逐行回填。
+    config.RESOLVE_IDS 时整页的 sid 都取详情（主要为 IMDb id，已存储的不再请求）。
+    """
+    plans=[_refine_plan(row,interests_map,deep_refine,deep_days) for row in rows]
+    want=[sid for sid,_,_,need in plans if need or config.RESOLVE_IDS]
+    details=resolve_subjects(user_id,want,[sid for sid,_,_,need in plans if need]) if want else {}
+    return [_refine_apply(row,dt,typ,details.get(sid)) if need else
+            _attach_ids(_refine_apply(row,dt,typ,None),details.get(sid))
+            for row,(sid,dt,typ,need) in zip(rows,plans)]
+
+def refine_datetime(row,interests_map,user_id,deep_refine=False,deep_days=None):
+    return refine_rows([row],interests_map,user_id,deep_refine,deep_days)[0]
+
+async def refine_datetime_async(af,row,interests_map,user_id,deep_refine=False,deep_days=None):
+    sid,dt,typ,need_deep=_refine_plan(row,interests_map,deep_refine,deep_days)
+    det=await resolve_subject_async(af,user_id,sid,need_deep) if need_deep or config.RESOLVE_IDS else None
+    if need_deep: return _refine_apply(row,dt,typ,det)
+    return _attach_ids(_refine_apply(row,dt,typ,None),det)
@@ -1,81 +1,299 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import sys, argparse, time, random
+import sys, argparse, time, random, asyncio
 from datetime import datetime
-from bs4 import BeautifulSoup
 
 # Handle imports for standalone script execution
-from douban import get_interests_map, refine_datetime, extract_subject_id, fallback_detect_type
-from session_utils import fetch, polite_sleep
-from trakt import search_trakt
+from douban import (get_interests_map, refine_rows, extract_subject_id, fallback_detect_type,
+                    get_interests_map_async, refine_datetime_async, fetch_interests_page,
+                    fetch_interests_page_async, interest_to_row, INTERESTS_PAGE, SUBJECTS)
+from session_utils import fetch, configure_cache, CACHE
+from common.http_cache import LIST_URLS
+from common.transport import STATS
+import trakt
+from trakt import search_trakt, search_trakt_async, configure_index, SEARCH_CACHE
 import config
-from exporter import save_csv
-
-IS_OVER=False
-
-def get_max_page(user_id):
-    url=f"https://movie.douban.com/people/{user_id}/collect"
-    html=fetch(url,referer="https://movie.douban.com/")
-    soup=BeautifulSoup(html,"lxml")
-    p=soup.find("div",{"class":"paginator"})
-    if p and p.find_all("a"):
-        try: return int(p.find_all("a")[-2].get_text())
-        except: return 1
-    return 1
-
-def parse_collect_page(url,interests_map,user_id,deep_refine,deep_days,start_date,client_id):
-    global IS_OVER
-    html=fetch(url,referer="https://movie.douban.com/")
-    if not html: return []
-    soup=BeautifulSoup(html,"lxml")
-    items=soup.find_all("div",{"class":"item"})
+from exporter import CsvStreamWriter, iter_csv
+from collect_parser import parse_collect_items, parse_max_page
+from watermark import load_watermark, save_watermark, compute_watermark
+from pipeline import ExportPipeline
+
+PAGE_SIZE=15
+
+def collect_url(user_id,start):
+    return f"https://movie.douban.com/people/{user_id}/collect?start={start}&sort=time&rating=all&filter=all&mode=grid"
+
+def page_sleep():
+    time.sleep(0.6+random.random()*0.5)
+
+def get_max_page(user_id,html=None):
+    """html 为已抓取的第 1 页时直接解析，避免重复请求"""
+    if html is None:
+        url=f"https://movie.douban.com/people/{user_id}/collect"
+        html=fetch(url,referer="https://movie.douban.com/")
+    return parse_max_page(html)
+
+def extract_collect_rows(html,start_date,watermark=None):
+    """
+    只做 HTML 解析，返回 (rows, over)：
+    over=True 表示遇到了早于 start_date 的条目或上次运行的水位线，后续页无需再抓。
+    """
+    if not html: return [],False
+    try: cutoff=datetime.strptime(start_date,"%Y%m%d")
+    except: cutoff=None
     out=[]
-    for it in items:
-        a=it.find("a")
-        if not a or not a.get("href"): continue
-        link=a["href"].strip()
-        sid=extract_subject_id(link)
-
-        title= (it.find("li",{"class":"title"}).em.get_text(strip=True)
-                if it.find("li",{"class":"title"}) else "")
-        date_span=it.find("span",{"class":"date"})
-        date_str=date_span.get_text(strip=True) if date_span else ""
-        if date_str:
+    for link,title,date_str,year in parse_collect_items(html):
+        if watermark:
+            # 水位线条目本身及更早日期的条目都已在上次输出中
+            if extract_subject_id(link)==watermark.get("subject_id"): return out,True
+            if date_str and watermark.get("date") and date_str<watermark["date"]: return out,True
+        if date_str and cutoff is not None:
             try:
-                if datetime.strptime(date_str,"%Y-%m-%d")<=datetime.strptime(start_date,"%Y%m%d"):
-                    IS_OVER=True
-                    break
+                if datetime.strptime(date_str,"%Y-%m-%d")<=cutoff:
+                    return out,True
             except: pass
 
-        row={"title":title,"date":date_str,"datetime":f"{date_str} 12:00:00","type":fallback_detect_type(title),
-             "season":"","slug":"","matched_title":"","matched_year":"","found":"0","douban_link":link}
-        row=refine_datetime(row,interests_map,user_id,deep_refine,deep_days)
+        out.append({"title":title,"date":date_str,"datetime":f"{date_str} 12:00:00","type":fallback_detect_type(title),
+                    "season":"","slug":"","matched_title":"","matched_year":"","found":"0","douban_link":link,
+                    "release_year":year,"match_confidence":""})
+    return out,False
+
+def _apply_match(row,hit):
+    """
+    写入匹配结果与置信度；类型未经豆瓣确认（无 _typed）时以 Trakt 候选类型为准。
+    置信度低于 config.MATCH_LOW_CONFIDENCE 的行保留候选（slug 等）但记 found=0，
+    不会被 csv_to_trakt 导入，人工核对后改为 1 即可；不再追加查询。
+    """
+    if hit:
+        low=hit.confidence<config.MATCH_LOW_CONFIDENCE
+        row.update({"slug":hit.slug,"matched_title":hit.title,"matched_year":hit.year or "","found":"0" if low else "1",
+                    "match_confidence":f"{hit.confidence:.2f}"})
+        if not row.get("_typed") and hit.type in ("movie","show"): row["type"]=hit.type
+        if low:
+            print(f"  [低置信度 {hit.confidence:.2f}，记为 found=0 待核对] {row['title']} → {hit.title} ({hit.year or '?'})")
+    return row
+
+def _search_args(row):
+    return row["title"],row.get("release_year") or "",row["type"],bool(row.get("_typed"))
+
+def _id_plan(row):
+    """
+    按外部 ID 匹配的准备：(sid, 已记录的 TraktMatch, 待查询的 IMDb id)。
+    sid 已映射到 Trakt 条目时直接采用，不发请求；已知查无结果或没有 IMDb id 时走标题搜索。
+    """
+    sid=extract_subject_id(row.get("douban_link") or "")
+    known=SUBJECTS.get_trakt(sid)
+    if known:
+        return sid,trakt.TraktMatch(known["slug"],known["title"],known["year"],known["type"],1.0),None
+    if known=={}: return sid,None,None
+    return sid,None,row.get("_imdb") or SUBJECTS.imdb(sid)
+
+def _id_store(sid,hit,ok):
+    # 请求失败不记录，下次再试；查无结果记为负缓存
+    if ok: SUBJECTS.put_trakt(sid,hit._asdict() if hit else None)
+
+def match_row(row,client_id):
+    title,year,typ,known=_search_args(row)
+    sid,hit,imdb=_id_plan(row)
+    if hit is None and imdb:
+        hit,ok=trakt.lookup_imdb(imdb,typ,client_id,known)
+        _id_store(sid,hit,ok)
+    return _apply_match(row,hit or search_trakt(title,year,typ,client_id,known))
+
+async def match_row_async(af,row,client_id):
+    title,year,typ,known=_search_args(row)
+    sid,hit,imdb=_id_plan(row)
+    if hit is None and imdb:
+        hit,ok=await trakt.lookup_imdb_async(af,imdb,typ,client_id,known)
+        _id_store(sid,hit,ok)
+    return _apply_match(row,hit or await search_trakt_async(af,title,year,typ,client_id,known))
+
+def _fetch_collect_page(user_id,start,delay):
+    # 每个 worker 在请求前错峰等待，保持与顺序模式相近的单连接间隔
+    if delay: page_sleep()
+    return fetch(collect_url(user_id,start),referer="https://movie.douban.com/")
 
-        year_hint=date_str[:4] if date_str else ""
-        slug,mtitle,myear=search_trakt(row["title"],year_hint,row["type"],client_id)
-        if slug:
-            row.update({"slug":slug,"matched_title":mtitle,"matched_year":myear or "","found":"1"})
+def _load_incremental(user_id,outfile,incremental):
+    watermark=load_watermark(outfile,user_id) if incremental else None
+    if watermark:
+        print(f"增量模式：上次水位线 {watermark.get('create_time')} (subject {watermark.get('subject_id')})")
+        # 缓存里的列表页 / interests 分页可能早于新标记的条目，一律先向服务器验证
+        CACHE.revalidate=LIST_URLS
+    elif incremental:
+        print("增量模式：未找到水位线或输出文件，执行全量抓取")
+    return watermark
+
+def _open_writer(user_id,start_date,outfile,resume,source="html"):
+    writer=CsvStreamWriter(outfile,{"user_id":str(user_id),"start_date":start_date,"source":source})
+    start_page=writer.open(resume)
+    if start_page>1 and not writer.done:
+        print(f"从第 {start_page} 页继续（已写入 {writer.rows} 条）")
+    return writer,start_page
+
+def _finish(writer,user_id,outfile,watermark):
+    if watermark:
+        print(f"新增 {writer.rows} 条，合并到已有输出")
+    writer.finalize(merge_old=bool(watermark))
+    save_watermark(outfile,user_id,compute_watermark(iter_csv(outfile)))
+    print(CACHE.summary())
+    print(SEARCH_CACHE.summary())
+    if trakt.LIMITER.requests: print(trakt.LIMITER.summary())
+    print(STATS.summary())
+    if SUBJECTS.hits or SUBJECTS.fetched: print(SUBJECTS.summary())
+    if trakt.TITLE_INDEX is not None: print(trakt.TITLE_INDEX.summary())
+
+def _interrupted(writer):
+    writer.close()
+    print(f"中断：已完成 {writer.page} 页（{writer.rows} 条），可加 --resume 从断点继续")
+
+def extract_interest_rows(js,start_date,watermark=None):
+    """
+    interests 接口的一页 → (rows, over)，与 extract_collect_rows 对应：
+    行直接由 JSON 构造（datetime 即 create_time），无需 HTML 解析与补时。
+    """
+    arr=(js or {}).get("interests") or []
+    start=datetime.strptime(start_date,"%Y%m%d").strftime("%Y-%m-%d")
+    out=[]
+    for it in arr:
+        row=interest_to_row(it)
+        if not row: continue
+        ct=row["datetime"]
+        if watermark:
+            if extract_subject_id(row["douban_link"])==watermark.get("subject_id"): return out,True
+            if ct and watermark.get("create_time") and ct<watermark["create_time"]: return out,True
+        if row["date"] and row["date"]<=start: return out,True
         out.append(row)
-        polite_sleep()
-    return out
-
-def run(user_id,start_date,deep_refine,deep_days,client_id,outfile):
-    global IS_OVER
-    IS_OVER=False
-    interests_map=get_interests_map(user_id)
-    rows=[]
-    maxp=get_max_page(user_id)
-    page_no=1
-    for idx in range(0,maxp*15,15):
-        if IS_OVER: break
-        url=f"https://movie.douban.com/people/{user_id}/collect?start={idx}&sort=time&rating=all&filter=all&mode=grid"
-        print(f"抓取第 {page_no} 页...")
-        data=parse_collect_page(url,interests_map,user_id,deep_refine,deep_days,start_date,client_id)
-        rows.extend(data)
-        print(f"  -> {len(data)} 条")
-        page_no+=1
-        time.sleep(0.6+random.random()*0.5)
-    save_csv(rows,outfile)
+    return out,not arr
+
+def _interests_max_page(js):
+    total=int((js or {}).get("total") or 0)
+    return max(1,(total+INTERESTS_PAGE-1)//INTERESTS_PAGE)
+
+def _fetch_api_page(user_id,page_no):
+    time.sleep(0.2)
+    js=fetch_interests_page(user_id,(page_no-1)*INTERESTS_PAGE)
+    if js is None: raise RuntimeError(f"interests 接口第 {page_no} 页请求失败")
+    return js
+
+def run(user_id,start_date,deep_refine,deep_days,client_id,outfile,workers=1,incremental=False,resume=False,
+        api_only=False,refine_workers=4,match_workers=4):
+    """
+    同步版本：与 run_async 使用同一条 ExportPipeline，各阶段的 requests 调用放到线程里执行，
+    不依赖 aiohttp。workers 为列表页的预取窗口（每个请求前仍错峰等待），
+    补时按整页调用 refine_rows（整页 sid 去重后批量取详情），refine_workers 为同时补时的页数，
+    match_workers 为匹配阶段的并发线程数；输出与逐页顺序处理一致。
+    api_only=True 时直接由 interests 接口（每页 100 条）构造行，跳过列表页 HTML；
+    接口不可用时回退到列表页抓取。
+    """
+    watermark=_load_incremental(user_id,outfile,incremental)
+    source,first_js="html",None
+    if api_only:
+        first_js=fetch_interests_page(user_id,0)
+        if first_js and "interests" in first_js:
+            source="api"
+        else:
+            print("interests 接口不可用，回退到列表页抓取")
+    writer,start_page=_open_writer(user_id,start_date,outfile,resume,source)
+    if not writer.done:
+        match=lambda row: asyncio.to_thread(match_row,row,client_id)
+        if source=="api":
+            if start_page==1: writer.max_page=_interests_max_page(first_js)
+            first=first_js if start_page==1 else None
+            pipe=ExportPipeline(
+                fetch_page=lambda page_no: asyncio.to_thread(_fetch_api_page,user_id,page_no),
+                parse=lambda js: extract_interest_rows(js,start_date,watermark),
+                refine=_keep,match=match,on_page=writer.write_page,
+                max_page=writer.max_page,start_page=start_page,page_window=workers,
+                refine_workers=1,match_workers=match_workers)
+        else:
+            interests_map=get_interests_map(user_id,watermark)
+            first=None
+            if start_page==1:
+                first=fetch(collect_url(user_id,0),referer="https://movie.douban.com/")
+                writer.max_page=get_max_page(user_id,first)
+            pipe=ExportPipeline(
+                fetch_page=lambda page_no: asyncio.to_thread(_fetch_collect_page,user_id,(page_no-1)*PAGE_SIZE,
+                                                             page_no>1),
+                parse=lambda html: extract_collect_rows(html,start_date,watermark),
+                refine=None,
+                refine_page=lambda rows: asyncio.to_thread(refine_rows,rows,interests_map,user_id,deep_refine,
+                                                           deep_days),
+                match=match,on_page=writer.write_page,
+                max_page=writer.max_page,start_page=start_page,page_window=workers,
+                refine_workers=refine_workers,match_workers=match_workers)
+        try:
+            asyncio.run(pipe.run(first))
+        except BaseException:
+            _interrupted(writer)
+            raise
+        print(pipe.report())
+        writer.mark_done()
+    _finish(writer,user_id,outfile,watermark)
+
+async def _keep(row):
+    return row
+
+async def run_async(user_id,start_date,deep_refine,deep_days,client_id,outfile,workers=4,
+                    refine_workers=4,match_workers=4,incremental=False,resume=False,api_only=False):
+    """
+    异步流水线版本（见 pipeline.ExportPipeline）：抓取、补时、匹配分阶段并发，
+    所有请求在同一个事件循环上进行，并发度由 AsyncFetcher 的 per-host 上限约束。
+    workers 为列表页的预取窗口；输出与顺序模式一致，结束时打印各阶段吞吐。
+    api_only 时 scrape 阶段改为拉取 interests 接口页，补时阶段直接透传。
+    """
+    from async_session import AsyncFetcher
+    referer="https://movie.douban.com/"
+    watermark=_load_incremental(user_id,outfile,incremental)
+    async with AsyncFetcher(cache=CACHE) as af:
+        source,first_js="html",None
+        if api_only:
+            first_js=await fetch_interests_page_async(af,user_id,0)
+            if first_js and "interests" in first_js:
+                source="api"
+            else:
+                print("interests 接口不可用，回退到列表页抓取")
+        writer,start_page=_open_writer(user_id,start_date,outfile,resume,source)
+        if writer.done:
+            pipe=None
+        elif source=="api":
+            if start_page==1: writer.max_page=_interests_max_page(first_js)
+            async def fetch_api_page(page_no):
+                js=await fetch_interests_page_async(af,user_id,(page_no-1)*INTERESTS_PAGE)
+                if js is None: raise RuntimeError(f"interests 接口第 {page_no} 页请求失败")
+                return js
+            first=first_js if start_page==1 else None
+            pipe=ExportPipeline(
+                fetch_page=fetch_api_page,
+                parse=lambda js: extract_interest_rows(js,start_date,watermark),
+                refine=_keep,
+                match=lambda row: match_row_async(af,row,client_id),
+                on_page=writer.write_page,
+                max_page=writer.max_page,start_page=start_page,page_window=workers,
+                refine_workers=1,match_workers=match_workers)
+        else:
+            interests_map=await get_interests_map_async(af,user_id,watermark)
+            first=None
+            if start_page==1:
+                first=await af.fetch(collect_url(user_id,0),referer=referer)
+                writer.max_page=get_max_page(user_id,first)
+            pipe=ExportPipeline(
+                fetch_page=lambda page_no: af.fetch(collect_url(user_id,(page_no-1)*PAGE_SIZE),referer=referer),
+                parse=lambda html: extract_collect_rows(html,start_date,watermark),
+                refine=lambda row: refine_datetime_async(af,row,interests_map,user_id,deep_refine,deep_days),
+                match=lambda row: match_row_async(af,row,client_id),
+                on_page=writer.write_page,
+                max_page=writer.max_page,start_page=start_page,page_window=workers,
+                refine_workers=refine_workers,match_workers=match_workers)
+        if pipe is not None:
+            try:
+                await pipe.run(first)
+            except BaseException:
+                _interrupted(writer)
+                raise
+    if pipe is not None:
+        print(pipe.report())
+        writer.mark_done()
+    _finish(writer,user_id,outfile,watermark)
 
 def main():
     p=argparse.ArgumentParser(description="豆瓣观影记录抓取+Trakt匹配导出CSV")
@@ -85,8 +303,31 @@ def main():
     p.add_argument("--deep-refine-window",type=int,default=None,help="只对最近N天内的记录做兜底补时")
     p.add_argument("--out",default="movie.csv",help="输出CSV路径")
     p.add_argument("--trakt-client-id",required=True,help="Trakt Client ID")
+    p.add_argument("--workers",type=int,default=1,help="列表页的预取窗口（默认 1；--async 模式同样按给定值）")
+    p.add_argument("--async",dest="use_async",action="store_true",help="使用 asyncio 流水线引擎（需安装 aiohttp）")
+    p.add_argument("--refine-workers",type=int,default=4,help="补时阶段的并发数（默认 4）")
+    p.add_argument("--match-workers",type=int,default=4,help="Trakt 匹配阶段的并发数（默认 4）")
+    p.add_argument("--incremental",action="store_true",help="只抓取上次运行水位线之后的新记录，并合并到已有输出")
+    p.add_argument("--resume",action="store_true",help="从上次中断的断点（<out>.checkpoint.json）继续，不重抓已完成的页")
+    p.add_argument("--api-only",action="store_true",help="直接由 interests 接口构造行，跳过列表页 HTML（接口不可用时自动回退）")
+    p.add_argument("--resolve-ids",action="store_true",help="为每个条目取 subject 详情中的 IMDb id，按 ID 精确匹配 Trakt（结果持久保存）")
+    p.add_argument("--title-index",default=None,help="本地片库导出（TSV/JSONL），匹配时优先查询，首次使用自动建索引")
+    p.add_argument("--no-cache",action="store_true",help="绕过本地 HTTP 缓存、Trakt 搜索缓存与 subject 详情库，全部重新请求")
+    p.add_argument("--cache-path",default=None,help="HTTP 缓存 SQLite 文件路径（默认 ~/.cache/doubanTOOLs/http_cache.sqlite）")
     args=p.parse_args()
-    run(args.user_id,args.start_date,args.deep_refine,args.deep_refine_window,args.trakt_client_id,args.out)
+    configure_cache(args.cache_path,not args.no_cache)
+    SEARCH_CACHE.enabled=not args.no_cache
+    SUBJECTS.enabled=not args.no_cache
+    configure_index(args.title_index)
+    config.RESOLVE_IDS=args.resolve_ids
+    if args.use_async:
+        asyncio.run(run_async(args.user_id,args.start_date,args.deep_refine,args.deep_refine_window,
+                              args.trakt_client_id,args.out,args.workers,
+                              args.refine_workers,args.match_workers,args.incremental,args.resume,
+                              args.api_only))
+        return
+    run(args.user_id,args.start_date,args.deep_refine,args.deep_refine_window,args.trakt_client_id,args.out,args.workers,
+        args.incremental,args.resume,args.api_only,args.refine_workers,args.match_workers)
 
 if __name__=="__main__":
     main()
\ No newline at end of file
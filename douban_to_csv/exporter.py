@@ -1,11 +1,120 @@
-import csv, os
+import csv, json, os, sys
 
-FIELDS=["title","date","datetime","type","season","slug","matched_title","matched_year","found","douban_link"]
+# 添加项目根目录到 Python 路径（共享 common 包）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.rows import EXPORT_FIELDS, iter_rows, write_rows
+
+FIELDS=list(EXPORT_FIELDS)
 
 def save_csv(rows:list,filename:str):
     path=os.path.abspath(filename)
     with open(path,"w",encoding="utf-8",newline="") as f:
-        w=csv.DictWriter(f,fieldnames=FIELDS)
-        w.writeheader()
-        w.writerows(rows)
-    print(f"保存至: {path} (共 {len(rows)} 条)")
\ No newline at end of file
+        write_rows(f,rows,FIELDS)
+    print(f"保存至: {path} (共 {len(rows)} 条)")
+
+def iter_csv(filename:str):
+    """逐行读取已有输出为 common.rows.Row（dict 兼容，缺失的列为空串）"""
+    path=os.path.abspath(filename)
+    if not os.path.exists(path): return
+    yield from iter_rows(path)
+
+class CsvStreamWriter:
+    """
+    逐页写出：行追加到 <out>.part，每页 flush+fsync 后更新 <out>.checkpoint.json
+    （已完成页号、已写行数、文件偏移）。中途失败时两者保留，resume 时截断到最后一个
+    完整页的偏移继续追加；finalize() 生成最终 <out> 并清理中间文件。
+    """
+    def __init__(self,filename:str,meta:dict):
+        self.path=os.path.abspath(filename)
+        self.part_path=self.path+".part"
+        self.ckpt_path=self.path+".checkpoint.json"
+        self.meta=meta
+        self.page=0
+        self.rows=0
+        self.offset=0
+        self.max_page=1
+        self.done=False
+        self._f=None
+
+    def _load_checkpoint(self):
+        if not (os.path.exists(self.ckpt_path) and os.path.exists(self.part_path)): return None
+        try:
+            with open(self.ckpt_path,"r",encoding="utf-8") as f:
+                ck=json.load(f) or {}
+        except Exception:
+            return None
+        if ck.get("meta")!=self.meta:
+            print(f"断点参数不一致，忽略：{self.ckpt_path}")
+            return None
+        return ck
+
+    def open(self,resume=False)->int:
+        """返回需要开始抓取的页号"""
+        ck=self._load_checkpoint() if resume else None
+        if ck:
+            self.page=ck.get("page",0)
+            self.rows=ck.get("rows",0)
+            self.offset=ck.get("offset",0)
+            self.max_page=ck.get("max_page",1)
+            self.done=bool(ck.get("done"))
+            self._f=open(self.part_path,"r+",encoding="utf-8",newline="")
+            self._f.seek(self.offset)
+            self._f.truncate()
+        else:
+            if resume: print("未找到可用断点，从头开始")
+            self._f=open(self.part_path,"w",encoding="utf-8",newline="")
+            write_rows(self._f,(),FIELDS)
+            self._sync()
+        return self.page+1
+
+    def _sync(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self.offset=self._f.tell()
+        tmp=self.ckpt_path+".tmp"
+        with open(tmp,"w",encoding="utf-8") as f:
+            json.dump({"meta":self.meta,"page":self.page,"rows":self.rows,"offset":self.offset,
+                       "max_page":self.max_page,"done":self.done},f,ensure_ascii=False)
+        os.replace(tmp,self.ckpt_path)
+
+    def write_page(self,page_no:int,rows:list):
+        write_rows(self._f,rows,FIELDS,header=False)
+        self.page=page_no
+        self.rows+=len(rows)
+        self._sync()
+
+    def mark_done(self):
+        self.done=True
+        self._sync()
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f=None
+
+    def finalize(self,merge_old=False)->int:
+        """
+        生成最终输出：按豆瓣链接去重（resume 期间列表变动可能产生重复页），
+        merge_old=True 时把已有 <out> 中未重复的旧行接在后面。逐行流式处理，不整表载入内存。
+        """
+        self.close()
+        tmp=self.path+".tmp"
+        seen=set(); n=0
+        with open(tmp,"w",encoding="utf-8",newline="") as f:
+            w=csv.writer(f)
+            w.writerow(FIELDS)
+            for row in iter_csv(self.part_path):
+                link=row.douban_link
+                if link:
+                    if link in seen: continue
+                    seen.add(link)
+                w.writerow(row.values(FIELDS)); n+=1
+            if merge_old:
+                for row in iter_csv(self.path):
+                    if row.douban_link and row.douban_link in seen: continue
+                    w.writerow(row.values(FIELDS)); n+=1
+        os.replace(tmp,self.path)
+        for p in (self.part_path,self.ckpt_path):
+            if os.path.exists(p): os.remove(p)
+        print(f"保存至: {self.path} (共 {n} 条)")
+        return n
@@ -0,0 +1,166 @@
+import asyncio, time
+
+class StageStats:
+    """单个阶段的计数与耗时，用于找出瓶颈阶段"""
+    def __init__(self,name,workers):
+        self.name=name
+        self.workers=workers
+        self.items=0
+        self.busy=0.0
+
+    def add(self,t0,n=1):
+        self.items+=n
+        self.busy+=time.perf_counter()-t0
+
+    def line(self,wall):
+        rate=self.items/wall if wall>0 else 0.0
+        util=self.busy/(wall*self.workers) if wall>0 else 0.0
+        return f"  {self.name:<7} 条数={self.items:<6} 忙碌={self.busy:7.1f}s  吞吐={rate:6.2f} 条/s  利用率={util:6.1%}"
+
+class ExportPipeline:
+    """
+    scrape → refine → match 三段流水线，阶段之间用有界队列衔接：
+      - scrape：按页序抓取并解析列表页（最多预取 page_window 页），把行送入 refine 队列；
+      - refine：refine_workers 个协程并发补时（逐行，或给定 refine_page 时逐页）；
+      - match ：match_workers 个协程并发做 Trakt 匹配。
+    因此第 1 页的 Trakt 匹配会与第 2 页的抓取、补时重叠进行。
+    每行带全局序号，输出按序号重排，结果与顺序模式一致。
+
+    fetch_page(page_no) -> html；parse(html) -> (rows, over)；
+    refine(row) / match(row) 为协程，返回处理后的行；
+    给定 refine_page(rows) 时补时按整页进行（一页的行一起交给它，便于整页去重、批量请求），不再调用 refine；
+    on_page(page_no, rows) 在某页及其之前各页全部完成时按页序调用（便于逐页落盘）。
+    """
+    def __init__(self,fetch_page,parse,refine,match,on_page,max_page,start_page=1,
+                 page_window=4,refine_workers=4,match_workers=4,queue_size=32,refine_page=None):
+        self.fetch_page=fetch_page
+        self.parse=parse
+        self.refine=refine
+        self.refine_page=refine_page
+        self.match=match
+        self.on_page=on_page
+        self.max_page=max_page
+        self.start_page=start_page
+        self.page_window=max(1,page_window)
+        self.refine_workers=max(1,refine_workers)
+        self.match_workers=max(1,match_workers)
+        self.q_refine=asyncio.Queue(maxsize=queue_size)
+        self.q_match=asyncio.Queue(maxsize=queue_size)
+        self.stats={
+            "scrape":StageStats("scrape",1),
+            "refine":StageStats("refine",self.refine_workers),
+            "match":StageStats("match",self.match_workers),
+        }
+        self.pages=0
+        self.total=0
+        self._done={}
+        self._pages=[]   # [(page_no, 首行序号, 行数)]，按页序登记
+        self.started=None
+
+    async def _scrape(self,first_html):
+        st=self.stats["scrape"]
+        pending=[]
+        nxt_page=self.start_page+1
+        def prefetch():
+            nonlocal nxt_page
+            while len(pending)<self.page_window and nxt_page<=self.max_page:
+                pending.append(asyncio.create_task(self.fetch_page(nxt_page)))
+                nxt_page+=1
+        try:
+            t0=time.perf_counter()
+            html=first_html
+            if html is None:
+                if self.start_page>self.max_page: return
+                html=await self.fetch_page(self.start_page)
+            prefetch()
+            page_no=self.start_page
+            while True:
+                rows,over=self.parse(html)
+                st.add(t0,len(rows))
+                self.pages+=1
+                print(f"抓取第 {page_no} 页... -> {len(rows)} 条")
+                self._pages.append((page_no,self.total,len(rows)))
+                if not rows: self._flush()
+                if self.refine_page is not None:
+                    if rows: await self.q_refine.put((self.total,rows))
+                    self.total+=len(rows)
+                else:
+                    for row in rows:
+                        await self.q_refine.put((self.total,row))
+                        self.total+=1
+                if over or not pending: break
+                # scrape 忙碌时间 = 等待页面到达 + 解析，不含向下游队列 put 的背压等待
+                t0=time.perf_counter()
+                html=await pending.pop(0)
+                prefetch()
+                page_no+=1
+        finally:
+            for t in pending: t.cancel()
+            await asyncio.gather(*pending,return_exceptions=True)
+
+    async def _refiner(self):
+        st=self.stats["refine"]
+        while True:
+            seq,item=await self.q_refine.get()
+            try:
+                t0=time.perf_counter()
+                if self.refine_page is not None:
+                    rows=await self.refine_page(item)
+                    st.add(t0,len(rows))
+                else:
+                    rows=[await self.refine(item)]
+                    st.add(t0)
+                for i,row in enumerate(rows):
+                    await self.q_match.put((seq+i,row))
+            finally:
+                self.q_refine.task_done()
+
+    async def _matcher(self):
+        st=self.stats["match"]
+        while True:
+            seq,row=await self.q_match.get()
+            try:
+                t0=time.perf_counter()
+                row=await self.match(row)
+                st.add(t0)
+                self._emit(seq,row)
+            finally:
+                self.q_match.task_done()
+
+    def _emit(self,seq,row):
+        self._done[seq]=row
+        self._flush()
+
+    def _flush(self):
+        # 按页序交付：某页的所有行都完成（且之前的页已交付）才调用 on_page
+        while self._pages:
+            page_no,first,n=self._pages[0]
+            if any(i not in self._done for i in range(first,first+n)): break
+            self._pages.pop(0)
+            self.on_page(page_no,[self._done.pop(i) for i in range(first,first+n)])
+
+    async def run(self,first_html=None):
+        self.started=time.perf_counter()
+        workers=[asyncio.create_task(self._refiner()) for _ in range(self.refine_workers)]
+        workers+=[asyncio.create_task(self._matcher()) for _ in range(self.match_workers)]
+        async def finish():
+            await self._scrape(first_html)
+            await self.q_refine.join()
+            await self.q_match.join()
+        fin=asyncio.create_task(finish())
+        try:
+            # worker 只会因异常结束；一旦出现异常立即向上抛出，避免在 join 上死等
+            while True:
+                done,_=await asyncio.wait([fin,*workers],return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    t.result()
+                if fin in done: break
+        finally:
+            for t in [fin,*workers]: t.cancel()
+            await asyncio.gather(fin,*workers,return_exceptions=True)
+
+    def report(self):
+        wall=time.perf_counter()-self.started if self.started else 0.0
+        lines=[f"流水线统计：{self.pages} 页 / {self.total} 条，总耗时 {wall:.1f}s"]
+        lines+=[s.line(wall) for s in self.stats.values()]
+        return "\n".join(lines)
@@ -0,0 +1,102 @@
+import os, json, sqlite3, threading, time
+
+DEFAULT_PATH=os.path.join(os.path.expanduser("~"),".cache","doubanTOOLs","trakt_search.sqlite")
+HIT_TTL=30*24*3600     # 有结果：30 天
+MISS_TTL=3*24*3600     # 无结果：3 天后再试
+BUSY_TIMEOUT=30        # 批量模式下多个进程共用同一文件，写锁最多等待的秒数
+
+_SCHEMA="""
+CREATE TABLE IF NOT EXISTS searches (
+    key        TEXT PRIMARY KEY,
+    query      TEXT NOT NULL,
+    typ        TEXT NOT NULL,
+    year       TEXT NOT NULL,
+    items      TEXT NOT NULL,
+    found      INTEGER NOT NULL,
+    stored_at  REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+def normalize_query(q:str)->str:
+    return " ".join((q or "").split()).casefold()
+
+def _trim(items,typ):
+    """只保留匹配需要的字段（type/title/year/ids），保持与 Trakt 返回相同的结构；typ 可为 "movie,show" """
+    out=[]
+    for it in items or []:
+        t=it.get("type") or typ
+        obj=it.get(t) or {}
+        out.append({"type":t,t:{"title":obj.get("title"),"year":obj.get("year"),"ids":obj.get("ids") or {}}})
+    return out
+
+class SearchCache:
+    """
+    Trakt 搜索结果缓存：key=(规范化查询, 类型, years 过滤)，
+    值为候选列表；空列表即"无结果"标记。命中/未命中分别计数，用于统计省下的 API 调用。
+    读写出错（如其他进程长时间占用）时按未命中处理，不影响搜索本身。
+    """
+    def __init__(self,path=None,hit_ttl=HIT_TTL,miss_ttl=MISS_TTL,enabled=True):
+        self.path=path or DEFAULT_PATH
+        self.hit_ttl=hit_ttl
+        self.miss_ttl=miss_ttl
+        self.enabled=enabled
+        self.hits=0
+        self.neg_hits=0
+        self.misses=0
+        self._lock=threading.Lock()
+        self._db=None
+
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)),exist_ok=True)
+            db=sqlite3.connect(self.path,check_same_thread=False,isolation_level=None,timeout=BUSY_TIMEOUT)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._db=db
+        return self._db
+
+    @staticmethod
+    def key(query,typ,year):
+        return f"{typ}|{year or ''}|{normalize_query(query)}"
+
+    def get(self,query,typ,year=""):
+        """返回候选列表（可能为空列表=已知无结果）；未缓存或已过期返回 None"""
+        if not self.enabled: return None
+        with self._lock:
+            try:
+                row=self._conn().execute("SELECT items,expires_at FROM searches WHERE key=?",
+                                         (self.key(query,typ,year),)).fetchone()
+            except sqlite3.OperationalError:
+                row=None  # 库被占用等：按未命中处理
+            if not row or row[1]<time.time():
+                self.misses+=1
+                return None
+            items=json.loads(row[0])
+            if items: self.hits+=1
+            else: self.neg_hits+=1
+        return items
+
+    def put(self,query,typ,year,items):
+        if not self.enabled: return
+        items=_trim(items,typ)
+        now=time.time()
+        ttl=self.hit_ttl if items else self.miss_ttl
+        with self._lock:
+            try:
+                self._conn().execute("INSERT OR REPLACE INTO searches VALUES (?,?,?,?,?,?,?,?)",
+                                     (self.key(query,typ,year),normalize_query(query),typ,year or "",
+                                      json.dumps(items,ensure_ascii=False),1 if items else 0,now,now+ttl))
+            except sqlite3.OperationalError:
+                pass  # 写不进缓存只影响下次是否命中
+
+    def summary(self):
+        saved=self.hits+self.neg_hits
+        return (f"Trakt 搜索缓存：命中 {self.hits}（无结果命中 {self.neg_hits}），"
+                f"未命中 {self.misses}，本次节省 {saved} 次 API 调用")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db=None
@@ -1,36 +1,43 @@
-import requests, random, time, os
-import certifi
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import random, time, os, sys
 
 import config
 
-SESSION = requests.Session()
-SESSION.headers.update({
+# 添加项目根目录到 Python 路径（共享 common 包）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.http_cache import HttpCache, cached_get
+from common.transport import CONNECT_TIMEOUT, session
+
+# 连接池、重试与超时策略见 common/transport.py
+SESSION = session({
     "User-Agent": config.USER_AGENT,
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
     "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-    "Connection": "keep-alive",
 })
-_retry = Retry(total=6, connect=3, read=5, status=5, backoff_factor=1.2,
-               status_forcelist=[429, 500, 502, 503, 504], allowed_methods=frozenset(["GET"]))
-_adapter = HTTPAdapter(max_retries=_retry, pool_connections=20, pool_maxsize=40)
-SESSION.mount("https://", _adapter)
-SESSION.mount("http://", _adapter)
 
-def fetch(url, params=None, timeout=config.REQUEST_TIMEOUT, referer=None):
+CACHE = HttpCache()
+
+# 读取超时取 config.REQUEST_TIMEOUT，连接超时沿用 common/transport.py
+TIMEOUT = (CONNECT_TIMEOUT, config.REQUEST_TIMEOUT)
+
+def configure_cache(path=None, enabled=True):
+    """命令行 --cache-path / --no-cache 在首次请求前调用"""
+    if path:
+        CACHE.path = path
+    CACHE.enabled = enabled
+
+def fetch(url, params=None, timeout=None, referer=None):
     headers = {}
     if referer:
         headers["Referer"] = referer
-    r = SESSION.get(url, params=params, headers=headers, timeout=timeout, verify=certifi.where())
+    r = cached_get(SESSION, CACHE, url, params=params, headers=headers, timeout=timeout or TIMEOUT)
     r.raise_for_status()
     return r.text
 
-def fetch_json(url, params=None, timeout=config.REQUEST_TIMEOUT, referer=None):
+def fetch_json(url, params=None, timeout=None, referer=None):
     headers = {}
     if referer:
         headers["Referer"] = referer
-    r = SESSION.get(url, params=params, headers=headers, timeout=timeout, verify=certifi.where())
+    r = cached_get(SESSION, CACHE, url, params=params, headers=headers, timeout=timeout or TIMEOUT)
     if r.status_code != 200:
         return None
     try:
@@ -0,0 +1,149 @@
+import os, json, sqlite3, threading, time
+
+DEFAULT_PATH=os.path.join(os.path.expanduser("~"),".cache","doubanTOOLs","subjects.sqlite")
+TRAKT_MISS_TTL=3*24*3600   # IMDb 在 Trakt 查无结果：3 天后再试
+BUSY_TIMEOUT=30            # 批量模式下多个进程共用同一文件，写锁最多等待的秒数
+
+_SCHEMA="""
+CREATE TABLE IF NOT EXISTS subjects (
+    sid            TEXT PRIMARY KEY,
+    type           TEXT NOT NULL,
+    title          TEXT NOT NULL,
+    original_title TEXT NOT NULL,
+    year           TEXT NOT NULL,
+    ids            TEXT NOT NULL,
+    stored_at      REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trakt_ids (
+    sid       TEXT PRIMARY KEY,
+    type      TEXT NOT NULL,
+    slug      TEXT NOT NULL,
+    title     TEXT NOT NULL,
+    year      TEXT NOT NULL,
+    ids       TEXT NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_times (
+    user_id     TEXT NOT NULL,
+    sid         TEXT NOT NULL,
+    create_time TEXT NOT NULL,
+    PRIMARY KEY (user_id, sid)
+);
+"""
+
+class SubjectStore:
+    """
+    subject 详情的本地存储（deep-refine 与按 IMDb id 匹配用）：
+      - subjects：条目级信息（type/title/year/ids），与用户无关，跨用户、跨运行共用；
+      - user_times：详情里带回的标记时间，按 (user_id, sid) 单独保存；
+      - trakt_ids：sid → Trakt 条目（由 IMDb id 精确查得），查无结果也记录，避免反复查询。
+    已存储的 subject 不再请求详情接口；请求失败的不写入，下次再试。
+    读写出错（如其他进程长时间占用）时按未存储处理，只是多请求一次详情。
+    """
+    def __init__(self,path=None,enabled=True):
+        self.path=path or DEFAULT_PATH
+        self.enabled=enabled
+        self.hits=0
+        self.fetched=0
+        self.trakt_hits=0
+        self._lock=threading.Lock()
+        self._db=None
+
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)),exist_ok=True)
+            db=sqlite3.connect(self.path,check_same_thread=False,isolation_level=None,timeout=BUSY_TIMEOUT)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._db=db
+        return self._db
+
+    def get_many(self,user_id,sids,need_time=()):
+        """
+        sid -> {"type","title","original_title","year","ids","create_time"}，只返回已存储的；
+        need_time 中的 sid 还要有该用户的标记时间，条目来自其他用户的导出（没有 user_times）时按未存储处理。
+        """
+        sids=[s for s in dict.fromkeys(sids) if s]
+        if not self.enabled or not sids: return {}
+        out={}
+        with self._lock:
+            try:
+                db=self._conn()
+                for i in range(0,len(sids),500):
+                    chunk=sids[i:i+500]
+                    marks=",".join("?"*len(chunk))
+                    for sid,typ,title,orig,year,ids in db.execute(
+                            f"SELECT sid,type,title,original_title,year,ids FROM subjects WHERE sid IN ({marks})",chunk):
+                        out[sid]={"type":typ or None,"title":title,"original_title":orig,"year":year,
+                                  "ids":json.loads(ids),"create_time":None}
+                    for sid,ct in db.execute(
+                            f"SELECT sid,create_time FROM user_times WHERE user_id=? AND sid IN ({marks})",
+                            [str(user_id),*chunk]):
+                        if sid in out: out[sid]["create_time"]=ct
+            except sqlite3.OperationalError:
+                pass  # 已读到的照常返回，其余按未存储处理
+            for sid in need_time:
+                if sid in out and not out[sid]["create_time"]: del out[sid]
+            self.hits+=len(out)
+        return out
+
+    def put(self,user_id,sid,det):
+        if not self.enabled or not sid or not det: return
+        with self._lock:
+            self.fetched+=1
+            try:
+                db=self._conn()
+                db.execute("INSERT OR REPLACE INTO subjects VALUES (?,?,?,?,?,?,?)",
+                           (sid,det.get("type") or "",det.get("title") or "",det.get("original_title") or "",
+                            str(det.get("year") or ""),json.dumps(det.get("ids") or {},ensure_ascii=False),time.time()))
+                if det.get("create_time"):
+                    db.execute("INSERT OR REPLACE INTO user_times VALUES (?,?,?)",(str(user_id),sid,det["create_time"]))
+            except sqlite3.OperationalError:
+                pass
+
+    def imdb(self,sid):
+        """已存储详情中的 IMDb id"""
+        if not self.enabled or not sid: return None
+        with self._lock:
+            try:
+                row=self._conn().execute("SELECT ids FROM subjects WHERE sid=?",(sid,)).fetchone()
+            except sqlite3.OperationalError:
+                row=None
+        return json.loads(row[0]).get("imdb") if row else None
+
+    def get_trakt(self,sid):
+        """{"type","slug","title","year","ids"}；{} 表示已知查无结果；未记录（或无结果已过期）返回 None"""
+        if not self.enabled or not sid: return None
+        with self._lock:
+            try:
+                row=self._conn().execute("SELECT type,slug,title,year,ids,stored_at FROM trakt_ids WHERE sid=?",
+                                         (sid,)).fetchone()
+            except sqlite3.OperationalError:
+                row=None
+        if not row: return None
+        typ,slug,title,year,ids,stored_at=row
+        if not slug:
+            return {} if time.time()-stored_at<TRAKT_MISS_TTL else None
+        self.trakt_hits+=1
+        return {"type":typ,"slug":slug,"title":title,"year":int(year) if year.isdigit() else None,"ids":json.loads(ids)}
+
+    def put_trakt(self,sid,hit):
+        """hit 为 None 时记录"查无结果" """
+        if not self.enabled or not sid: return
+        hit=hit or {}
+        with self._lock:
+            try:
+                self._conn().execute("INSERT OR REPLACE INTO trakt_ids VALUES (?,?,?,?,?,?,?)",
+                                     (sid,hit.get("type") or "",hit.get("slug") or "",hit.get("title") or "",
+                                      str(hit.get("year") or ""),json.dumps(hit.get("ids") or {},ensure_ascii=False),time.time()))
+            except sqlite3.OperationalError:
+                pass
+
+    def summary(self):
+        return f"subject 详情库：命中 {self.hits}，新请求 {self.fetched}，Trakt id 映射命中 {self.trakt_hits}（{self.path}）"
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db=None
@@ -0,0 +1,157 @@
+import os, csv, json, sqlite3, threading, time
+
+from titles import simplify_title, title_keys
+
+_SCHEMA="""
+CREATE TABLE IF NOT EXISTS meta    (k TEXT PRIMARY KEY, v TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, type TEXT NOT NULL, title TEXT NOT NULL,
+                                    year INTEGER, ids TEXT NOT NULL, names TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS names   (id INTEGER PRIMARY KEY, entry INTEGER NOT NULL, key TEXT NOT NULL, n INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS grams   (gram TEXT NOT NULL, name INTEGER NOT NULL, PRIMARY KEY (gram, name)) WITHOUT ROWID;
+"""
+_INDEXES="CREATE INDEX IF NOT EXISTS idx_names_key ON names(key);"
+INDEX_VERSION="1"
+MMAP_SIZE=512*1024*1024
+BATCH=5000
+
+def grams(key):
+    """字符二元组（单字键用其本身）；中文标题不分词也能检索"""
+    if len(key)<2: return {key} if key else set()
+    return {key[i:i+2] for i in range(len(key)-1)}
+
+def _split(v):
+    if isinstance(v,list): return [str(x) for x in v if x]
+    return [x for x in (v or "").split("|") if x.strip()]
+
+def iter_dump(path):
+    """
+    读取片库导出：
+      - .jsonl：每行 {"title","original_title","aliases":[...],"year","type","ids":{"slug","trakt","imdb","tmdb",...}}
+      - .json ：由上述对象组成的 JSON 数组（整个文件一次读入）
+      - .tsv  ：表头含 title, original_title, aliases（| 分隔）, year, type, slug, trakt, imdb, tmdb
+    产出 (type, title, year, ids, names)；没有 slug 的条目跳过（导出 CSV 需要 slug）。
+    """
+    with open(path,"r",encoding="utf-8-sig",newline="") as f:
+        if path.endswith(".jsonl"):
+            rows=(json.loads(line) for line in f if line.strip())
+        elif path.endswith(".json"):
+            rows=json.load(f)
+            if not isinstance(rows,list):
+                raise ValueError(f"片库导出应为 JSON 数组（逐行一个对象请用 .jsonl）: {path}")
+        else:
+            rows=csv.DictReader(f,delimiter="\t")
+        for r in rows:
+            ids=r.get("ids") if isinstance(r.get("ids"),dict) else \
+                {k:r.get(k) for k in ("slug","trakt","imdb","tmdb","tvdb") if r.get(k)}
+            typ=(r.get("type") or "").strip().lower()
+            if not ids.get("slug") or typ not in ("movie","show"): continue
+            title=(r.get("title") or "").strip()
+            names=[title,(r.get("original_title") or "").strip(),*_split(r.get("aliases"))]
+            try: year=int(r.get("year")) if r.get("year") else None
+            except (TypeError,ValueError): year=None
+            yield typ,title,year,ids,[n for n in dict.fromkeys(names) if n]
+
+class TitleIndex:
+    """
+    本地片库的标题索引（单文件 SQLite，<dump>.idx.sqlite，以 mmap 方式读取）：
+      - names：规范化标题/原名/别名 → 条目，精确命中；
+      - grams：字符二元组倒排表，按 Dice 系数取近似候选。
+    首次使用或导出文件变化（大小/修改时间）时重建，之后直接打开，几乎无加载开销。
+    candidates() 返回与 Trakt 搜索结果同结构的候选列表，由 trakt.rank_candidates 打分。
+    """
+    def __init__(self,dump_path,index_path=None):
+        self.dump_path=os.path.abspath(dump_path)
+        self.index_path=index_path or self.dump_path+".idx.sqlite"
+        self.hits=0
+        self.misses=0
+        self._lock=threading.Lock()
+        self._db=None
+
+    def _signature(self):
+        if not os.path.exists(self.dump_path): return None
+        st=os.stat(self.dump_path)
+        return f"{INDEX_VERSION}:{st.st_size}:{int(st.st_mtime)}"
+
+    def _conn(self):
+        if self._db is None:
+            db=sqlite3.connect(self.index_path,check_same_thread=False,isolation_level=None)
+            db.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            db.executescript(_SCHEMA)
+            row=db.execute("SELECT v FROM meta WHERE k='signature'").fetchone()
+            sig=self._signature()
+            if sig is None and not row:
+                db.close()
+                raise FileNotFoundError(f"片库导出不存在: {self.dump_path}")
+            if sig is not None and (not row or row[0]!=sig):
+                self._build(db)  # 导出文件已删除时沿用现有索引
+            self._db=db
+        return self._db
+
+    def _build(self,db):
+        t0=time.time()
+        print(f"构建本地片库索引：{self.dump_path} → {self.index_path}")
+        db.execute("PRAGMA journal_mode=OFF")
+        db.execute("PRAGMA synchronous=OFF")
+        db.execute("BEGIN")
+        for t in ("entries","names","grams","meta"): db.execute(f"DELETE FROM {t}")
+        db.execute("DROP INDEX IF EXISTS idx_names_key")
+        entries=[]; names=[]; gram_rows=[]
+        eid=nid=0
+        def flush():
+            db.executemany("INSERT INTO entries VALUES (?,?,?,?,?,?)",entries)
+            db.executemany("INSERT INTO names VALUES (?,?,?,?)",names)
+            db.executemany("INSERT OR IGNORE INTO grams VALUES (?,?)",gram_rows)
+            entries.clear(); names.clear(); gram_rows.clear()
+        for typ,title,year,ids,entry_names in iter_dump(self.dump_path):
+            eid+=1
+            entries.append((eid,typ,title,year,json.dumps(ids,ensure_ascii=False),json.dumps(entry_names,ensure_ascii=False)))
+            for key in {simplify_title(n) for n in entry_names}-{""}:
+                nid+=1
+                g=grams(key)
+                names.append((nid,eid,key,len(g)))
+                gram_rows.extend((x,nid) for x in g)
+            if len(entries)>=BATCH: flush()
+        flush()
+        db.execute(_INDEXES)
+        db.execute("INSERT INTO meta VALUES ('signature',?)",(self._signature(),))
+        db.execute("COMMIT")
+        db.execute("ANALYZE")
+        print(f"  索引完成：{eid} 个条目，{nid} 个名称，用时 {time.time()-t0:.1f}s")
+
+    def candidates(self,title,limit=10,min_dice=0.6):
+        """有精确命中时只返回精确命中的条目；否则返回按二元组 Dice 系数降序的近似条目"""
+        keys=title_keys(title)
+        if not keys: return []
+        with self._lock:
+            db=self._conn()
+            marks=",".join("?"*len(keys))
+            exact=[e for (e,) in db.execute(f"SELECT DISTINCT entry FROM names WHERE key IN ({marks})",list(keys))]
+            scored={}
+            if not exact:
+                for key in keys:
+                    g=grams(key)
+                    need=max(1,int(len(g)*min_dice/2))
+                    gm=",".join("?"*len(g))
+                    for entry,n,shared in db.execute(
+                            f"SELECT n.entry,n.n,COUNT(*) FROM grams g JOIN names n ON n.id=g.name "
+                            f"WHERE g.gram IN ({gm}) GROUP BY g.name HAVING COUNT(*)>=?",[*g,need]):
+                        dice=2*shared/(len(g)+n)
+                        if dice>=min_dice and dice>scored.get(entry,0): scored[entry]=dice
+            order=(exact or [e for e,_ in sorted(scored.items(),key=lambda x:-x[1])])[:limit]
+            if not order: return []
+            rows={r[0]:r for r in db.execute(
+                f"SELECT id,type,title,year,ids,names FROM entries WHERE id IN ({','.join('?'*len(order))})",order)}
+        out=[]
+        for e in order:
+            _,typ,t,year,ids,nm=rows[e]
+            out.append({"type":typ,typ:{"title":t,"year":year,"ids":json.loads(ids)},"aliases":json.loads(nm)})
+        return out
+
+    def summary(self):
+        return f"本地片库：命中 {self.hits}，未解决 {self.misses}（{self.index_path}）"
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db=None
@@ -0,0 +1,108 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# ========== 中文数字 ==========
+
+_CN_DIGIT={"零":0,"〇":0,"一":1,"二":2,"两":2,"三":3,"四":4,"五":5,"六":6,"七":7,"八":8,"九":9}
+_CN_UNIT={"十":10,"百":100,"千":1000}
+_CN_CHARS="零〇一二两三四五六七八九十百千万"
+
+def cn_to_int(s):
+    """
+    中文数字 → int，支持十/百/千/万与"零"占位（如 十二、二十、一百零一、一千零十、两千零二十三、一万零五）。
+    连写的数字（如 一二）不是数量写法，返回 None。
+    """
+    if not s: return None
+    if s.isdigit(): return int(s)
+    total=0; section=0; num=None; last_unit=10**9; prev_digit=False; after_unit=False
+    for ch in s:
+        if ch in "零〇" and after_unit:
+            after_unit=False  # 单位（十/百/千/万）之后的"零"只是占位，不作为数字
+            continue
+        if ch in _CN_DIGIT:
+            if prev_digit: return None
+            num=_CN_DIGIT[ch]; prev_digit=True; after_unit=False
+        elif ch in _CN_UNIT:
+            u=_CN_UNIT[ch]
+            if u>=last_unit: return None
+            section+=(1 if num is None else num)*u
+            num=None; last_unit=u; prev_digit=False; after_unit=True
+        elif ch=="万":
+            if section==0 and num is None and total==0: return None
+            total+=(section+(num or 0))*10000
+            section=0; num=None; last_unit=10**9; prev_digit=False; after_unit=True
+        else:
+            return None
+    return total+section+(num or 0)
+
+# ========== 标题分析 ==========
+
+_NUM=f"[{_CN_CHARS}]+"
+
+# 与原 extract_season_number 的匹配顺序一致：按模式优先级，而非出现位置
+SEASON_PATTERNS=[
+    re.compile(r"[第\s]*(\d+)\s*季"),
+    re.compile(rf"[第\s]*({_NUM})\s*季"),
+    re.compile(r"[Ss]eason\s*(\d+)"),
+    re.compile(r"[Ss]\s?(\d+)\b"),
+    re.compile(rf"[第\s]*({_NUM})\s*部"),
+    re.compile(r"[Pp]art\s*(\d+)"),
+]
+# normalize 时依次删除的季号片段（顺序同原 normalize_title）
+STRIP_PATTERNS=[
+    re.compile(r"\s*[第\s]*\d+\s*季"),
+    re.compile(rf"\s*[第\s]*{_NUM}\s*季"),
+    re.compile(r"\s*[Ss]eason\s*\d+"),
+    re.compile(r"\s*[Ss]\s?\d+\b"),
+    re.compile(rf"\s*[第\s]*{_NUM}\s*部"),
+    re.compile(r"\s*[Pp]art\s*\d+"),
+]
+SHOW_HINT=re.compile(rf"(第\s*[{_CN_CHARS}\d]+\s*话)|TV|电视剧|ドラマ|Season",re.IGNORECASE)
+# 合并的快速判定：不含任何季号/剧集线索的标题（绝大多数电影）一次 search 即可返回
+_ANY_MARK=re.compile(r"[季部话]|s\s?\d|season|part\s*\d|tv|电视剧|ドラマ",re.IGNORECASE)
+_STRIP_CHARS=" ·-—:：()（）"
+
+TitleInfo=namedtuple("TitleInfo","normalized season type_hint")
+
+def _season(t):
+    for pat in SEASON_PATTERNS:
+        m=pat.search(t)
+        if m:
+            v=cn_to_int(m.group(1))
+            if v: return v
+            if v==0 and m.group(1).isdigit(): return 0
+    return None
+
+@lru_cache(maxsize=65536)
+def analyze_title(title):
+    """
+    一次得到 (规范化标题, 季号, 类型提示)：
+      normalized —— 去掉季号片段后的标题（Trakt 搜索用）；
+      season     —— 季号/部数，没有则 None；
+      type_hint  —— "show" / "movie"（无 interests 类型时的兜底）。
+    """
+    t=title or ""
+    if not _ANY_MARK.search(t):
+        return TitleInfo(t.strip(_STRIP_CHARS),None,"movie")
+    season=_season(t)
+    norm=t
+    for pat in STRIP_PATTERNS:
+        norm=pat.sub("",norm)
+    typ="show" if season or SHOW_HINT.search(t) else "movie"
+    return TitleInfo(norm.strip(_STRIP_CHARS),season,typ)
+
+def simplify_title(s):
+    """比较用的标题键：小写，只保留字母数字（含中日韩文字）"""
+    return "".join(ch for ch in (s or "").casefold() if ch.isalnum())
+
+def title_keys(title):
+    """豆瓣标题常为 "中文名 / 原名"：各部分及其去掉季号后的形式，分别化为比较键"""
+    parts=[p for p in (title or "").split(" / ") if p.strip()]
+    names=parts+[analyze_title(p).normalized for p in parts]
+    return {k for k in map(simplify_title,names) if k}
+
+def analyze_titles(titles):
+    """批量版本：重复标题只分析一次，按输入顺序返回 TitleInfo 列表"""
+    uniq={t:analyze_title(t) for t in dict.fromkeys(titles)}
+    return [uniq[t] for t in titles]
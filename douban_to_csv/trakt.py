@@ -1,47 +1,222 @@
-import time, re
-import requests, certifi
+import json, os, sys
+from collections import namedtuple
+from difflib import SequenceMatcher
 import config
-from session_utils import polite_sleep
+
+# 添加项目根目录到 Python 路径（共享 common 包）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.trakt_rate import LIMITER
+from common.transport import CONNECT_TIMEOUT, TRAKT
+from search_cache import SearchCache
+from titles import analyze_title, simplify_title, title_keys
+from title_index import TitleIndex
+
+SEARCH_CACHE=SearchCache()
+TITLE_INDEX=None
 
 def normalize_title(title:str):
-    t=title or ""
-    # 去掉季号
-    t=re.sub(r"\s*[第\s]*\d+\s*季","",t)
-    t=re.sub(r"\s*[第\s]*[一二三四五六七八九十两〇零]+\s*季","",t)
-    t=re.sub(r"\s*[Ss]eason\s*\d+","",t)
-    t=re.sub(r"\s*[Ss]\s?\d+\b","",t)
-    t=re.sub(r"\s*[第\s]*[一二三四五六七八九十两〇零]+\s*部","",t)
-    t=re.sub(r"\s*[Pp]art\s*\d+","",t)
-    return t.strip(" ·-—:：()（）")
-
-def search_trakt(title:str,year_hint:str,typ:str,client_id:str):
-    url=f"https://api.trakt.tv/search/{typ}"
-    headers={"trakt-api-version":"2","trakt-api-key":client_id,"User-Agent":"Mozilla/5.0"}
-    for q in (normalize_title(title),title):
-        try:
-            r=requests.get(url,params={"query":q},headers=headers,timeout=config.REQUEST_TIMEOUT,verify=certifi.where())
-        except Exception as e:
-            print(f"[ERROR] Trakt请求失败 {e}")
-            continue
-        if r.status_code!=200:
-            continue
-        try:
-            items=r.json()
-        except Exception:
-            items=[]
-        if not items:
-            continue
-        if year_hint and year_hint.isdigit():
-            y=int(year_hint)
-            for it in items:
-                obj=it.get(typ) or {}
-                yy=obj.get("year")
-                if yy and yy-1<=y<=yy+1:
-                    slug=(obj.get("ids") or {}).get("slug")
-                    if slug:
-                        return slug,obj.get("title") or "",yy
-        obj0=items[0].get(typ) or {}
-        slug=(obj0.get("ids") or {}).get("slug")
-        if slug: return slug,obj0.get("title") or "",obj0.get("year")
-        polite_sleep()
-    return None,None,None
\ No newline at end of file
+    """去掉季号片段后的标题（见 titles.analyze_title）"""
+    return analyze_title(title).normalized
+
+SEARCH_URL="https://api.trakt.tv/search/{}"
+IMDB_URL="https://api.trakt.tv/search/imdb/{}"
+TIMEOUT=(CONNECT_TIMEOUT,config.REQUEST_TIMEOUT)
+
+def _trakt_headers(client_id):
+    return {"trakt-api-version":"2","trakt-api-key":client_id,"User-Agent":"Mozilla/5.0"}
+
+TraktMatch=namedtuple("TraktMatch","slug title year type confidence")
+
+def plan_queries(title,release_year,typ,type_known=True):
+    """
+    查询计划 [(query, types, years), ...]：通常只执行第一条。
+      - types：类型确定时只搜该类型，否则 movie,show 一次搜两类；
+      - years：有上映年份时用 ±1 年的 years 过滤（第 2 季及以后的年份是该季的年份，不过滤）；
+    只有第一条完全没有候选时才执行后续（去掉过滤/改用原标题）。
+    """
+    info=analyze_title(title)
+    types=typ if type_known and typ in ("movie","show") else "movie,show"
+    q=info.normalized or title
+    years=""
+    if release_year and str(release_year).isdigit() and not (info.season or 0)>1:
+        y=int(release_year)
+        years=f"{y-1}-{y+1}"
+    plan=[(q,types,years)]
+    if years: plan.append((q,types,""))
+    if title and title!=q: plan.append((title,types,""))
+    return plan
+
+def rank_candidates(items,title,release_year,typ,type_known=True,ranked=True):
+    """
+    本地打分，返回按 confidence（0~1）降序的 TraktMatch 列表：
+      标题相似度 0.35（含候选的 aliases）+ 年份 0.35（±1 年 0.25，相差更多扣 0.2；无年份 0.1）
+      + Trakt 排名 0.3/0.15/0.05（ranked=False 时为本地片库候选，无先后之分，一律 0.25）；
+      第 2 季及以后的剧集，剧集首播年份早于该季年份视为吻合（0.25）；
+      类型不确定时，与豆瓣推断类型一致的候选另加 0.05。
+    """
+    keys=title_keys(title)
+    season=analyze_title(title).season or 0
+    year=int(release_year) if release_year and str(release_year).isdigit() else None
+    out=[]
+    for rank,it in enumerate(items):
+        t=it.get("type") or typ
+        obj=it.get(t) or {}
+        slug=(obj.get("ids") or {}).get("slug")
+        if not slug: continue
+        names=[k for k in map(simplify_title,[obj.get("title"),*(it.get("aliases") or [])]) if k]
+        s=0.0
+        if names and keys:
+            s+=0.35 if keys.intersection(names) else \
+                0.35*max(SequenceMatcher(None,n,k).ratio() for n in names for k in keys)
+        yy=obj.get("year")
+        if year and yy:
+            d=year-yy
+            if t=="show" and season>1 and d>=0: s+=0.25
+            else: s+=0.35 if d==0 else 0.25 if abs(d)==1 else -0.2
+        elif not year:
+            s+=0.1
+        if not ranked: s+=0.25
+        elif rank<3: s+=(0.3,0.15,0.05)[rank]
+        if not type_known and t==typ: s+=0.05
+        out.append(TraktMatch(slug,obj.get("title") or "",yy,t,round(max(0.0,min(1.0,s)),2)))
+    out.sort(key=lambda m:-m.confidence)
+    return out
+
+def score_candidates(items,title,release_year,typ,type_known=True):
+    """最佳候选（TraktMatch）或 None"""
+    ranked=rank_candidates(items,title,release_year,typ,type_known)
+    return ranked[0] if ranked else None
+
+def configure_index(dump_path):
+    """--title-index：加载本地片库索引（首次使用时构建）"""
+    global TITLE_INDEX
+    TITLE_INDEX=TitleIndex(dump_path) if dump_path else None
+    if TITLE_INDEX is not None: TITLE_INDEX._conn()
+
+def index_match(title,release_year,typ,type_known=True):
+    """
+    先查本地片库：最佳候选置信度达到 config.INDEX_MIN_CONFIDENCE 且与次佳拉开差距时直接采用，
+    否则返回 None 交给在线搜索。
+    """
+    if TITLE_INDEX is None: return None
+    items=TITLE_INDEX.candidates(title)
+    if type_known: items=[it for it in items if it.get("type")==typ]
+    ranked=rank_candidates(items,title,release_year,typ,type_known,ranked=False)
+    if ranked and ranked[0].confidence>=config.INDEX_MIN_CONFIDENCE and \
+            (len(ranked)<2 or ranked[1].slug==ranked[0].slug or ranked[0].confidence-ranked[1].confidence>=0.05):
+        TITLE_INDEX.hits+=1
+        return ranked[0]
+    TITLE_INDEX.misses+=1
+    return None
+
+def _search_once(q,types,years,headers):
+    """单次查询（先查缓存）；请求失败返回 None，不写缓存"""
+    items=SEARCH_CACHE.get(q,types,years)
+    if items is not None: return items
+    params={"query":q}
+    if years: params["years"]=years
+    try:
+        r=LIMITER.call("GET",lambda: TRAKT.get(SEARCH_URL.format(types),params=params,headers=headers,
+                                                   timeout=TIMEOUT))
+    except Exception as e:
+        print(f"[ERROR] Trakt请求失败 {e}")
+        return None
+    if r.status_code!=200:
+        return None
+    try:
+        items=r.json()
+    except Exception:
+        items=[]
+    SEARCH_CACHE.put(q,types,years,items)
+    return items
+
+def search_trakt(title:str,release_year:str,typ:str,client_id:str,type_known:bool=True):
+    """
+    先查本地片库（--title-index），未能确定时按查询计划在线搜索；
+    返回 TraktMatch 或 None，低置信度的结果照常返回，由调用方标记。
+    """
+    hit=index_match(title,release_year,typ,type_known)
+    if hit: return hit
+    headers=_trakt_headers(client_id)
+    for q,types,years in plan_queries(title,release_year,typ,type_known):
+        items=_search_once(q,types,years,headers)
+        if items:
+            return score_candidates(items,title,release_year,typ,type_known)
+    return None
+
+async def _get_async(af,url,params,headers):
+    """
+    异步 GET，与同步版本一样经 LIMITER 排队：X-Ratelimit / Retry-After 反馈给限速器，429 重新排队。
+    返回 (status, JSON 或 None)；200 但无法解析时 JSON 为 []。
+    """
+    status,text,_=await LIMITER.call_async("GET",lambda: af.request("GET",url,params=params,headers=headers))
+    if status!=200:
+        return status,None
+    try:
+        return status,json.loads(text)
+    except ValueError:
+        return status,[]
+
+async def search_trakt_async(af,title:str,release_year:str,typ:str,client_id:str,type_known:bool=True):
+    hit=index_match(title,release_year,typ,type_known)
+    if hit: return hit
+    headers=_trakt_headers(client_id)
+    for q,types,years in plan_queries(title,release_year,typ,type_known):
+        items=SEARCH_CACHE.get(q,types,years)
+        if items is None:
+            params={"query":q}
+            if years: params["years"]=years
+            try:
+                _,items=await _get_async(af,SEARCH_URL.format(types),params,headers)
+            except Exception as e:
+                print(f"[ERROR] Trakt请求失败 {e}")
+                continue
+            if items is None:
+                continue
+            SEARCH_CACHE.put(q,types,years,items)
+        if items:
+            return score_candidates(items,title,release_year,typ,type_known)
+    return None
+
+def id_match(items,typ,type_known=True):
+    """ID 查询的结果：类型确定时只取该类型；结果唯一确定，confidence 记 1.0"""
+    for it in items or []:
+        t=it.get("type")
+        if t not in ("movie","show") or (type_known and t!=typ): continue
+        obj=it.get(t) or {}
+        slug=(obj.get("ids") or {}).get("slug")
+        if slug: return TraktMatch(slug,obj.get("title") or "",obj.get("year"),t,1.0)
+    return None
+
+def _imdb_params(typ,type_known):
+    return {"type":typ} if type_known and typ in ("movie","show") else {}
+
+def lookup_imdb(imdb,typ,client_id,type_known=True):
+    """
+    按 IMDb id 精确查询 Trakt（/search/imdb/<id>）：
+    返回 (TraktMatch 或 None, ok)；ok=False 表示请求失败，调用方不应记为"查无结果"。
+    """
+    try:
+        r=LIMITER.call("GET",lambda: TRAKT.get(IMDB_URL.format(imdb),params=_imdb_params(typ,type_known),
+                                               headers=_trakt_headers(client_id),timeout=TIMEOUT))
+    except Exception as e:
+        print(f"[ERROR] Trakt请求失败 {e}")
+        return None,False
+    if r.status_code!=200:
+        return None,r.status_code==404
+    try:
+        items=r.json()
+    except Exception:
+        items=[]
+    return id_match(items,typ,type_known),True
+
+async def lookup_imdb_async(af,imdb,typ,client_id,type_known=True):
+    try:
+        status,items=await _get_async(af,IMDB_URL.format(imdb),_imdb_params(typ,type_known),
+                                      _trakt_headers(client_id))
+    except Exception as e:
+        print(f"[ERROR] Trakt请求失败 {e}")
+        return None,False
+    if items is None:
+        return None,status==404
+    return id_match(items,typ,type_known),True
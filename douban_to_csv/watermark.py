@@ -0,0 +1,47 @@
+import json, os
+from douban import extract_subject_id
+
+def watermark_path(outfile):
+    return os.path.abspath(outfile)+".watermark.json"
+
+def load_watermark(outfile,user_id):
+    """
+    读取上次成功运行记录的水位线 {"subject_id","create_time","date"}。
+    输出文件不存在时无法合并，返回 None（即全量抓取）。
+    """
+    path=watermark_path(outfile)
+    if not os.path.exists(outfile) or not os.path.exists(path): return None
+    try:
+        with open(path,"r",encoding="utf-8") as f:
+            data=json.load(f) or {}
+    except Exception:
+        return None
+    wm=data.get(str(user_id))
+    return wm if isinstance(wm,dict) and wm.get("subject_id") else None
+
+def compute_watermark(rows):
+    """rows 可迭代、按时间倒序（与列表页一致）：第一行即最新条目"""
+    first=None; newest=""
+    for r in rows:
+        if first is None: first=r
+        newest=max(newest,r.get("datetime") or "")
+    if first is None: return None
+    sid=extract_subject_id(first.get("douban_link",""))
+    if not sid: return None
+    return {"subject_id":sid,"create_time":newest,"date":first.get("date") or ""}
+
+def save_watermark(outfile,user_id,wm):
+    if not wm: return
+    path=watermark_path(outfile)
+    data={}
+    if os.path.exists(path):
+        try:
+            with open(path,"r",encoding="utf-8") as f:
+                data=json.load(f) or {}
+        except Exception:
+            data={}
+    data[str(user_id)]=wm
+    tmp=path+".tmp"
+    with open(tmp,"w",encoding="utf-8") as f:
+        json.dump(data,f,ensure_ascii=False,indent=2)
+    os.replace(tmp,path)
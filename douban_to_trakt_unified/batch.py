@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多账号批量迁移 - 按清单为多个 (豆瓣用户, Trakt 令牌) 依次执行 抓取 → 同步
+
+- 清单为 JSON，不再逐个交互输入；每个账号在工作池中执行与统一系统相同的两个子进程，
+  输出写入 <out_dir>/<name>.log；
+- 各账号共用本地缓存（~/.cache/doubanTOOLs 下的 HTTP 缓存、Trakt 搜索缓存与 subject 详情库），
+  先跑完的账号匹配过的条目，后面的账号直接命中；
+- 所有子进程共用一份按 host 的限速额度（common/host_quota.py），按请求先后轮流发出，
+  工作池再大，豆瓣与 Trakt 收到的总请求速率也不变；
+- Trakt 令牌按账号经环境变量传给子进程，不出现在命令行里。令牌需事先获取（get_pin_trakt）；
+  token_file 的相对路径按清单所在目录解析。
+
+清单示例：
+    {
+      "client_id": "xxx",
+      "start_date": "20050502",
+      "type": "watched",
+      "dry_run": false,
+      "out_dir": "batch_out",
+      "host_rates": {"movie.douban.com": 1.5},
+      "douban_args": ["--api-only"],
+      "trakt_args": ["--concurrency", "2"],
+      "accounts": [
+        {"name": "alice", "douban_user": "123456", "token_file": "alice_token.json"},
+        {"name": "bob", "douban_user": "654321", "access_token": "...", "start_date": "20200101"}
+      ]
+    }
+
+用法：
+    python -m douban_to_trakt_unified.batch manifest.json --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 添加项目根目录到 Python 路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.host_quota import ENV as QUOTA_ENV, HostQuota
+from douban_to_trakt_unified.config import load_token
+from douban_to_trakt_unified.orchestrator import douban_to_csv_cmd, csv_to_trakt_cmd
+
+DEFAULT_WORKERS = 4
+# 所有账号合计的每秒请求数（与单账号顺序运行时的节奏相当）；清单中的 host_rates 覆盖
+DEFAULT_HOST_RATES = {
+    "movie.douban.com": 1.5,
+    "m.douban.com": 5.0,
+    "www.douban.com": 1.0,
+    "api.trakt.tv": 3.0,
+}
+
+def load_manifest(path):
+    """读取并校验清单，返回 dict；账号缺少 name 时用豆瓣用户 ID，token_file 转为绝对路径"""
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if not manifest.get('client_id'):
+        raise ValueError("清单缺少 client_id")
+    accounts = manifest.get('accounts') or []
+    if not accounts:
+        raise ValueError("清单中没有账号（accounts）")
+    base = os.path.dirname(os.path.abspath(path))
+    names = set()
+    for acct in accounts:
+        if not acct.get('douban_user'):
+            raise ValueError(f"账号缺少 douban_user：{acct}")
+        acct.setdefault('name', str(acct['douban_user']))
+        if acct['name'] in names:
+            raise ValueError(f"账号名重复：{acct['name']}")
+        names.add(acct['name'])
+        if acct.get('token_file'):
+            acct['token_file'] = os.path.join(base, os.path.expanduser(acct['token_file']))
+    return manifest
+
+def account_config(manifest, acct, out_dir):
+    """单个账号 → 与 config.get_user_input() 相同结构的配置"""
+    return {
+        'trakt': {
+            'client_id': manifest['client_id'],
+            'token_file': acct.get('token_file'),
+        },
+        'douban': {
+            'user_id': str(acct['douban_user']),
+            'start_date': str(acct.get('start_date') or manifest.get('start_date') or "20050502"),
+            'deep_refine': True,
+            # 子进程在项目根目录执行，路径一律转为绝对路径
+            'csv_output': os.path.abspath(acct.get('csv') or os.path.join(out_dir, f"{acct['name']}.csv")),
+        },
+        'system': {
+            'dry_run': bool(acct.get('dry_run', manifest.get('dry_run', False))),
+            'type': acct.get('type') or manifest.get('type') or "watched",
+        },
+    }
+
+def account_token(acct):
+    if acct.get('access_token'):
+        return acct['access_token']
+    if acct.get('token_file'):
+        return (load_token(acct['token_file']) or {}).get('access_token')
+    return None
+
+def _run(cmd, env, log):
+    log.write(f"$ {' '.join(cmd)}\n")
+    log.flush()
+    return subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT, env=env, cwd=ROOT).returncode
+
+def run_account(manifest, acct, out_dir, env):
+    """返回 (name, 是否成功, 结束时所在步骤, 用时秒数)"""
+    name = acct['name']
+    config = account_config(manifest, acct, out_dir)
+    t0 = time.time()
+    token = account_token(acct)
+    if not token:
+        return name, False, "缺少 Trakt 令牌（先用 get_pin_trakt 获取，写入 token_file 或 access_token）", 0.0
+
+    child_env = dict(env, TRAKT_CLIENT_ID=manifest['client_id'], TRAKT_ACCESS_TOKEN=token)
+    with open(os.path.join(out_dir, f"{name}.log"), 'a', encoding='utf-8') as log:
+        log.write(f"\n===== {time.strftime('%Y-%m-%d %H:%M:%S')} {name} =====\n")
+        if _run(douban_to_csv_cmd(config) + list(manifest.get('douban_args') or []), child_env, log) != 0:
+            return name, False, "豆瓣抓取", time.time() - t0
+        if _run(csv_to_trakt_cmd(config) + list(manifest.get('trakt_args') or []), child_env, log) != 0:
+            return name, False, "Trakt 同步", time.time() - t0
+    return name, True, "完成", time.time() - t0
+
+def run_batch(manifest, workers=DEFAULT_WORKERS):
+    out_dir = os.path.abspath(manifest.get('out_dir') or "batch_out")
+    os.makedirs(out_dir, exist_ok=True)
+    rates = dict(DEFAULT_HOST_RATES, **(manifest.get('host_rates') or {}))
+    quota_path = os.path.join(out_dir, "host_quota.sqlite")
+    quota = HostQuota.create(quota_path, rates)
+    env = dict(os.environ, **{QUOTA_ENV: quota_path})
+
+    accounts = manifest['accounts']
+    workers = max(1, min(workers, len(accounts)))
+    print("=" * 60)
+    print(f"批量迁移：{len(accounts)} 个账号，工作池 {workers}，日志目录 {out_dir}")
+    print("共享 host 额度：" + "，".join(f"{h} {r:g}/s" for h, r in sorted(rates.items())))
+    print("=" * 60)
+
+    results = []
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(run_account, manifest, acct, out_dir, env) for acct in accounts]
+        for fut in as_completed(futures):
+            name, ok, stage, elapsed = fut.result()
+            results.append((name, ok, stage, elapsed))
+            print(f"[{len(results)}/{len(accounts)}] {name}: {'✅' if ok else '❌'} {stage}（{elapsed:.0f}s）")
+
+    failed = [r for r in results if not r[1]]
+    print("\n" + "=" * 60)
+    print(f"完成 {len(results) - len(failed)} / {len(results)} 个账号，用时 {time.time() - t0:.0f}s")
+    for name, _, stage, _ in failed:
+        log = os.path.join(out_dir, name + ".log")
+        print(f"- {name} 失败于：{stage}" + (f"（见 {log}）" if os.path.exists(log) else ""))
+    print(quota.summary())
+    print("=" * 60)
+    return not failed
+
+def main():
+    p = argparse.ArgumentParser(description="按清单批量迁移多个豆瓣账号到各自的 Trakt 账号")
+    p.add_argument("manifest", help="清单 JSON 路径（格式见本文件说明）")
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                   help=f"同时处理的账号数（默认 {DEFAULT_WORKERS}）；总请求速率由共享 host 额度限制")
+    p.add_argument("--dry-run", action="store_true", help="所有账号都只生成 payload，不写入 Trakt")
+    args = p.parse_args()
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"清单无效：{e}")
+    if args.dry_run:
+        manifest['dry_run'] = True
+        for acct in manifest['accounts']:
+            acct['dry_run'] = True
+    sys.exit(0 if run_batch(manifest, args.workers) else 1)
+
+if __name__ == "__main__":
+    main()
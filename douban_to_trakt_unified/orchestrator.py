@@ -66,14 +66,9 @@ def run_get_pin_trakt(config):
         print("获取令牌失败")
         return None
 
-def run_douban_to_csv(config):
-    """运行豆瓣到 CSV 转换流程"""
-    print("\n" + "=" * 60)
-    print("步骤 2/3: 从豆瓣抓取数据并生成 CSV")
-    print("=" * 60)
-    
-    # 构建命令行参数
-    cmd = [
+def douban_to_csv_cmd(config):
+    """豆瓣抓取子进程的命令行（在项目根目录执行）"""
+    return [
         sys.executable, "douban_to_csv/douban_to_csv.py",
         config['douban']['user_id'],
         config['douban']['start_date'],
@@ -81,6 +76,31 @@ def run_douban_to_csv(config):
         "--trakt-client-id", config['trakt']['client_id'],
         "--out", config['douban']['csv_output']
     ]
+
+def csv_to_trakt_cmd(config, access_token=None):
+    """
+    Trakt 同步子进程的命令行（在项目根目录执行）。
+    access_token 为 None 时不放进命令行，由子进程从环境变量 TRAKT_ACCESS_TOKEN 读取。
+    """
+    cmd = [
+        sys.executable, "csv_to_trakt/csv_to_trakt.py",
+        "--csv", config['douban']['csv_output'],
+        "--type", config['system'].get('type', "watched"),
+        "--trakt-client-id", config['trakt']['client_id'],
+    ]
+    if access_token:
+        cmd += ["--trakt-token", access_token]
+    if config['system']['dry_run']:
+        cmd.append("--dry-run")
+    return cmd
+
+def run_douban_to_csv(config):
+    """运行豆瓣到 CSV 转换流程"""
+    print("\n" + "=" * 60)
+    print("步骤 2/3: 从豆瓣抓取数据并生成 CSV")
+    print("=" * 60)
+    
+    cmd = douban_to_csv_cmd(config)
     
     print(f"执行命令: {' '.join(cmd)}")
     
@@ -111,17 +131,7 @@ def run_csv_to_trakt(config, token_data):
         print("错误: 没有有效的访问令牌")
         return False
     
-    # 构建命令行参数
-    cmd = [
-        sys.executable, "csv_to_trakt/csv_to_trakt.py",
-        "--csv", config['douban']['csv_output'],
-        "--type", "watched",
-        "--trakt-client-id", config['trakt']['client_id'],
-        "--trakt-token", token_data['access_token']
-    ]
-    
-    if config['system']['dry_run']:
-        cmd.append("--dry-run")
+    cmd = csv_to_trakt_cmd(config, token_data['access_token'])
     
     print(f"执行命令: {' '.join(cmd)}")
     
@@ -19,17 +19,15 @@ CSV 读写规则：
     python3 enrich_csv_times.py --in movie.csv --out movie_refined.csv --user-id 236764164 --statuses done do mark
 """
 import argparse
-import csv
-import os
 import re
 import time
-import random
 from datetime import datetime
 from typing import Dict, List, Any
 
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from common.http_cache import HttpCache, cached_get
+from common.interests import DEFAULT_RATE, DEFAULT_WORKERS, pull_interests
+from common.rows import ENRICH_FIELDS, Row, iter_rows, read_header, write_rows
+from common.transport import session, STATS
 
 USER_AGENT = (
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -37,27 +35,15 @@ USER_AGENT = (
     "Chrome/126.0.0.0 Safari/537.36"
 )
 
-# ------- HTTP session with retry -------
-SESSION = requests.Session()
-SESSION.headers.update({
+# ------- HTTP session（连接池、重试与超时见 common/transport.py）-------
+SESSION = session({
     "User-Agent": USER_AGENT,
     "Accept": "application/json,text/plain,*/*",
     "Referer": "https://m.douban.com/mine/movie",
-    "Connection": "keep-alive",
 })
-_retry = Retry(
-    total=6,
-    connect=3,
-    read=5,
-    status=5,
-    backoff_factor=1.2,
-    status_forcelist=[429, 500, 502, 503, 504],
-    allowed_methods=frozenset(["GET"]),
-    raise_on_status=False,
-)
-_adapter = HTTPAdapter(max_retries=_retry, pool_connections=20, pool_maxsize=40)
-SESSION.mount("https://", _adapter)
-SESSION.mount("http://", _adapter)
+
+# 本地 HTTP 缓存（interests 分页），--no-cache 绕过
+CACHE = HttpCache()
 
 SUBJECT_ID_RE = re.compile(r"/subject/(\d+)/?")
 
@@ -67,18 +53,26 @@ def extract_subject_id(link: str):
     m = SUBJECT_ID_RE.search(link)
     return m.group(1) if m else None
 
+def _get_json(url: str, params: dict):
+    try:
+        r = cached_get(SESSION, CACHE, url, params=params)
+        return r.json() if r.status_code == 200 else None
+    except Exception:
+        return None
+
 def pull_interests_map_all_status(
     user_id: str,
     statuses: List[str],
-    sleep_base: float = 0.2,
+    workers: int = DEFAULT_WORKERS,
+    rate: float = DEFAULT_RATE,
     count: int = 100,
     verbose: bool = True,
 ) -> Dict[str, Dict[str, Any]]:
     """
     拉取多个 status 的 interests，合并为：
     sid -> {"type": "movie"/"show", "times": ["YYYY-MM-DD HH:MM:SS", ...（新在前）]}
+    各 status 首页读出 total 后，其余页与其他 status 并发拉取（见 common/interests.py）。
     """
-    base = f"https://m.douban.com/rexxar/api/v2/user/{user_id}/interests"
     all_map: Dict[str, Dict[str, Any]] = {}
     if verbose:
         print(f"拉取豆瓣移动端 create_time/type 映射（{','.join(statuses)}）...")
@@ -92,47 +86,17 @@ def pull_interests_map_all_status(
         if create_time not in bucket["times"]:
             bucket["times"].append(create_time)
 
-    for status in statuses:
-        if verbose:
-            print(f"  ▶ status={status}")
-        start = 0
-        empty_in_a_row = 0
-        while True:
-            params = {"status": status, "start": start, "count": count}
-            ok = False
-            try:
-                r = SESSION.get(base, params=params, timeout=30)
-                if r.status_code == 200:
-                    data = r.json()
-                    arr = data.get("interests", []) or []
-                    ok = True
-                else:
-                    arr = []
-            except Exception:
-                arr = []
-
-            if not ok:
-                empty_in_a_row += 1
-            else:
-                if not arr:
-                    empty_in_a_row += 1
-                else:
-                    empty_in_a_row = 0
-                    for it in arr:
-                        subj = it.get("subject") or {}
-                        sid = str(subj.get("id") or "").strip()
-                        raw_type = (subj.get("type") or "").strip()
-                        create_time = it.get("create_time") or ""
-                        merge_item(sid, raw_type, create_time)
-                start += count
-
-            if empty_in_a_row >= 3:
-                break
-
-            time.sleep(sleep_base + random.random() * sleep_base)
-
-        if verbose:
-            print(f"    · 聚合后 unique subjects：{len(all_map)}")
+    def merge_page(status: str, arr: list):
+        for it in arr:
+            subj = it.get("subject") or {}
+            sid = str(subj.get("id") or "").strip()
+            raw_type = (subj.get("type") or "").strip()
+            create_time = it.get("create_time") or ""
+            merge_item(sid, raw_type, create_time)
+
+    t0 = time.time()
+    stats = pull_interests(_get_json, user_id, merge_page, statuses=statuses, count=count,
+                           workers=workers, rate=rate)
 
     # times 按时间倒序（最近在前）
     for sid, v in all_map.items():
@@ -142,6 +106,7 @@ def pull_interests_map_all_status(
             pass
 
     if verbose:
+        print(f"  {stats.line(time.time() - t0)}")
         print(f"映射完成，unique subjects={len(all_map)}")
     return all_map
 
@@ -172,27 +137,17 @@ def pick_best_time(times_list: List[str], date_str: str) -> str | None:
             continue
     return best or times_list[0]
 
-def read_csv_rows(path: str) -> List[dict]:
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"CSV 不存在: {path}")
-    with open(path, "r", encoding="utf-8-sig", newline="") as f:
-        r = csv.DictReader(f)
-        return list(r)
+def read_csv_rows(path: str) -> List[Row]:
+    """读为 common.rows.Row：各列已去首尾空白，表头以外的列保留在 row.extra"""
+    return list(iter_rows(path))
 
-def write_csv_rows(path: str, rows: List[dict], fieldnames: List[str]):
+def write_csv_rows(path: str, rows: List[Row], fieldnames: List[str]):
     with open(path, "w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
-        w.writeheader()
-        for row in rows:
-            w.writerow(row)
+        write_rows(f, rows, fieldnames, lineterminator="\n")
 
-def ensure_cols(row: dict, keys: List[str]):
-    for k in keys:
-        row.setdefault(k, "")
-
-def should_refine(row: dict, only_missing: bool) -> bool:
+def should_refine(row: Row, only_missing: bool) -> bool:
     """是否需要补时：only_missing=True 时，仅当没有 datetime_refined 或以 00:00:00 结尾"""
-    dt_ref = (row.get("datetime_refined") or "").strip()
+    dt_ref = row.datetime_refined
     if not only_missing:
         return True
     if not dt_ref:
@@ -212,8 +167,15 @@ def main():
                     help="只补没有 datetime_refined 或以 00:00:00 结尾的记录")
     ap.add_argument("--midday-fallback", action="store_true",
                     help="若无法从 interests 补时，则将 datetime_refined 设为 `date 12:00:00`（默认不启用）")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"interests 并发请求数（默认 {DEFAULT_WORKERS}）")
+    ap.add_argument("--rate", type=float, default=DEFAULT_RATE, help=f"interests 每秒请求上限（默认 {DEFAULT_RATE:g}）")
     ap.add_argument("--verbose", action="store_true", help="打印详细过程")
+    ap.add_argument("--no-cache", action="store_true", help="绕过本地 HTTP 缓存，全部重新请求")
+    ap.add_argument("--cache-path", default=None, help="HTTP 缓存 SQLite 文件路径")
     args = ap.parse_args()
+    if args.cache_path:
+        CACHE.path = args.cache_path
+    CACHE.enabled = not args.no_cache
 
     rows = read_csv_rows(args.inp)
     if args.verbose:
@@ -223,26 +185,27 @@ def main():
     interests_map = pull_interests_map_all_status(
         user_id=args.user_id,
         statuses=args.statuses,
+        workers=args.workers,
+        rate=args.rate,
         verbose=args.verbose,
     )
 
     updated = 0
     untouched = 0
 
-    # 确保关键列存在
+    # 确保关键列存在（Row 中缺失的列读出为空串）
     # 动态保留原表头，额外并入新列
-    orig_fields = list(rows[0].keys()) if rows else []
-    extra_fields = ["datetime_refined", "douban_type", "douban_subject_id"]
+    orig_fields = read_header(args.inp)
+    extra_fields = list(ENRICH_FIELDS)
     fieldnames = list(dict.fromkeys(orig_fields + extra_fields))  # 去重保序
 
     for row in rows:
-        ensure_cols(row, extra_fields)
-        title = (row.get("title") or "").strip()
-        date_str = (row.get("date") or "").strip()
-        dt_orig = (row.get("datetime") or "").strip()
-        dt_refined = (row.get("datetime_refined") or "").strip()
-        link = (row.get("douban_link") or "").strip()
-        sid = (row.get("douban_subject_id") or "").strip() or extract_subject_id(link) or ""
+        title = row.title
+        date_str = row.date
+        dt_orig = row.datetime
+        dt_refined = row.datetime_refined
+        link = row.douban_link
+        sid = row.douban_subject_id or extract_subject_id(link) or ""
 
         # 回填 subject_id（若之前为空）
         row["douban_subject_id"] = sid
@@ -252,7 +215,7 @@ def main():
             continue
 
         best_time = None
-        typ = (row.get("douban_type") or "").strip()
+        typ = row.douban_type
 
         if sid and sid in interests_map:
             item = interests_map[sid]
@@ -289,6 +252,9 @@ def main():
 
     write_csv_rows(out_path, rows, fieldnames)
     print(f"写出：{out_path}  （更新 {updated} 条，保留 {untouched} 条）")
+    if args.verbose:
+        print(CACHE.summary())
+        print(STATS.summary())
 
 if __name__ == "__main__":
     main()
@@ -2,17 +2,24 @@
 """
 认证模块 - Trakt OAuth 认证逻辑
 """
-import requests
+import os
+import sys
 import time
 import json
 
+import requests
+
+# 添加项目根目录到 Python 路径（共享 common 包）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.transport import TRAKT
+
 def get_device_code(client_id):
     """获取设备代码"""
     url = "https://api.trakt.tv/oauth/device/code"
     payload = {"client_id": client_id}
     
     try:
-        r = requests.post(url, json=payload, timeout=30)
+        r = TRAKT.post(url, json=payload)
         r.raise_for_status()
         return r.json()
     except requests.exceptions.RequestException as e:
@@ -39,7 +46,7 @@ def poll_for_token(device_code, interval, expires_in, client_id, client_secret):
 
     while time.time() - start_time < expires_in:
         try:
-            r = requests.post(url, json=payload, timeout=30)
+            r = TRAKT.post(url, json=payload)
             
             if r.status_code == 200:
                 return r.json()
@@ -4,10 +4,11 @@
 Trakt PIN 码获取工具 - 简化版
 此版本保留原有功能，提供更简单的使用方式
 """
-import requests
 import time
 import json
 
+from common.transport import TRAKT
+
 def show_instructions():
     """显示使用说明"""
     print("=" * 70)
@@ -40,7 +41,7 @@ def get_device_code(client_id):
     payload = {"client_id": client_id}
     
     try:
-        r = requests.post(url, json=payload, timeout=30)
+        r = TRAKT.post(url, json=payload)
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -67,7 +68,7 @@ def poll_for_token(device_code, interval, expires_in, client_id, client_secret):
 
     while time.time() - start_time < expires_in:
         try:
-            r = requests.post(url, json=payload, timeout=30)
+            r = TRAKT.post(url, json=payload)
             
             if r.status_code == 200:
                 return r.json()
@@ -7,20 +7,22 @@ import time
 from datetime import datetime
 from urllib.parse import urlparse
 
-import requests
-import certifi
 from bs4 import BeautifulSoup
 
+from common.http_cache import HttpCache, cached_get
+from common.transport import session, STATS
+
 # ====== 你的 Edge 配置（复用登录态）======
 EDGE_DRIVER = "/path/to/edgedriver"
 EDGE_PROFILE_DIR = "/path/to/selenium_profile"  # Selenium 用户数据目录
 
-# ====== 请求会话 ======
-SESSION = requests.Session()
-SESSION.headers.update({
+# ====== 请求会话（连接池、重试与超时见 common/transport.py）======
+SESSION = session({
     "User-Agent": "Mozilla/5.0",
     "Accept": "application/json,text/html;q=0.9,*/*;q=0.8",
 })
+# 本地 HTTP 缓存（单条 interest / subject JSON），--no-cache 绕过
+CACHE = HttpCache()
 
 # ====== Selenium 准备 ======
 _driver = None
@@ -77,7 +79,7 @@ def api_user_interest_single(user_id: str, subject_id: str):
     """
     url = f"https://m.douban.com/rexxar/api/v2/user/{user_id}/interest"
     try:
-        r = SESSION.get(url, params={"subject_id": subject_id}, timeout=20, verify=certifi.where())
+        r = cached_get(SESSION, CACHE, url, params={"subject_id": subject_id})
         if r.status_code != 200:
             return None
         data = r.json()
@@ -93,7 +95,7 @@ def api_mobile_subject(subject_id: str):
     """
     url = f"https://m.douban.com/rexxar/api/v2/subject/{subject_id}"
     try:
-        r = SESSION.get(url, params={"for_mobile": "1"}, timeout=20, verify=certifi.where())
+        r = cached_get(SESSION, CACHE, url, params={"for_mobile": "1"})
         if r.status_code != 200:
             return None
         data = r.json()
@@ -176,7 +178,12 @@ def main():
     ap.add_argument("--user-id", required=True, help="豆瓣用户 ID（用于接口 A）")
     ap.add_argument("--backup", action="store_true", help="写出前生成 .bak 备份")
     ap.add_argument("--limit", type=int, default=None, help="最多处理多少条需要补时的记录（调试用）")
+    ap.add_argument("--no-cache", action="store_true", help="绕过本地 HTTP 缓存，全部重新请求")
+    ap.add_argument("--cache-path", default=None, help="HTTP 缓存 SQLite 文件路径")
     args = ap.parse_args()
+    if args.cache_path:
+        CACHE.path = args.cache_path
+    CACHE.enabled = not args.no_cache
 
     rows, headers = read_csv(args.inp)
     if "datetime" not in headers or "douban_link" not in headers:
@@ -234,6 +241,8 @@ def main():
 
     write_csv(args.outp, rows, headers)
     print(f"写出：{args.outp}  （更新 {updated} 条，保留 {len(rows)-updated} 条）")
+    print(CACHE.summary())
+    print(STATS.summary())
 
 if __name__ == "__main__":
     main()
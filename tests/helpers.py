@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+测试公用：
+
+- csv_to_trakt/ 与 douban_to_csv/ 都是脚本目录，模块按裸名互相导入，且都有 trakt.py / config.py；
+  use_package() 把指定目录放到 sys.path 最前，并清掉另一目录已加载的同名模块。
+  已导入的测试模块持有各自的模块对象，互不影响。
+- response() 构造不经网络的 requests.Response。
+"""
+import json
+import os
+import sys
+
+import requests
+
+from conftest import ROOT
+
+PACKAGES = ("csv_to_trakt", "douban_to_csv")
+
+
+def use_package(name: str):
+    path = os.path.join(ROOT, name)
+    others = [os.path.join(ROOT, p) for p in PACKAGES if p != name]
+    for mod_name, mod in list(sys.modules.items()):
+        f = getattr(mod, "__file__", None) or ""
+        if any(os.path.dirname(os.path.abspath(f)) == o for o in others):
+            del sys.modules[mod_name]
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p) not in others and os.path.abspath(p) != path]
+    sys.path.insert(0, path)
+
+
+def response(status=200, body=None, headers=None, url="https://api.trakt.tv/"):
+    r = requests.Response()
+    r.status_code = status
+    r.url = url
+    r.headers.update(headers or {})
+    if body is not None:
+        r._content = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        r.headers.setdefault("Content-Type", "application/json")
+    else:
+        r._content = b""
+    return r
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+
+from helpers import use_package
+
+from common.host_quota import HostQuota
+from douban_to_trakt_unified.batch import load_manifest
+
+use_package("douban_to_csv")
+import async_session  # noqa: E402
+
+
+def test_token_file_is_relative_to_manifest(tmp_path, monkeypatch):
+    d = tmp_path / "conf"
+    d.mkdir()
+    (d / "m.json").write_text(json.dumps({"client_id": "c", "accounts": [
+        {"douban_user": "1", "token_file": "alice.json"},
+        {"douban_user": "2", "token_file": str(tmp_path / "abs.json")},
+    ]}), encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    accts = load_manifest("conf/m.json")["accounts"]
+    assert accts[0]["token_file"] == str(d / "alice.json")
+    assert accts[1]["token_file"] == str(tmp_path / "abs.json")
+
+
+def test_wait_async_books_shared_slots(tmp_path):
+    q = HostQuota.create(str(tmp_path / "quota.sqlite"), {"movie.douban.com": 1000})
+
+    async def main():
+        await asyncio.gather(*(q.wait_async("movie.douban.com") for _ in range(3)))
+        await q.wait_async("other.example")  # 未配置的 host 不限速也不计数
+
+    asyncio.run(main())
+    assert "movie.douban.com 1000/s：3 次" in q.summary()
+
+
+class _Resp:
+    status = 200
+    headers = {}
+
+    async def text(self, errors=None):
+        return "ok"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Session:
+    def request(self, method, url, **kw):
+        return _Resp()
+
+
+def test_async_fetcher_takes_a_quota_slot(monkeypatch):
+    hosts = []
+
+    class Quota:
+        async def wait_async(self, host):
+            hosts.append(host)
+
+    monkeypatch.setattr(async_session, "QUOTA", Quota())
+    af = async_session.AsyncFetcher()
+    af._session = _Session()
+    status, text, _ = asyncio.run(af.request("GET", "https://movie.douban.com/people/u/collect"))
+    assert (status, text) == (200, "ok") and hosts == ["movie.douban.com"]
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from common.batch_size import AdaptiveBatchSize
+
+
+def test_fast_full_batches_grow():
+    s = AdaptiveBatchSize(initial=80)
+    s.record(80, 8000, 0.5, 201)
+    assert s.size == 100
+    s.record(50, 5000, 0.5, 201)  # 不满批：不说明还有余量
+    assert s.size == 100
+
+
+def test_slow_batches_shrink_and_failures_halve():
+    s = AdaptiveBatchSize(initial=100, target_latency=5.0)
+    s.record(100, 10000, 6.0, 201)
+    assert s.size == 80
+    s.record(80, 8000, 1.0, 502)
+    assert s.size == 40
+    s.record(40, 4000, 30.0, None, timeout=True)
+    assert s.size == 20
+    assert s.errors == 2 and s.items == 100  # 只计成功批次
+
+
+def test_size_is_clamped():
+    s = AdaptiveBatchSize(initial=12, min_size=10, max_size=14)
+    s.record(12, 100, 0.1, 201)
+    s.record(14, 100, 0.1, 201)
+    assert s.size == 14
+    for _ in range(5):
+        s.record(14, 100, 0.1, 500)
+    assert s.size == 10
+
+
+def test_fixed_size_ignores_feedback():
+    s = AdaptiveBatchSize(initial=80, adaptive=False)
+    s.record(80, 8000, 0.1, 201)
+    s.record(80, 8000, 60, 500)
+    assert s.size == 80 and s.errors == 1
+
+
+def test_byte_limit_caps_next_size():
+    s = AdaptiveBatchSize(initial=100, max_bytes=20000)
+    s.record(10, 10000, 3.0, 201)  # 每条约 1000 字节
+    assert s.next_size() == 20
+
+
+def test_batches_follow_the_current_size():
+    s = AdaptiveBatchSize(initial=10, min_size=1)
+    sizes = []
+    for group in s.batches(list(range(35))):
+        sizes.append(len(group))
+        s.record(len(group), 100, 10.0, 201)  # 每批都慢：逐批缩小
+    assert sizes[:3] == [10, 8, 6] and sum(sizes) == 35
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+import pytest
+
+from helpers import response, use_package
+
+use_package("douban_to_csv")
+import search_cache  # noqa: E402
+import subject_store  # noqa: E402
+from search_cache import SearchCache  # noqa: E402
+from subject_store import SubjectStore  # noqa: E402
+from common import http_cache  # noqa: E402
+from common.http_cache import HttpCache, cache_key, cached_get  # noqa: E402
+
+COLLECT = "https://movie.douban.com/people/u/collect"
+SUBJECT = "https://m.douban.com/rexxar/api/v2/subject/{}"
+
+
+class FakeSession:
+    """按顺序返回预置的响应，并记录每次请求的 headers"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        self.sent.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = HttpCache(str(tmp_path / "http.sqlite"))
+    yield c
+    c.close()
+
+
+def _lock(path):
+    """另一个连接持有写锁，模拟批量模式下的其他进程"""
+    db = sqlite3.connect(path, isolation_level=None)
+    db.execute("BEGIN EXCLUSIVE")
+    return db
+
+
+def test_cache_key_sorts_params():
+    assert cache_key(COLLECT + "?start=15&sort=time") == cache_key(COLLECT, {"sort": "time", "start": 15})
+
+
+def test_hit_after_store(cache):
+    s = FakeSession(response(200, b"<html>page</html>", {"ETag": "v1"}, url=COLLECT))
+    assert cached_get(s, cache, COLLECT).content == b"<html>page</html>"
+    r = cached_get(s, cache, COLLECT)
+    assert r.headers["X-Cache"] == "HIT" and r.content == b"<html>page</html>"
+    assert len(s.sent) == 1 and cache.hits == 1
+
+
+def test_expired_entry_is_revalidated(cache):
+    s = FakeSession(response(200, b"old", {"ETag": "v1"}, url=COLLECT), response(304, headers={"ETag": "v1"}))
+    cached_get(s, cache, COLLECT)
+    cache._conn().execute("UPDATE responses SET expires_at=0")
+    r = cached_get(s, cache, COLLECT)
+    assert r.content == b"old"
+    assert s.sent[1]["If-None-Match"] == "v1"
+    assert cache.revalidated == 1
+
+
+def test_list_pages_are_revalidated_while_fresh(cache):
+    cache.revalidate = http_cache.LIST_URLS
+    s = FakeSession(response(200, b"old", {"ETag": "v1"}, url=COLLECT), response(200, b"new", {"ETag": "v2"}),
+                    response(200, b"{}", url=SUBJECT.format(1)))
+    cached_get(s, cache, COLLECT)
+    assert cached_get(s, cache, COLLECT).content == b"new"
+    assert s.sent[1]["If-None-Match"] == "v1"
+    assert (cache.hits, cache.misses, cache.revalidated) == (0, 2, 0)  # 首次未命中 + 验证后内容已变
+    cached_get(s, cache, SUBJECT.format(1))
+    assert cached_get(s, cache, SUBJECT.format(1)).headers["X-Cache"] == "HIT"  # 详情照常命中
+    assert len(s.sent) == 3
+
+
+def test_fresh_revalidation_counts_once(cache):
+    cache.revalidate = http_cache.LIST_URLS
+    s = FakeSession(response(200, b"old", {"ETag": "v1"}, url=COLLECT), response(304, headers={"ETag": "v1"}))
+    cached_get(s, cache, COLLECT)
+    assert cached_get(s, cache, COLLECT).content == b"old"
+    assert (cache.hits, cache.misses, cache.revalidated) == (0, 1, 1)
+
+
+def test_uncacheable_url_goes_to_network(cache):
+    s = FakeSession(response(200, b"a"), response(200, b"b"))
+    url = "https://movie.douban.com/subject/1/"
+    assert cached_get(s, cache, url).content == b"a"
+    assert cached_get(s, cache, url).content == b"b"
+
+
+def test_eviction_keeps_recent_entries(tmp_path):
+    c = HttpCache(str(tmp_path / "http.sqlite"), max_bytes=3000)
+    for i in range(5):
+        url = SUBJECT.format(i)
+        c.store(cache_key(url), url, 200, b"x" * 900, {})
+        c._conn().execute("UPDATE responses SET accessed_at=? WHERE key=?", (i, cache_key(url)))
+    left = {k for (k,) in c._conn().execute("SELECT key FROM responses")}
+    # 第 4 条写入时超过上限，从最旧的开始淘汰到 90% 以下；第 5 条写入后仍在上限内
+    assert left == {cache_key(SUBJECT.format(i)) for i in (2, 3, 4)}
+    assert c._total <= 3000
+    c.close()
+
+
+def test_locked_database_is_a_miss(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, "BUSY_TIMEOUT", 0.05)
+    path = str(tmp_path / "http.sqlite")
+    c = HttpCache(path)
+    c._conn()
+    holder = _lock(path)
+    try:
+        url = SUBJECT.format(1)
+        c.store(cache_key(url), url, 200, b"body", {})  # 写不进去也不抛异常
+        c.lookup(cache_key(url))
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+    assert c.lookup(cache_key(url)) is None
+    c.close()
+
+
+def test_search_cache_hits_and_negative_hits(tmp_path):
+    sc = SearchCache(str(tmp_path / "search.sqlite"))
+    assert sc.get("Dark", "show", "2017") is None
+    sc.put("Dark", "show", "2017", [{"type": "show", "show": {"title": "Dark", "year": 2017, "ids": {"slug": "dark"},
+                                                              "overview": "dropped"}}])
+    sc.put("Nothing", "movie", "", [])
+    assert sc.get("  dark ", "show", "2017") == [{"type": "show", "show": {"title": "Dark", "year": 2017,
+                                                                            "ids": {"slug": "dark"}}}]
+    assert sc.get("nothing", "movie", "") == []
+    assert (sc.hits, sc.neg_hits, sc.misses) == (1, 1, 1)
+    sc.close()
+
+
+def test_search_cache_expiry(tmp_path):
+    sc = SearchCache(str(tmp_path / "search.sqlite"), miss_ttl=-1)
+    sc.put("Nothing", "movie", "", [])
+    assert sc.get("Nothing", "movie", "") is None
+    sc.close()
+
+
+def test_search_cache_locked_is_a_miss(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_cache, "BUSY_TIMEOUT", 0.05)
+    path = str(tmp_path / "search.sqlite")
+    sc = SearchCache(path)
+    sc._conn()
+    holder = _lock(path)
+    try:
+        sc.put("Dark", "show", "", [{"type": "show", "show": {"title": "Dark"}}])
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+    assert sc.get("Dark", "show", "") is None
+    sc.close()
+
+
+def test_subject_store_round_trip(tmp_path):
+    st = SubjectStore(str(tmp_path / "subjects.sqlite"))
+    st.put("u1", "100", {"type": "movie", "title": "A", "original_title": "A", "year": 2001,
+                         "ids": {"imdb": "tt1"}, "create_time": "2020-01-01 10:00:00"})
+    got = st.get_many("u1", ["100", "200"])
+    assert set(got) == {"100"}
+    assert got["100"]["create_time"] == "2020-01-01 10:00:00"
+    assert st.get_many("u2", ["100"])["100"]["create_time"] is None
+    assert st.get_many("u2", ["100"], need_time=["100"]) == {}  # 别的用户存下的详情不含 u2 的标记时间
+    assert set(st.get_many("u1", ["100"], need_time=["100"])) == {"100"}
+    assert st.imdb("100") == "tt1"
+
+    assert st.get_trakt("100") is None
+    st.put_trakt("100", {"type": "movie", "slug": "a-2001", "title": "A", "year": 2001, "ids": {"trakt": 1}})
+    assert st.get_trakt("100")["slug"] == "a-2001"
+    st.put_trakt("200", None)
+    assert st.get_trakt("200") == {}
+    st.close()
+
+
+def test_subject_store_locked_is_a_miss(tmp_path, monkeypatch):
+    monkeypatch.setattr(subject_store, "BUSY_TIMEOUT", 0.05)
+    path = str(tmp_path / "subjects.sqlite")
+    st = SubjectStore(path)
+    st._conn()
+    holder = _lock(path)
+    try:
+        st.put("u1", "100", {"type": "movie", "title": "A", "ids": {}})
+        st.put_trakt("100", None)
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+    assert st.get_many("u1", ["100"]) == {}
+    assert st.get_trakt("100") is None
+    st.close()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import glob
+import os
+
+import pytest
+
+from conftest import ROOT
+from helpers import use_package
+
+use_package("douban_to_csv")
+from collect_parser import (parse_collect_items, parse_collect_items_bs4,  # noqa: E402
+                            parse_max_page, parse_max_page_bs4)
+
+FIXTURES = sorted(glob.glob(os.path.join(ROOT, "tests", "fixtures", "collect", "*.html")))
+
+
+def _read(name):
+    with open(os.path.join(ROOT, "tests", "fixtures", "collect", name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_lxml_parser_matches_bs4(path):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    assert parse_collect_items(html) == parse_collect_items_bs4(html)
+    assert parse_max_page(html) == parse_max_page_bs4(html)
+
+
+def test_first_page_items():
+    items = parse_collect_items(_read("collect_page1.html"))
+    assert items[0] == ("https://movie.douban.com/subject/1292052/", "肖申克的救赎 / The Shawshank Redemption",
+                        "2021-03-04", "1994")
+    assert len(items) == 4
+    assert parse_max_page(_read("collect_page1.html")) == 41
+
+
+def test_incomplete_items_keep_empty_fields():
+    by_sid = {link.rsplit("/", 2)[1]: (title, date, year)
+              for link, title, date, year in parse_collect_items(_read("collect_page2.html"))}
+    assert by_sid["3016187"][1] == ""  # 没有 date
+    assert by_sid["1307914"][0] == ""  # li.title 里没有 em
+    assert by_sid["1298624"] == ("三体 第一部 / The Three-Body Problem", "2020-10-01", "")  # 没有 intro
+
+
+def test_empty_page():
+    assert parse_collect_items(_read("collect_empty.html")) == []
+    assert parse_max_page(_read("collect_empty.html")) == 1
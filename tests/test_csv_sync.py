@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import csv
+from types import SimpleNamespace
+
+from requests.exceptions import ReadTimeout
+
+from helpers import response
+import csv_sync_to_trakt
+
+HEADER = ["title", "date", "datetime", "type", "season", "slug", "matched_title", "matched_year", "found", "douban_link"]
+
+
+def _csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        w.writerows(rows)
+
+
+def test_failed_batches_are_written_out_and_counted(tmp_path, monkeypatch):
+    src = tmp_path / "watched.csv"
+    _csv(src, [
+        ["A", "2020-01-01", "2020-01-01 20:00:00", "movie", "", "a", "A", "2020", "1", ""],
+        ["B", "2020-01-02", "2020-01-02 20:00:00", "show", "1", "b", "B", "2020", "1", ""],
+        ["C", "2020-01-03", "2020-01-03 20:00:00", "movie", "", "c", "C", "2020", "0", ""],
+    ])
+
+    def fake_post(endpoint, payload, access_token, client_id):
+        if "shows" in payload:
+            raise ReadTimeout("read timeout")
+        return response(201, {"added": {"movies": 1}})
+
+    monkeypatch.setattr(csv_sync_to_trakt, "post_trakt_sync", fake_post)
+    args = SimpleNamespace(csv=str(src), type="watched", trakt_client_id="cid", trakt_token="t", dry_run=False)
+    assert csv_sync_to_trakt.migrate_from_csv(args) == 1
+
+    with open(tmp_path / "watched.unsent.csv", encoding="utf-8-sig") as f:
+        left = list(csv.DictReader(f))
+    assert [r["slug"] for r in left] == ["b"]
+
+
+def test_success_returns_zero(tmp_path, monkeypatch):
+    src = tmp_path / "watched.csv"
+    _csv(src, [["A", "2020-01-01", "2020-01-01 20:00:00", "movie", "", "a", "A", "2020", "1", ""]])
+    monkeypatch.setattr(csv_sync_to_trakt, "post_trakt_sync", lambda *a: response(201, {}))
+    args = SimpleNamespace(csv=str(src), type="watched", trakt_client_id="cid", trakt_token="t", dry_run=False)
+    assert csv_sync_to_trakt.migrate_from_csv(args) == 0
+    assert not (tmp_path / "watched.unsent.csv").exists()
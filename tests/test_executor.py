@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import pytest
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from helpers import response, use_package
+
+use_package("csv_to_trakt")
+import executor  # noqa: E402
+from executor import SyncExecutor, parse_sync_response  # noqa: E402
+
+
+def _run(monkeypatch, outcomes):
+    """按顺序返回 / 抛出 outcomes，返回 (最终响应, 调用次数)"""
+    calls = []
+
+    def fake_post(endpoint, payload, access_token, client_id):
+        out = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(endpoint)
+        if isinstance(out, Exception):
+            raise out
+        return out
+
+    monkeypatch.setattr(executor, "post_trakt_sync", fake_post)
+    results = []
+    with SyncExecutor("token", "cid", max_retries=3, backoff=0) as ex:
+        ex.submit("history/movies", "history", {"movies": []}, on_done=results.append)
+    return results[0], len(calls), ex
+
+
+def _refused():
+    reason = NewConnectionError(None, "Connection refused")
+    return ConnectionError(MaxRetryError(None, "/sync/history", reason))
+
+
+@pytest.mark.parametrize("error", [ConnectTimeout("connect timeout"), _refused()])
+def test_undelivered_request_is_resent(monkeypatch, error):
+    ok = response(201, {"added": {"movies": 1}})
+    r, calls, ex = _run(monkeypatch, [error, ok])
+    assert r is ok and calls == 2
+    assert ex.retried == 1 and ex.failed == 0
+
+
+def test_read_timeout_is_not_resent(monkeypatch):
+    r, calls, ex = _run(monkeypatch, [ReadTimeout("read timeout"), response(201, {})])
+    assert r is None and calls == 1
+    assert ex.failed == 1
+
+
+def test_server_error_is_not_resent(monkeypatch):
+    r, calls, ex = _run(monkeypatch, [response(502), response(201, {})])
+    assert r.status_code == 502 and calls == 1
+    assert ex.failed == 1
+
+
+def test_rate_limited_request_is_resent(monkeypatch):
+    r, calls, _ = _run(monkeypatch, [response(429), response(201, {})])
+    assert r.status_code == 201 and calls == 2
+
+
+def test_parse_sync_response_counts_sections():
+    r = response(201, {"added": {"movies": 2, "episodes": 10}, "existing": {"movies": 1},
+                       "not_found": {"movies": [{"ids": {"slug": "x"}}], "shows": []}})
+    assert parse_sync_response(r) == {"added": 12, "existing": 1, "not_found": 1}
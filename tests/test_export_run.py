@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import csv
+import sys
+import time
+
+from helpers import use_package
+
+use_package("douban_to_csv")
+import douban_to_csv  # noqa: E402
+
+
+def _interest(n, ct):
+    return {"create_time": ct, "subject": {"id": str(n), "type": "movie", "title": f"T{n}", "year": "2001"}}
+
+
+def _read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_sync_run_goes_through_pipeline_in_order(tmp_path, monkeypatch):
+    pages = {
+        0: {"total": 150, "interests": [_interest(n, f"2021-03-{30 - n:02d} 10:00:00") for n in range(1, 4)]},
+        100: {"total": 150, "interests": [_interest(n, f"2021-02-{28 - n:02d} 10:00:00") for n in range(4, 6)]},
+    }
+    monkeypatch.setattr(douban_to_csv, "fetch_interests_page", lambda user_id, start: pages[start])
+    monkeypatch.setattr(douban_to_csv, "_fetch_api_page", lambda user_id, page_no: pages[(page_no - 1) * 100])
+
+    def match_row(row, client_id):
+        time.sleep(0.01 * (int(row["title"][1:]) % 2))  # 奇数行晚完成，输出仍按原顺序
+        row.update(slug=f"s{row['title']}", found="1")
+        return row
+
+    monkeypatch.setattr(douban_to_csv, "match_row", match_row)
+    monkeypatch.setattr(douban_to_csv, "_finish", lambda writer, *a: writer.finalize())
+    out = str(tmp_path / "movie.csv")
+    douban_to_csv.run("u", "20050502", False, None, "cid", out, workers=2, api_only=True, match_workers=3)
+
+    rows = _read(out)
+    assert [r["title"] for r in rows] == [f"T{n}" for n in range(1, 6)]
+    assert all(r["found"] == "1" and r["slug"] == "s" + r["title"] for r in rows)
+
+
+def test_sync_run_stops_at_start_date(tmp_path, monkeypatch):
+    js = {"total": 300, "interests": [_interest(1, "2021-03-01 10:00:00"), _interest(2, "2019-01-01 10:00:00")]}
+    monkeypatch.setattr(douban_to_csv, "fetch_interests_page", lambda user_id, start: js)
+    monkeypatch.setattr(douban_to_csv, "_fetch_api_page", lambda user_id, page_no: js)
+    monkeypatch.setattr(douban_to_csv, "match_row", lambda row, client_id: row)
+    monkeypatch.setattr(douban_to_csv, "_finish", lambda writer, *a: writer.finalize())
+    out = str(tmp_path / "movie.csv")
+    douban_to_csv.run("u", "20200101", False, None, "cid", out, api_only=True)
+
+    assert [r["title"] for r in _read(out)] == ["T1"]
+
+
+def test_sync_html_run_refines_whole_pages(tmp_path, monkeypatch):
+    pages = {f"p{n}": [{"title": f"T{n}{i}", "douban_link": f"https://movie.douban.com/subject/{n}{i}/"}
+                       for i in range(3)] for n in (1, 2)}
+    batches = []
+
+    def refine_rows(rows, interests_map, user_id, deep_refine=False, deep_days=None):
+        batches.append([r["title"] for r in rows])
+        return rows
+
+    monkeypatch.setattr(douban_to_csv, "get_interests_map", lambda user_id, watermark: {})
+    monkeypatch.setattr(douban_to_csv, "fetch", lambda url, referer=None: "p1")
+    monkeypatch.setattr(douban_to_csv, "get_max_page", lambda user_id, html: 2)
+    monkeypatch.setattr(douban_to_csv, "_fetch_collect_page", lambda user_id, start, delay: "p2")
+    monkeypatch.setattr(douban_to_csv, "extract_collect_rows", lambda html, start_date, watermark: (pages[html], False))
+    monkeypatch.setattr(douban_to_csv, "refine_rows", refine_rows)
+    monkeypatch.setattr(douban_to_csv, "match_row", lambda row, client_id: row)
+    monkeypatch.setattr(douban_to_csv, "_finish", lambda writer, *a: writer.finalize())
+    out = str(tmp_path / "movie.csv")
+    douban_to_csv.run("u", "20050502", True, None, "cid", out, refine_workers=2)
+
+    assert sorted(batches) == [["T10", "T11", "T12"], ["T20", "T21", "T22"]]
+    assert [r["title"] for r in _read(out)] == ["T10", "T11", "T12", "T20", "T21", "T22"]
+
+
+def test_async_mode_keeps_the_given_workers(monkeypatch):
+    seen = {}
+
+    async def run_async(user_id, start_date, deep_refine, deep_days, client_id, outfile, workers, *rest):
+        seen["workers"] = workers
+
+    monkeypatch.setattr(douban_to_csv, "run_async", run_async)
+    monkeypatch.setattr(douban_to_csv, "configure_cache", lambda path, enabled: None)
+    monkeypatch.setattr(sys, "argv", ["douban_to_csv.py", "u", "--trakt-client-id", "c", "--async", "--workers", "2"])
+    douban_to_csv.main()
+    assert seen["workers"] == 2
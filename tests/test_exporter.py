@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import csv
+
+from helpers import use_package
+
+use_package("douban_to_csv")
+from exporter import CsvStreamWriter, FIELDS  # noqa: E402
+
+META = {"user": "u", "start_date": "20200101"}
+
+
+def _row(n):
+    return {"title": f"T{n}", "date": "2020-01-01", "datetime": "2020-01-01 20:00:00", "type": "movie",
+            "douban_link": f"https://movie.douban.com/subject/{n}/", "found": "1", "slug": f"t{n}"}
+
+
+def _read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_resume_truncates_to_last_complete_page(tmp_path):
+    out = str(tmp_path / "movie.csv")
+    w = CsvStreamWriter(out, META)
+    assert w.open() == 1
+    w.write_page(1, [_row(1), _row(2)])
+    w.write_page(2, [_row(3)])
+    w._f.write("T4,half a row")  # 中途崩溃：最后一页只写了一半
+    w._f.flush()
+    w.close()
+
+    w = CsvStreamWriter(out, META)
+    assert w.open(resume=True) == 3
+    assert w.rows == 3
+    w.write_page(3, [_row(4)])
+    w.mark_done()
+    assert w.finalize() == 4
+    assert [r["title"] for r in _read(out)] == ["T1", "T2", "T3", "T4"]
+    assert list(_read(out)[0]) == FIELDS
+    assert not (tmp_path / "movie.csv.part").exists()
+    assert not (tmp_path / "movie.csv.checkpoint.json").exists()
+
+
+def test_resume_with_other_parameters_starts_over(tmp_path):
+    out = str(tmp_path / "movie.csv")
+    w = CsvStreamWriter(out, META)
+    w.open()
+    w.write_page(1, [_row(1)])
+    w.close()
+    w = CsvStreamWriter(out, dict(META, start_date="20240101"))
+    assert w.open(resume=True) == 1 and w.rows == 0
+    w.close()
+
+
+def test_finalize_dedupes_and_merges_old_rows(tmp_path):
+    out = str(tmp_path / "movie.csv")
+    w = CsvStreamWriter(out, META)
+    w.open()
+    w.write_page(1, [_row(1), _row(2)])
+    w.write_page(2, [_row(2), _row(3)])  # 列表变动导致重复页
+    w.finalize()
+    assert [r["title"] for r in _read(out)] == ["T1", "T2", "T3"]
+
+    w = CsvStreamWriter(out, META)
+    w.open()
+    w.write_page(1, [_row(4), _row(1)])
+    assert w.finalize(merge_old=True) == 4
+    assert [r["title"] for r in _read(out)] == ["T4", "T1", "T2", "T3"]
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import inspect
+
+import pytest
+
+from helpers import response, use_package
+
+use_package("csv_to_trakt")
+import history  # noqa: E402
+import importer  # noqa: E402
+from history import HistoryIndex, _second  # noqa: E402
+
+
+@pytest.mark.parametrize("iso", [
+    "2020-01-01T12:00:00.000Z",
+    "2020-01-01T12:00:00Z",
+    "2020-01-01T12:00:00+00:00",
+    "2020-01-01T12:00:00.999+00:00",
+    "2020-01-01T20:00:00+08:00",
+    "2020-01-01T12:00:00",
+])
+def test_second_normalizes_to_utc(iso):
+    assert _second(iso) == "2020-01-01T12:00:00"
+
+
+def test_second_rejects_garbage():
+    assert _second(None) is None
+    assert _second("yesterday") is None
+
+
+def _fake_sync(pages):
+    """pages: {path: [第 1 页, 第 2 页, ...]}；未分页的接口只有一页"""
+    calls = []
+
+    def get(path, params, access_token, client_id):
+        calls.append((path, params))
+        data = pages[path]
+        n = (params or {}).get("page", 1)
+        return response(200, data[n - 1], {"X-Pagination-Page-Count": str(len(data))})
+    return get, calls
+
+
+def test_watched_index_matches_to_the_second(monkeypatch):
+    get, calls = _fake_sync({
+        "history/movies": [[{"watched_at": "2020-01-01T12:00:00.000Z", "movie": {"ids": {"slug": "a"}}}],
+                           [{"watched_at": "2021-05-05T00:00:00.000Z", "movie": {"ids": {"slug": "b"}}}]],
+        "history/episodes": [[{"watched_at": "2020-02-01T10:00:00.000Z", "show": {"ids": {"slug": "dark"}},
+                               "episode": {"season": 1}}]],
+        "watched/movies": [[{"movie": {"ids": {"slug": "a"}}}, {"movie": {"ids": {"slug": "b"}}}]],
+        "watched/shows": [[{"show": {"ids": {"slug": "dark"}}, "seasons": [{"number": 1}]}]],
+    })
+    monkeypatch.setattr(history, "get_trakt_sync", get)
+    idx = HistoryIndex.load("watched", "token", "cid")
+    assert ("history/movies", {"page": 2, "limit": history.PAGE_LIMIT}) in calls
+
+    movies, seasons, shows = idx.filter(
+        [("a", "2020-01-01T12:00:00+00:00"),      # 同一秒（CSV 不带毫秒）
+         ("a", "2020-01-01T12:00:01+00:00"),      # 差一秒：另一次观看
+         ("b", "2021-05-05T00:00:00+00:00"),      # 第 2 页
+         ("c", None)],
+        [("dark", 1, "2020-02-01T18:00:00+08:00"), ("dark", 2, None), ("dark", 1, None)],
+        [("dark", "2020-02-01T10:00:00+00:00"), ("other", None)],
+    )
+    assert movies == [("a", "2020-01-01T12:00:01+00:00"), ("c", None)]
+    assert seasons == [("dark", 2, None)]
+    assert shows == [("other", None)]
+    assert idx.skipped == {"movies": 2, "show(seasons)": 2, "show(no-season)": 1}
+
+
+def test_watchlist_index_by_slug(monkeypatch):
+    get, _ = _fake_sync({
+        "watchlist/movies": [[{"movie": {"ids": {"slug": "a"}}}]],
+        "watchlist/shows": [[{"show": {"ids": {"slug": "dark"}}}]],
+    })
+    monkeypatch.setattr(history, "get_trakt_sync", get)
+    idx = HistoryIndex.load("watchlist", "token", "cid")
+    assert idx.has("movie", ("a", None)) and not idx.has("movie", ("b", None))
+    assert idx.has("season", ("dark", 3, None))
+    assert idx.skipped["movies"] == 1 and idx.skipped["show(seasons)"] == 1
+
+
+def test_failed_fetch_raises(monkeypatch):
+    monkeypatch.setattr(history, "get_trakt_sync", lambda *a: response(401, {"error": "unauthorized"}))
+    with pytest.raises(RuntimeError):
+        HistoryIndex.load("watchlist", "token", "cid")
+
+
+def _csv(tmp_path):
+    path = tmp_path / "movie.csv"
+    path.write_text("title,date,datetime,type,season,slug,matched_title,matched_year,found,douban_link\n"
+                    "A,2020-01-01,2020-01-01 20:00:00,movie,,a-2001,A,2001,1,\n", encoding="utf-8")
+    return str(path)
+
+
+def test_diff_is_opt_in():
+    assert inspect.signature(importer.migrate_from_csv).parameters["diff"].default is False
+
+
+def test_dry_run_does_not_fetch_history(tmp_path, monkeypatch):
+    def load(*a):
+        raise AssertionError("dry-run 不应请求 Trakt 历史")
+
+    monkeypatch.setattr(importer.HistoryIndex, "load", load)
+    importer.migrate_from_csv(_csv(tmp_path), "watched", "cid", "tok", True, diff=True, use_journal=False)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from common.interests import pull_interests, pull_interests_async
+
+
+def _server(totals, fail=(), with_total=True):
+    """totals: {status: 条目数}；返回 get_json 与请求记录。条目为 "<status>-<序号>" """
+    sent = []
+
+    def page(url, params):
+        status, start, count = params["status"], params["start"], params["count"]
+        sent.append((status, start))
+        if (status, start) in fail:
+            return None
+        n = totals.get(status, 0)
+        js = {"interests": [f"{status}-{i}" for i in range(start, min(start + count, n))]}
+        if with_total:
+            js["total"] = n
+        return js
+    return page, sent
+
+
+def _collect():
+    got = []
+    return got, lambda status, items: got.extend(items)
+
+
+def test_pages_are_merged_in_order():
+    get, sent = _server({"done": 25, "mark": 7})
+    got, merge = _collect()
+    stats = pull_interests(get, "u", merge, statuses=("done", "mark"), count=10, workers=4, rate=0)
+    assert got == [f"done-{i}" for i in range(25)] + [f"mark-{i}" for i in range(7)]
+    assert stats.requests == 4 and stats.items == 32
+    assert sorted(sent) == [("done", 0), ("done", 10), ("done", 20), ("mark", 0)]
+
+
+def test_stop_ends_a_status_early():
+    get, _ = _server({"done": 50})
+    got, merge = _collect()
+    pull_interests(get, "u", merge, count=10, rate=0, stop=lambda status, items: "done-15" in items)
+    assert got == [f"done-{i}" for i in range(20)]
+
+
+def test_failed_page_is_skipped_when_total_known():
+    get, _ = _server({"done": 30}, fail={("done", 10)})
+    got, merge = _collect()
+    stats = pull_interests(get, "u", merge, count=10, rate=0)
+    assert got == [f"done-{i}" for i in range(10)] + [f"done-{i}" for i in range(20, 30)]
+    assert stats.failed == 1
+
+
+def test_without_total_pages_until_empty():
+    get, sent = _server({"done": 25}, with_total=False)
+    got, merge = _collect()
+    pull_interests(get, "u", merge, count=10, rate=0)
+    assert got == [f"done-{i}" for i in range(25)]
+    assert [s for _, s in sent] == [0, 10, 20, 30]
+
+
+def test_async_version_matches():
+    page, _ = _server({"done": 25, "mark": 3})
+
+    async def get(url, params):
+        return page(url, params)
+
+    got, merge = _collect()
+    stats = asyncio.run(pull_interests_async(get, "u", merge, statuses=("done", "mark"), count=10, rate=0))
+    assert got == [f"done-{i}" for i in range(25)] + [f"mark-{i}" for i in range(3)]
+    assert stats.requests == 4
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from helpers import response, use_package
+
+use_package("csv_to_trakt")
+from journal import SyncJournal, _not_found_slugs, item_hash  # noqa: E402
+
+
+def test_item_hash_is_stable_and_content_based():
+    h = item_hash("watched", "season", "dark", 1, "2020-01-01T12:00:00+00:00")
+    assert h == item_hash("watched", "season", "dark", 1, "2020-01-01T12:00:00+00:00")
+    assert len(h) == 40
+    others = {
+        item_hash("watchlist", "season", "dark", 1, "2020-01-01T12:00:00+00:00"),
+        item_hash("watched", "show", "dark", 1, "2020-01-01T12:00:00+00:00"),
+        item_hash("watched", "season", "dark", 2, "2020-01-01T12:00:00+00:00"),
+        item_hash("watched", "season", "dark", 1, "2020-01-01T12:00:01+00:00"),
+        item_hash("watched", "season", "dark", None, "2020-01-01T12:00:00+00:00"),
+    }
+    assert h not in others and len(others) == 5
+    assert item_hash("watched", "movie", "a") == item_hash("watched", "movie", "a", None, None)
+
+
+def test_not_found_slugs():
+    data = {"not_found": {"movies": [{"ids": {"slug": "a"}}, {"ids": {"imdb": "tt1"}}],
+                          "shows": [{"ids": {"slug": "b"}}], "seasons": [], "episodes": 3}}
+    assert _not_found_slugs(data) == {"a", "b"}
+    assert _not_found_slugs(None) == set()
+    assert _not_found_slugs({"added": {"movies": 1}}) == set()
+
+
+def _keyed(*slugs):
+    return [(item_hash("watched", "movie", s), s) for s in slugs]
+
+
+def test_acked_and_not_found_are_done(tmp_path):
+    j = SyncJournal(str(tmp_path / "j.sqlite"))
+    keyed = _keyed("a", "b", "c")
+    bid = j.begin("history", "history/movies", keyed)
+    assert j.counts() == {"pending": 3}
+    assert j.done([h for h, _ in keyed]) == set()
+
+    j.finish(bid, keyed, response(201, {"added": {"movies": 2}, "not_found": {"movies": [{"ids": {"slug": "c"}}]}}))
+    assert j.counts() == {"acked": 2, "not_found": 1}
+    assert j.done([h for h, _ in keyed]) == {h for h, _ in keyed}
+    j.close()
+
+
+def test_failed_batch_is_retried(tmp_path):
+    path = str(tmp_path / "j.sqlite")
+    j = SyncJournal(path)
+    keyed = _keyed("a")
+    j.finish(j.begin("history", "history/movies", keyed), keyed, response(502))
+    j.finish(j.begin("history", "history/movies", _keyed("b")), _keyed("b"), None)
+    assert j.counts() == {"failed": 2}
+    j.close()
+    # 重新打开：失败的条目不算已确认
+    assert SyncJournal(path).done([h for h, _ in keyed + _keyed("b")]) == set()
+
+
+def test_disabled_journal_is_a_no_op(tmp_path):
+    j = SyncJournal(str(tmp_path / "j.sqlite"), enabled=False)
+    assert j.begin("history", "x", _keyed("a")) is None
+    j.finish(None, _keyed("a"), response(201, {}))
+    assert j.done([h for h, _ in _keyed("a")]) == set()
+    assert not (tmp_path / "j.sqlite").exists()
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from helpers import use_package
+
+use_package("douban_to_csv")
+import config  # noqa: E402
+from douban_to_csv import _apply_match  # noqa: E402
+from trakt import TraktMatch  # noqa: E402
+
+
+def _row():
+    return {"title": "某片", "type": "movie", "found": "0", "slug": "", "match_confidence": ""}
+
+
+def test_confident_match_is_found():
+    row = _apply_match(_row(), TraktMatch("a-2001", "A", 2001, "movie", 0.9))
+    assert row["found"] == "1" and row["slug"] == "a-2001" and row["match_confidence"] == "0.90"
+
+
+def test_low_confidence_match_is_kept_for_review():
+    conf = config.MATCH_LOW_CONFIDENCE - 0.1
+    row = _apply_match(_row(), TraktMatch("a-2001", "A", 2001, "movie", conf))
+    assert row["found"] == "0"
+    assert row["slug"] == "a-2001" and row["match_confidence"] == f"{conf:.2f}"
+
+
+def test_no_match_leaves_row_untouched():
+    assert _apply_match(_row(), None) == _row()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from helpers import use_package
+
+use_package("csv_to_trakt")
+from packer import build_units, pack, season_entries  # noqa: E402
+from importer import build_batch, item_key  # noqa: E402
+from common.batch_size import AdaptiveBatchSize  # noqa: E402
+
+
+def _key(mode):
+    return lambda kind, it: item_key(mode, kind, it)
+
+
+def _items(movie=(), season=(), show=()):
+    return {"movie": list(movie), "season": list(season), "show": list(show)}
+
+
+def test_seasons_of_one_show_merge_into_one_entry():
+    items = _items(season=[("dark", 1, "2019-01-01T00:00:00+00:00"), ("dark", 2, "2020-01-01T00:00:00+00:00")])
+    units = build_units("watched", items, _key("watched"))
+    assert len(units) == 1
+    assert [s["number"] for s in units[0].entry["seasons"]] == [1, 2]
+    assert units[0].weight == 2
+    assert len(units[0].keyed) == 2
+
+
+def test_rewatched_season_becomes_its_own_entry():
+    first = ("dark", 1, "2019-01-01T00:00:00+00:00")
+    again = ("dark", 1, "2023-06-01T00:00:00+00:00")
+    s2 = ("dark", 2, "2020-01-01T00:00:00+00:00")
+    key = _key("watched")
+    units = build_units("watched", _items(season=[first, s2, again]), key)
+
+    assert len(units) == 2
+    watched = [(s["number"], s["watched_at"]) for u in units for s in u.entry["seasons"]]
+    assert sorted(watched) == sorted([(1, first[2]), (2, s2[2]), (1, again[2])])
+    # 每个条目只登记实际写进去的行
+    assert [h for h, _ in units[0].keyed] == [key("season", first), key("season", s2)]
+    assert [h for h, _ in units[1].keyed] == [key("season", again)]
+
+
+def test_identical_rows_are_sent_once():
+    row = ("dark", 1, "2019-01-01T00:00:00+00:00")
+    entries = season_entries([row, row], _key("watched"))
+    assert len(entries) == 1
+    assert len(entries[0][0]["seasons"]) == 1
+
+
+def test_build_batch_keeps_rewatch():
+    rows = [("dark", 1, "2019-01-01T00:00:00+00:00"), ("dark", 1, "2023-06-01T00:00:00+00:00")]
+    _, _, payload, keyed = build_batch("watched", "season", rows)
+    assert len(payload["shows"]) == 2
+    assert len(keyed) == 2
+
+
+def test_watchlist_merges_seasons_and_show_rows():
+    items = _items(season=[("dark", 1, None), ("dark", 2, None)], show=[("dark", None)])
+    units = build_units("watchlist", items, _key("watchlist"))
+    assert len(units) == 1
+    assert units[0].entry == {"ids": {"slug": "dark"}}
+
+
+def test_pack_respects_weight_and_mixes_sections():
+    items = _items(movie=[(f"m{i}", None) for i in range(3)],
+                   season=[("dark", n, f"2020-01-0{n}T00:00:00+00:00") for n in (1, 2, 3)])
+    units = build_units("watched", items, _key("watched"))
+    sizer = AdaptiveBatchSize(initial=4, min_size=1, adaptive=False)
+    batches = list(pack("watched", units, sizer))
+    # 3 部电影（权重 1）+ 一部三季的剧（权重 3）：4 装不下 6
+    assert [b[4] for b in batches] == [3, 3]
+    assert batches[0][2] == {"movies": [u.entry for u in units[:3]]}
+    assert set(batches[1][2]) == {"shows"}
+
+
+def test_oversized_unit_goes_alone():
+    items = _items(movie=[("m", None)], season=[("dark", n, None) for n in range(1, 6)])
+    units = build_units("watched", items, _key("watched"))
+    batches = list(pack("watched", units, AdaptiveBatchSize(initial=2, min_size=1, adaptive=False)))
+    assert [b[4] for b in batches] == [1, 5]
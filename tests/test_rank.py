@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from helpers import use_package
+
+use_package("douban_to_csv")
+from trakt import rank_candidates  # noqa: E402
+
+
+def _movie(slug, title, year):
+    return {"type": "movie", "movie": {"title": title, "year": year, "ids": {"slug": slug}}}
+
+
+def test_exact_title_and_year_at_top_rank_is_certain():
+    best, = rank_candidates([_movie("a", "Alien", 1979)], "Alien", "1979", "movie")
+    assert best.confidence == 1.0
+
+
+def test_rank_weights():
+    items = [_movie(f"m{i}", "Other", 1980) for i in range(4)]
+    scores = [m.confidence for m in rank_candidates(items, "Alien", "1979", "movie")]
+    base = min(scores)  # 第 4 名起没有排名分
+    assert [round(s - base, 2) for s in scores] == [0.3, 0.15, 0.05, 0.0]
+
+
+def test_unranked_candidates_share_the_same_weight():
+    items = [_movie("a", "Alien", 1979), _movie("b", "Alien", 1979)]
+    scores = {m.slug: m.confidence for m in rank_candidates(items, "Alien", "1979", "movie", ranked=False)}
+    assert scores["a"] == scores["b"] == 0.95
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from helpers import use_package
+
+use_package("douban_to_csv")
+import douban  # noqa: E402
+from subject_store import SubjectStore  # noqa: E402
+
+DET = {"type": "movie", "title": "A", "original_title": "A", "year": 2001, "ids": {}}
+
+
+def _row(sid):
+    return {"title": "A", "date": "2020-01-01", "type": "movie",
+            "douban_link": f"https://movie.douban.com/subject/{sid}/"}
+
+
+def test_deep_refine_fetches_time_missing_for_this_user(tmp_path, monkeypatch):
+    store = SubjectStore(str(tmp_path / "subjects.sqlite"))
+    store.put("u1", "100", dict(DET, create_time="2020-01-01 21:00:00"))
+    fetched = []
+
+    def fetch_subject_detail(sid):
+        fetched.append(sid)
+        return dict(DET, create_time="2020-01-01 22:30:00")
+
+    monkeypatch.setattr(douban, "SUBJECTS", store)
+    monkeypatch.setattr(douban, "fetch_subject_detail", fetch_subject_detail)
+
+    rows = douban.refine_rows([_row("100"), _row("100")], {}, "u1", deep_refine=True)
+    assert fetched == [] and rows[0]["datetime"] == "2020-01-01 21:00:00"
+
+    rows = douban.refine_rows([_row("100"), _row("100")], {}, "u2", deep_refine=True)
+    assert fetched == ["100"]  # 整页去重后只请求一次
+    assert [r["datetime"] for r in rows] == ["2020-01-01 22:30:00"] * 2
+    store.close()
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from helpers import use_package
+
+use_package("csv_to_trakt")
+from time_utils import convert_local_cn_to_utc_iso  # noqa: E402
+from common.rows import Row, iso_utc, parse_local  # noqa: E402
+
+
+@pytest.mark.parametrize("s", [
+    "2020-01-02 03:04:05",
+    "2020-1-2 3:04:05",
+    "2020-1-02 03:4:5",
+    "2021-12-31 23:59:59",
+    "2020-02-29 00:00:00",
+])
+def test_parse_local_matches_strptime(s):
+    assert iso_utc(parse_local(s)) == convert_local_cn_to_utc_iso(s)
+
+
+@pytest.mark.parametrize("s", [
+    "", "2020-01-02", "2020-13-01 00:00:00", "2019-02-29 00:00:00", "2020-01-02 24:00:00",
+    "2020-1-2 3:4", "20-01-02 03:04:05", "2020-01-02T03:04:05", "2020-1-2  3:04:05", "2020-+1-2 3:04:05",
+])
+def test_parse_local_rejects_bad_input(s):
+    assert parse_local(s) is None
+
+
+def test_row_parses_unpadded_datetime():
+    row = Row.from_dict({"datetime": " 2020-1-2 3:04:05 "})
+    assert row.datetime == "2020-1-2 3:04:05"
+    assert iso_utc(row.ts) == "2020-01-01T19:04:05+00:00"
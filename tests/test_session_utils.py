@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from helpers import response, use_package
+
+use_package("douban_to_csv")
+import config  # noqa: E402
+import session_utils  # noqa: E402
+
+
+def test_fetch_uses_configured_read_timeout(monkeypatch):
+    seen = []
+
+    def cached_get(session, cache, url, params=None, headers=None, timeout=None):
+        seen.append(timeout)
+        return response(200, {"ok": 1}, url=url)
+
+    monkeypatch.setattr(session_utils, "cached_get", cached_get)
+    session_utils.fetch("https://movie.douban.com/x")
+    assert session_utils.fetch_json("https://m.douban.com/x") == {"ok": 1}
+    session_utils.fetch("https://movie.douban.com/x", timeout=3)
+    assert seen == [(session_utils.CONNECT_TIMEOUT, config.REQUEST_TIMEOUT)] * 2 + [3]
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import pytest
+
+from helpers import use_package
+
+use_package("douban_to_csv")
+from title_index import TitleIndex, grams, iter_dump  # noqa: E402
+
+ENTRIES = [
+    {"title": "Dark", "original_title": "Dark", "aliases": ["暗黑"], "year": 2017, "type": "show",
+     "ids": {"slug": "dark", "trakt": 1}},
+    {"title": "The Shawshank Redemption", "aliases": ["肖申克的救赎"], "year": 1994, "type": "movie",
+     "ids": {"slug": "the-shawshank-redemption-1994", "imdb": "tt0111161"}},
+    {"title": "No slug", "year": 2000, "type": "movie", "ids": {"trakt": 3}},
+]
+
+
+def _jsonl(path, entries=ENTRIES):
+    with open(path, "w", encoding="utf-8") as f:
+        for e in entries:
+            f.write(json.dumps(e, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+def test_grams():
+    assert grams("abc") == {"ab", "bc"}
+    assert grams("a") == {"a"}
+    assert grams("") == set()
+
+
+def test_iter_dump_jsonl_skips_entries_without_slug(tmp_path):
+    rows = list(iter_dump(_jsonl(tmp_path / "dump.jsonl")))
+    assert [r[3]["slug"] for r in rows] == ["dark", "the-shawshank-redemption-1994"]
+    assert rows[0][4] == ["Dark", "暗黑"]
+
+
+def test_iter_dump_tsv(tmp_path):
+    path = tmp_path / "dump.tsv"
+    path.write_text("title\toriginal_title\taliases\tyear\ttype\tslug\timdb\n"
+                    "Dark\tDark\t暗黑|Dunkel\t2017\tshow\tdark\ttt5753856\n", encoding="utf-8")
+    (typ, title, year, ids, names), = iter_dump(str(path))
+    assert (typ, title, year) == ("show", "Dark", 2017)
+    assert ids == {"slug": "dark", "imdb": "tt5753856"}
+    assert names == ["Dark", "暗黑", "Dunkel"]
+
+
+def test_exact_and_fuzzy_candidates(tmp_path):
+    idx = TitleIndex(_jsonl(tmp_path / "dump.jsonl"))
+    exact = idx.candidates("暗黑 第一季")
+    assert [c["show"]["ids"]["slug"] for c in exact] == ["dark"]
+    fuzzy = idx.candidates("Shawshank Redemption")
+    assert fuzzy and fuzzy[0]["movie"]["ids"]["slug"] == "the-shawshank-redemption-1994"
+    assert idx.candidates("完全无关的标题") == []
+    idx.close()
+
+
+def test_index_is_rebuilt_when_dump_changes(tmp_path):
+    dump = _jsonl(tmp_path / "dump.jsonl")
+    idx = TitleIndex(dump)
+    assert idx.candidates("Dunkel") == []
+    idx.close()
+    _jsonl(tmp_path / "dump.jsonl", [dict(ENTRIES[0], aliases=["暗黑", "Dunkel"]), ENTRIES[1]])
+    st = os.stat(dump)
+    os.utime(dump, (st.st_atime, st.st_mtime + 10))
+    idx = TitleIndex(dump)
+    assert [c["show"]["ids"]["slug"] for c in idx.candidates("Dunkel")] == ["dark"]
+    idx.close()
+
+
+def test_iter_dump_json_array(tmp_path):
+    path = tmp_path / "dump.json"
+    path.write_text(json.dumps(ENTRIES, ensure_ascii=False, indent=2), encoding="utf-8")
+    assert [r[3]["slug"] for r in iter_dump(str(path))] == ["dark", "the-shawshank-redemption-1994"]
+
+
+def test_iter_dump_json_must_be_an_array(tmp_path):
+    path = tmp_path / "dump.json"
+    path.write_text(json.dumps(ENTRIES[0]), encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_dump(str(path)))
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from helpers import use_package
+
+use_package("douban_to_csv")
+from titles import analyze_title, cn_to_int, title_keys  # noqa: E402
+
+
+@pytest.mark.parametrize("text, value", [
+    ("十", 10),
+    ("十二", 12),
+    ("二十", 20),
+    ("二十三", 23),
+    ("一百", 100),
+    ("一百零一", 101),
+    ("一百一十", 110),
+    ("一千零十", 1010),
+    ("两千零二十三", 2023),
+    ("一万零五", 10005),
+    ("十万", 100000),
+    ("三万零一百", 30100),
+    ("零", 0),
+    ("12", 12),
+])
+def test_cn_to_int(text, value):
+    assert cn_to_int(text) == value
+
+
+@pytest.mark.parametrize("text", ["", "一二", "零五", "十百", "万", "第一"])
+def test_cn_to_int_rejects_malformed(text):
+    assert cn_to_int(text) is None
+
+
+def test_analyze_title_season_and_type():
+    info = analyze_title("请回答1988 第二季")
+    assert info.season == 2 and info.type_hint == "show"
+    assert info.normalized == "请回答1988"
+    assert analyze_title("肖申克的救赎").type_hint == "movie"
+    assert analyze_title("Dark Season 3").season == 3
+
+
+def test_title_keys_cover_both_names():
+    keys = title_keys("黑暗 第一季 / Dark Season 1")
+    assert {"黑暗", "dark"} <= keys
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import time
+
+from helpers import response, use_package
+
+use_package("douban_to_csv")
+import trakt as douban_trakt  # noqa: E402
+from common.trakt_rate import TokenBucket, TraktRateLimiter, retry_after  # noqa: E402
+
+
+def test_retry_after_seconds_and_missing():
+    assert retry_after({"Retry-After": "2.5"}) == 2.5
+    assert retry_after({}) is None
+    assert retry_after({"Retry-After": "soon"}) is None
+
+
+def test_bucket_pause_delays_next_token():
+    b = TokenBucket(rate=100, capacity=5)
+    b.pause(0.2)
+    assert 0.15 < b._reserve() <= 0.2
+
+
+def test_ratelimit_header_updates_rate():
+    lim = TraktRateLimiter()
+    header = json.dumps({"name": "UNAUTHED_API_GET_LIMIT", "period": 300, "limit": 600, "remaining": 3})
+    assert lim.observe("GET", 200, {"X-Ratelimit": header}) is None
+    assert lim.buckets["GET"].rate == 2.0
+    assert lim.buckets["GET"]._tokens <= 3
+
+
+def test_call_requeues_429():
+    lim = TraktRateLimiter(post_limit=(1000, 1))
+    sent = [response(429, headers={"Retry-After": "0"}), response(201, {})]
+    r = lim.call("POST", lambda: sent.pop(0))
+    assert r.status_code == 201
+    assert lim.requeued == 1 and lim.requests == 2
+
+
+def test_call_gives_up_after_max_requeue():
+    lim = TraktRateLimiter(max_requeue=2)
+    r = lim.call("GET", lambda: response(429, headers={"Retry-After": "0"}))
+    assert r.status_code == 429 and lim.requests == 3
+
+
+def test_call_async_requeues_429():
+    lim = TraktRateLimiter()
+    sent = [(429, "", {"Retry-After": "0"}), (200, "[]", {})]
+
+    async def send():
+        return sent.pop(0)
+
+    status, text, _ = asyncio.run(lim.call_async("GET", send))
+    assert (status, text) == (200, "[]") and lim.requeued == 1
+
+
+class FakeFetcher:
+    """AsyncFetcher.request 的替身：按顺序返回 (status, text, headers)"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.urls = []
+
+    async def request(self, method, url, params=None, headers=None, **kwargs):
+        self.urls.append(url)
+        return self.results.pop(0)
+
+
+def test_async_lookup_feeds_limiter(monkeypatch):
+    lim = TraktRateLimiter()
+    monkeypatch.setattr(douban_trakt, "LIMITER", lim)
+    body = json.dumps([{"type": "movie", "movie": {"title": "A", "year": 2001, "ids": {"slug": "a-2001"}}}])
+    header = json.dumps({"period": 300, "limit": 300, "remaining": 100})
+    af = FakeFetcher((429, "", {"Retry-After": "0"}), (200, body, {"X-Ratelimit": header}))
+
+    t = time.monotonic()
+    match, ok = asyncio.run(douban_trakt.lookup_imdb_async(af, "tt1", "movie", "cid"))
+    assert ok and match.slug == "a-2001"
+    assert len(af.urls) == 2 and lim.requeued == 1
+    assert lim.buckets["GET"].rate == 1.0
+    assert time.monotonic() - t < 2
+
+
+def test_async_lookup_404_is_a_known_miss(monkeypatch):
+    monkeypatch.setattr(douban_trakt, "LIMITER", TraktRateLimiter())
+    match, ok = asyncio.run(douban_trakt.lookup_imdb_async(FakeFetcher((404, "", {})), "tt1", "movie", "cid"))
+    assert match is None and ok
+    match, ok = asyncio.run(douban_trakt.lookup_imdb_async(FakeFetcher((502, "", {})), "tt1", "movie", "cid"))
+    assert match is None and not ok